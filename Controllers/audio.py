@@ -1,15 +1,55 @@
 import asyncio
+import base64
+import io
+import math
+import struct
+import time
 import wave
 import sys
 import argparse
+import json
+import signal
+import types
 from pathlib import Path
-from google import genai
 
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
+# Audio parameters of the Gemini live output
+NCHANNELS = 1
+SAMPWIDTH = 2      # bytes
+FRAMERATE = 24000  # samples/sec
+
+LIVE_MODEL = "gemini-2.0-flash-live-001"
+LIVE_CONFIG = {"response_modalities": ["AUDIO"]}
+
+# Streaming transport (--stream): every segment is sent as one frame, a
+# 4-byte big-endian length followed by that many bytes of a complete WAV
+# file, so the reader can hand each frame to the client as-is. A zero-length
+# frame marks the end of the response. The first audio received is sent
+# immediately; later frames are cut every --segment-duration seconds.
+FRAME_HEADER = struct.Struct(">I")
+
+# Encoder stage (--sample-rate, --codec): segments can be resampled (e.g. to
+# 16 kHz, plenty for speech) and/or sent as FLAC instead of WAV. Browsers
+# decode either with decodeAudioData, so clients need no changes. Run
+# `python audio.py --benchmark` to compare payload size and CPU cost.
+CODECS = ("wav", "flac")
+
+# Gateway (--serve): one long-lived process with a single shared client
+# serves many voice requests. Each request is its own connection to the
+# gateway socket: the client sends one JSON line
+#   {"message": "...", "segment_duration": 2, "sample_rate": 24000, "codec": "wav"}
+# and reads back the same length-prefixed frames as --stream. A connection
+# closed before the zero-length frame means the session failed. At most
+# --max-sessions live sessions run at once; up to --max-pending more wait
+# for a slot and later ones are refused. Slow readers throttle only their
+# own session (writes wait on drain). SIGINT/SIGTERM stop accepting, let
+# running sessions finish for up to --shutdown-timeout seconds, then cancel.
+# --fake swaps Gemini for a local fake live session for offline testing.
+
 async def async_enumerate(async_iterator):
     """Helper function to enumerate async iterators"""
     i = 0
@@ -17,67 +57,470 @@ async def async_enumerate(async_iterator):
         yield i, item
         i += 1
 
-async def main(message):
-    # Initialize client
-    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"), http_options={'api_version': 'v1alpha'})
-    model = "gemini-2.0-flash-live-001"
-    config = {"response_modalities": ["AUDIO"]}
-
-    # Prepare output directory
-    audio_dir = Path("audio")
-    audio_dir.mkdir(exist_ok=True)
-    # Clean existing .wav files
-    for wav_file in audio_dir.glob("*.wav"):
-        wav_file.unlink()
-
-    # Audio parameters
-    nchannels = 1
-    sampwidth = 2      # bytes
-    framerate = 24000  # samples/sec
-    segment_duration = 2  # seconds
-    segment_frames = segment_duration * framerate
-    segment_bytes = segment_frames * sampwidth * nchannels
-
-    segment_idx = 1
-    buffer = b""
+def wav_bytes(pcm, framerate=FRAMERATE):
+    """Wrap raw 16-bit mono PCM in a WAV container."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wf_seg:
+        wf_seg.setnchannels(NCHANNELS)
+        wf_seg.setsampwidth(SAMPWIDTH)
+        wf_seg.setframerate(framerate)
+        wf_seg.writeframes(pcm)
+    return out.getvalue()
+
+class Segmenter:
+    """
+    Cuts a stream of PCM chunks into fixed-size segments without re-copying.
+
+    Each incoming byte is copied at most once, into a preallocated segment
+    buffer; a chunk that covers whole segments on its own is sliced in place.
+    Segments are memoryviews, valid until the next feed() or flush() call, so
+    consume each one before asking for the next.
+    """
+
+    def __init__(self, segment_bytes):
+        self._buffer = bytearray(segment_bytes)
+        self._view = memoryview(self._buffer)
+        self._filled = 0
+
+    def __len__(self):
+        return self._filled
+
+    def feed(self, data):
+        """Yield every segment completed by data."""
+        data = memoryview(data)
+        size = len(self._buffer)
+        while data:
+            if self._filled == 0 and len(data) >= size:
+                yield data[:size]
+                data = data[size:]
+                continue
+            n = min(len(data), size - self._filled)
+            self._view[self._filled:self._filled + n] = data[:n]
+            self._filled += n
+            data = data[n:]
+            if self._filled == size:
+                self._filled = 0
+                yield self._view
+
+    def flush(self):
+        """The partial segment buffered so far (possibly empty)."""
+        pending = self._view[:self._filled]
+        self._filled = 0
+        return pending
+
+class Encoder:
+    """
+    Turns PCM segments into the payload sent to the client.
+
+    Args:
+        sample_rate: Output rate; resampled with audioop when it differs from
+            the 24 kHz source (state is carried across segments, so there are
+            no clicks at segment boundaries)
+        codec: "wav" or "flac" (FLAC needs numpy and soundfile)
+    """
+
+    def __init__(self, sample_rate=FRAMERATE, codec="wav"):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}")
+        self.sample_rate = sample_rate
+        self.codec = codec
+        self._state = None
+        self._audioop = None
+        if sample_rate != FRAMERATE:
+            try:
+                import audioop  # removed from the stdlib in 3.13; pip install audioop-lts there
+            except ImportError:
+                raise RuntimeError("Resampling needs audioop (pip install audioop-lts on Python 3.13+)")
+            self._audioop = audioop
+        if codec == "flac":
+            try:
+                import numpy
+                import soundfile
+            except ImportError:
+                raise RuntimeError("FLAC output needs numpy and soundfile (pip install soundfile)")
+            self._numpy, self._soundfile = numpy, soundfile
+
+    @property
+    def extension(self):
+        return self.codec
 
-    async with client.aio.live.connect(model=model, config=config) as session:
-        # Send initial user message
-        await session.send_client_content(
-            turns={"role": "user", "parts": [{"text": message}]},
-            turn_complete=True
-        )
-
-        # Receive and segment audio
-        async for _, response in async_enumerate(session.receive()):
-            if response.data:
-                buffer += response.data
-                # Write out full 2s segments
-                while len(buffer) >= segment_bytes:
-                    chunk = buffer[:segment_bytes]
-                    buffer = buffer[segment_bytes:]
-
-                    out_path = audio_dir / f"audio{segment_idx}.wav"
-                    with wave.open(str(out_path), "wb") as wf_seg:
-                        wf_seg.setnchannels(nchannels)
-                        wf_seg.setsampwidth(sampwidth)
-                        wf_seg.setframerate(framerate)
-                        wf_seg.writeframes(chunk)
-                    print(f"Saved segment: {out_path}")
-                    segment_idx += 1 
-
-        # Save any remaining audio as a final segment
-        if buffer:
-            out_path = audio_dir / f"final.wav"
-            with wave.open(str(out_path), "wb") as wf_seg:
-                wf_seg.setnchannels(nchannels)
-                wf_seg.setsampwidth(sampwidth)
-                wf_seg.setframerate(framerate)
-                wf_seg.writeframes(buffer)
+    def encode(self, pcm):
+        if self._audioop is not None:
+            pcm, self._state = self._audioop.ratecv(pcm, SAMPWIDTH, NCHANNELS, FRAMERATE,
+                                                    self.sample_rate, self._state)
+        if self.codec == "wav":
+            return wav_bytes(pcm, self.sample_rate)
+        out = io.BytesIO()
+        samples = self._numpy.frombuffer(pcm, dtype="<i2")
+        self._soundfile.write(out, samples, self.sample_rate, format="FLAC", subtype="PCM_16")
+        return out.getvalue()
+
+class FileSink:
+    """Writes segments to audio/audioN.wav and the remainder to audio/final.wav."""
+
+    def __init__(self, audio_dir="audio", encoder=None):
+        self.encoder = encoder or Encoder()
+        self.audio_dir = Path(audio_dir)
+        self.audio_dir.mkdir(exist_ok=True)
+        # Clean existing segment files
+        for segment_file in self.audio_dir.glob(f"*.{self.encoder.extension}"):
+            segment_file.unlink()
+        self.segment_idx = 1
+
+    async def write(self, pcm):
+        out_path = self.audio_dir / f"audio{self.segment_idx}.{self.encoder.extension}"
+        out_path.write_bytes(self.encoder.encode(pcm))
+        print(f"Saved segment: {out_path}")
+        self.segment_idx += 1
+
+    async def close(self, pcm=b""):
+        if pcm:
+            out_path = self.audio_dir / f"final.{self.encoder.extension}"
+            out_path.write_bytes(self.encoder.encode(pcm))
             print(f"Saved final segment: {out_path}")
 
+    def abort(self):
+        pass
+
+class FrameSink:
+    """Writes segments as length-prefixed WAV/FLAC frames to stdout or a local socket."""
+
+    def __init__(self, writer=None, stream=None, encoder=None):
+        # writer: asyncio StreamWriter for a socket; otherwise frames go to
+        # stream (a binary file, the real stdout by default)
+        self.writer = writer
+        self.stream = stream or sys.__stdout__.buffer
+        self.encoder = encoder or Encoder()
+
+    @classmethod
+    async def connect(cls, address, encoder=None):
+        """Connect to a Unix socket path or a host:port TCP address."""
+        host, _, port = address.rpartition(":")
+        if host and port.isdigit():
+            _, writer = await asyncio.open_connection(host, int(port))
+        else:
+            _, writer = await asyncio.open_unix_connection(address)
+        return cls(writer, encoder=encoder)
+
+    async def _send(self, payload):
+        frame = FRAME_HEADER.pack(len(payload)) + payload
+        if self.writer is None:
+            self.stream.write(frame)
+            self.stream.flush()
+        else:
+            self.writer.write(frame)
+            await self.writer.drain()
+
+    async def write(self, pcm):
+        await self._send(self.encoder.encode(pcm))
+
+    async def close(self, pcm=b""):
+        if pcm:
+            await self.write(pcm)
+        await self._send(b"")
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+    def abort(self):
+        """Drop the connection without the end-of-stream frame, so the reader sees a failure."""
+        if self.writer is not None:
+            self.writer.close()
+
+def make_client():
+    from google import genai
+    return genai.Client(api_key=os.getenv("GOOGLE_API_KEY"), http_options={'api_version': 'v1alpha'})
+
+async def main(message, sink, segment_duration=2.0, first_immediately=False, client=None):
+    # Initialize client (the gateway passes in its shared one)
+    client = client or make_client()
+
+    segment_frames = int(segment_duration * FRAMERATE)
+    segment_bytes = segment_frames * SAMPWIDTH * NCHANNELS
+
+    segmenter = Segmenter(segment_bytes)
+    first = first_immediately
+
+    try:
+        async with client.aio.live.connect(model=LIVE_MODEL, config=LIVE_CONFIG) as session:
+            # Send initial user message
+            await session.send_client_content(
+                turns={"role": "user", "parts": [{"text": message}]},
+                turn_complete=True
+            )
+
+            # Receive and segment audio
+            async for _, response in async_enumerate(session.receive()):
+                if response.data:
+                    # Write out full segments
+                    for segment in segmenter.feed(response.data):
+                        await sink.write(segment)
+                    # Don't hold the first audio back for a full segment
+                    if first and len(segmenter):
+                        await sink.write(segmenter.flush())
+                    first = False
+    except BaseException:
+        sink.abort()
+        raise
+    # Send any remaining audio as a final segment
+    await sink.close(segmenter.flush())
+
+# --- Voice Gateway ---
+
+class FakeLiveClient:
+    """
+    Offline stand-in for genai.Client: every live session answers with
+    synthetic speech, streamed in network-sized chunks at speed x real time.
+    """
+
+    def __init__(self, seconds=4.0, speed=1.0, chunk_bytes=9600):
+        self.pcm = synthetic_speech(seconds)
+        self.speed = speed
+        self.chunk_bytes = chunk_bytes
+        self.aio = self
+        self.live = self
+
+    def connect(self, model, config):
+        return FakeLiveSession(self)
+
+class FakeLiveSession:
+    def __init__(self, client):
+        self.client = client
+        self.sent = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def send_client_content(self, turns, turn_complete=True):
+        self.sent = True
+
+    async def receive(self):
+        if not self.sent:
+            return
+        chunk_seconds = self.client.chunk_bytes / (FRAMERATE * SAMPWIDTH * NCHANNELS)
+        for data in network_chunks(self.client.pcm, self.client.chunk_bytes):
+            await asyncio.sleep(chunk_seconds / self.client.speed)
+            yield types.SimpleNamespace(data=data)
+
+class Gateway:
+    """
+    Long-lived voice service sharing one client across concurrent live sessions.
+
+    Args:
+        client: genai.Client or FakeLiveClient
+        max_sessions: Live sessions running at once
+        max_pending: Connections allowed to wait for a session slot
+    """
+
+    def __init__(self, client, max_sessions=8, max_pending=32):
+        self.client = client
+        self.max_pending = max_pending
+        self._slots = asyncio.Semaphore(max_sessions)
+        self._waiting = 0
+        self._sessions = set()
+        self._server = None
+        self._socket_path = None
+
+    async def start(self, address):
+        """Listen on a Unix socket path or a host:port TCP address."""
+        host, _, port = address.rpartition(":")
+        if host and port.isdigit():
+            self._server = await asyncio.start_server(self._handle, host, int(port))
+        else:
+            if os.path.exists(address):
+                os.unlink(address)  # stale socket from an earlier run
+            self._server = await asyncio.start_unix_server(self._handle, address)
+            self._socket_path = address
+        print(f"Voice gateway listening on {address}")
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._sessions.add(task)
+        try:
+            await self._session(reader, writer)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Voice session failed: {e}")
+        finally:
+            self._sessions.discard(task)
+            writer.close()
+
+    async def _session(self, reader, writer):
+        request = json.loads(await reader.readline())
+        if not request.get("message"):
+            raise ValueError("'message' is required")
+        if self._slots.locked() and self._waiting >= self.max_pending:
+            raise RuntimeError("too many pending voice sessions")
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            encoder = Encoder(int(request.get("sample_rate", FRAMERATE)), request.get("codec", "wav"))
+            sink = FrameSink(writer, encoder=encoder)
+            await main(request["message"], sink, float(request.get("segment_duration", 2.0)),
+                       first_immediately=True, client=self.client)
+        finally:
+            self._slots.release()
+
+    async def shutdown(self, timeout=30.0):
+        """Stop accepting, give running sessions up to timeout seconds, then cancel the rest."""
+        self._server.close()
+        sessions = set(self._sessions)
+        if sessions:
+            print(f"Waiting for {len(sessions)} voice session(s) to finish")
+            _, unfinished = await asyncio.wait(sessions, timeout=timeout)
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        # Since Python 3.12.1 this also waits for every open connection, so
+        # it must come after the sessions have finished or been cancelled
+        await self._server.wait_closed()
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        print("Voice gateway stopped")
+
+async def serve(args):
+    client = FakeLiveClient(speed=args.fake_speed) if args.fake else make_client()
+    gateway = Gateway(client, args.max_sessions, args.max_pending)
+    await gateway.start(args.socket)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    await gateway.shutdown(args.shutdown_timeout)
+
+async def run(args):
+    encoder = Encoder(args.sample_rate, args.codec)
+    if args.stream == "socket":
+        sink = await FrameSink.connect(args.socket, encoder)
+    elif args.stream == "stdout":
+        sink = FrameSink(encoder=encoder)
+    else:
+        sink = FileSink(encoder=encoder)
+    client = FakeLiveClient(speed=args.fake_speed) if args.fake else None
+    await main(args.message, sink, args.segment_duration, first_immediately=args.stream is not None, client=client)
+
+# --- Benchmark ---
+
+def synthetic_speech(seconds, seed=0):
+    """Deterministic speech-like 24 kHz PCM: voiced harmonics with a syllable envelope and pauses."""
+    import random
+    rng = random.Random(seed)
+    samples = bytearray()
+    pitch = 140.0
+    for i in range(int(seconds * FRAMERATE)):
+        t = i / FRAMERATE
+        if i % 2400 == 0:
+            pitch = max(90.0, min(220.0, pitch + rng.uniform(-15, 15)))
+        envelope = max(0.0, math.sin(2 * math.pi * 3.0 * t)) * (0.0 if int(t * 1.3) % 4 == 3 else 1.0)
+        value = sum(math.sin(2 * math.pi * pitch * k * t) / k for k in (1, 2, 3, 5))
+        sample = int(6000 * envelope * value + rng.gauss(0, 150))
+        samples += struct.pack("<h", max(-32768, min(32767, sample)))
+    return bytes(samples)
+
+def network_chunks(pcm, chunk_bytes):
+    return [pcm[i:i + chunk_bytes] for i in range(0, len(pcm), chunk_bytes)]
+
+def concat_segments(chunks, segment_bytes):
+    """The previous receive loop, kept for comparison: yields each full segment."""
+    buffer = b""
+    for data in chunks:
+        buffer += data
+        while len(buffer) >= segment_bytes:
+            chunk = buffer[:segment_bytes]
+            buffer = buffer[segment_bytes:]
+            yield chunk
+
+def ring_segments(chunks, segment_bytes):
+    segmenter = Segmenter(segment_bytes)
+    for data in chunks:
+        yield from segmenter.feed(data)
+
+def benchmark(args):
+    pcm = synthetic_speech(args.seconds)
+    segment_bytes = int(args.segment_duration * FRAMERATE) * SAMPWIDTH * NCHANNELS
+    print(f"{args.seconds:.0f} s of audio, {args.segment_duration} s segments")
+
+    # The quadratic cost shows once a network chunk is smaller than the pending audio
+    for chunk_bytes in (960, 9600):
+        chunks = network_chunks(pcm, chunk_bytes)
+        for name, segment in (("bytes concat", concat_segments), ("ring buffer", ring_segments)):
+            start = time.process_time()
+            for _ in segment(chunks, segment_bytes):
+                pass
+            cpu = time.process_time() - start
+            print(f"segmenter {name:>12}, {chunk_bytes:>5} B chunks: "
+                  f"{cpu / args.seconds * 1000:.3f} ms CPU per second of audio")
+
+    configs = [(FRAMERATE, "wav"), (16000, "wav"), (FRAMERATE, "flac"), (16000, "flac")]
+    baseline = None
+    for sample_rate, codec in configs:
+        try:
+            encoder = Encoder(sample_rate, codec)
+        except RuntimeError as e:
+            print(f"{codec} @ {sample_rate} Hz: skipped ({e})")
+            continue
+        segmenter = Segmenter(segment_bytes)
+        sent = encoded = 0
+        start = time.process_time()
+        for data in network_chunks(pcm, 9600):
+            for segment in segmenter.feed(data):
+                payload = encoder.encode(segment)
+                encoded += len(payload)
+                sent += len(base64.b64encode(payload))
+        if len(segmenter):
+            payload = encoder.encode(segmenter.flush())
+            encoded += len(payload)
+            sent += len(base64.b64encode(payload))
+        cpu = time.process_time() - start
+        baseline = baseline or sent
+        print(f"{codec:>4} @ {sample_rate:>5} Hz: {encoded / args.seconds / 1024:7.1f} KiB/s encoded, "
+              f"{sent / args.seconds / 1024:7.1f} KiB/s over SSE (x{sent / baseline:.2f}), "
+              f"{cpu / args.seconds * 1000:.2f} ms CPU per second of audio")
+
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Generate audio response from Gemini in 2s segments")
-    parser.add_argument("message", type=str, help="Message to send to Gemini")
+    parser = argparse.ArgumentParser(description="Generate audio response from Gemini in fixed-length segments")
+    parser.add_argument("message", type=str, nargs="?", help="Message to send to Gemini")
+    parser.add_argument("--stream", choices=["stdout", "socket"], default=None,
+                        help="Send length-prefixed WAV frames to stdout or --socket instead of writing audio/*.wav")
+    parser.add_argument("--socket", default=None, help="Unix socket path or host:port to stream to (with --stream socket)")
+    parser.add_argument("--segment-duration", type=float, default=2.0, help="Seconds of audio per segment")
+    parser.add_argument("--sample-rate", type=int, default=FRAMERATE, help="Resample segments to this rate (e.g. 16000)")
+    parser.add_argument("--codec", choices=CODECS, default="wav", help="Segment encoding")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run the long-lived voice gateway on --socket instead of answering one message")
+    parser.add_argument("--max-sessions", type=int, default=8, help="Concurrent live sessions in --serve mode")
+    parser.add_argument("--max-pending", type=int, default=32, help="Requests waiting for a session slot before refusing")
+    parser.add_argument("--shutdown-timeout", type=float, default=30.0, help="Seconds running sessions get to finish on shutdown")
+    parser.add_argument("--fake", action="store_true", help="Answer with a local fake live session (offline testing)")
+    parser.add_argument("--fake-speed", type=float, default=1.0, help="Fake session speed as a multiple of real time")
+    parser.add_argument("--benchmark", action="store_true", help="Compare segmenters and encoders on synthetic audio")
+    parser.add_argument("--seconds", type=float, default=60, help="Seconds of synthetic audio for --benchmark")
     args = parser.parse_args()
-    asyncio.run(main(args.message))
\ No newline at end of file
+    if args.benchmark:
+        benchmark(args)
+        sys.exit(0)
+    if args.serve:
+        if not args.socket:
+            parser.error("--serve requires --socket")
+        asyncio.run(serve(args))
+        sys.exit(0)
+    if not args.message:
+        parser.error("message is required")
+    if args.stream == "socket" and not args.socket:
+        parser.error("--stream socket requires --socket")
+    if args.segment_duration <= 0:
+        parser.error("--segment-duration must be positive")
+    if args.stream == "stdout":
+        # stdout carries the frames; keep other prints off it
+        sys.stdout = sys.stderr
+    asyncio.run(run(args))
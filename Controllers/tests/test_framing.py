@@ -0,0 +1,55 @@
+import asyncio
+import io
+import wave
+
+import pytest
+
+import audio
+from audio import FRAME_HEADER, FRAMERATE, SAMPWIDTH, Encoder, FakeLiveClient, FrameSink
+
+def parse_frames(data):
+    """Split a length-prefixed stream the way voiceController.js frameReader does."""
+    frames = []
+    while data:
+        assert len(data) >= FRAME_HEADER.size, "truncated frame header"
+        (length,) = FRAME_HEADER.unpack_from(data)
+        payload = data[FRAME_HEADER.size:FRAME_HEADER.size + length]
+        assert len(payload) == length, "header length does not match the payload"
+        frames.append(payload)
+        data = data[FRAME_HEADER.size + length:]
+    return frames
+
+@pytest.fixture(scope='module')
+def client():
+    return FakeLiveClient(seconds=1.5, speed=1000)
+
+def stream(client, segment_duration, encoder=None):
+    out = io.BytesIO()
+    asyncio.run(audio.main("hello", FrameSink(stream=out, encoder=encoder), segment_duration,
+                           first_immediately=True, client=client))
+    return parse_frames(out.getvalue())
+
+@pytest.mark.parametrize('segment_duration', [0.5, 0.7, 5.0])
+def test_frames_are_wav_and_end_with_an_empty_frame(client, segment_duration):
+    frames = stream(client, segment_duration)
+    assert frames[-1] == b''
+    assert all(frames[:-1])
+
+    pcm = b''
+    for payload in frames[:-1]:
+        with wave.open(io.BytesIO(payload)) as wf:
+            assert wf.getframerate() == FRAMERATE
+            pcm += wf.readframes(wf.getnframes())
+    # Every byte of the response arrives exactly once, in order
+    assert pcm == client.pcm
+
+def test_first_audio_is_sent_before_a_full_segment(client):
+    frames = stream(client, 5.0)
+    with wave.open(io.BytesIO(frames[0])) as wf:
+        assert wf.getnframes() * SAMPWIDTH == client.chunk_bytes
+
+def test_resampled_frames_declare_their_rate(client):
+    pytest.importorskip('audioop')
+    for payload in stream(client, 0.5, Encoder(16000, 'wav'))[:-1]:
+        with wave.open(io.BytesIO(payload)) as wf:
+            assert wf.getframerate() == 16000
@@ -0,0 +1,109 @@
+import asyncio
+import io
+import json
+import os
+import time
+import wave
+
+import pytest
+
+from audio import FRAME_HEADER, FakeLiveClient, Gateway
+
+@pytest.fixture(scope='module')
+def client():
+    return FakeLiveClient(seconds=1.0, speed=50)
+
+async def request(address, message="hello", **options):
+    """Send one voice request; return (frames, complete) once the gateway closes the connection."""
+    reader, writer = await asyncio.open_unix_connection(address)
+    writer.write((json.dumps({"message": message, **options}) + "\n").encode())
+    await writer.drain()
+    frames = []
+    try:
+        while True:
+            (length,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+            frames.append(await reader.readexactly(length))
+            if length == 0:
+                break
+    except asyncio.IncompleteReadError:
+        pass
+    writer.close()
+    complete = bool(frames) and frames[-1] == b''
+    return frames, complete
+
+def pcm_of(frames):
+    pcm = b''
+    for payload in frames:
+        if payload:
+            with wave.open(io.BytesIO(payload)) as wf:
+                pcm += wf.readframes(wf.getnframes())
+    return pcm
+
+def run_gateway(tmp_path, client, test, **limits):
+    address = str(tmp_path / 'gateway.sock')
+
+    async def scenario():
+        gateway = Gateway(client, **limits)
+        await gateway.start(address)
+        try:
+            return await test(gateway, address)
+        finally:
+            await gateway.shutdown(timeout=5)
+
+    return asyncio.run(scenario())
+
+def test_concurrent_sessions_get_their_own_streams(tmp_path, client):
+    async def test(gateway, address):
+        return await asyncio.gather(request(address, segment_duration=0.2),
+                                    request(address, segment_duration=0.3))
+
+    short, long = run_gateway(tmp_path, client, test, max_sessions=2)
+    for frames, complete in (short, long):
+        assert complete
+        assert pcm_of(frames) == client.pcm
+    # Each connection is cut with its own segment length
+    assert len(short[0]) > len(long[0])
+
+def test_requests_beyond_the_pending_limit_are_refused(tmp_path):
+    client = FakeLiveClient(seconds=1.0, speed=2)  # each session streams for 0.5 s
+
+    async def test(gateway, address):
+        running = asyncio.ensure_future(request(address))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(request(address))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        refused = await request(address)
+        refused_after = time.perf_counter() - start
+        return await running, await waiting, refused, refused_after
+
+    running, waiting, refused, refused_after = run_gateway(tmp_path, client, test, max_sessions=1, max_pending=1)
+    assert running[1] and waiting[1]
+    assert refused == ([], False)
+    # Closed straight away, not once a slot came free
+    assert refused_after < 0.2
+
+def test_free_slot_is_not_refused_without_pending_room(tmp_path, client):
+    async def test(gateway, address):
+        return await request(address)
+
+    frames, complete = run_gateway(tmp_path, client, test, max_sessions=1, max_pending=0)
+    assert complete
+
+def test_shutdown_cancels_long_sessions_and_removes_the_socket(tmp_path):
+    slow = FakeLiveClient(seconds=1.0, speed=0.05)  # 20 s of streaming
+    address = str(tmp_path / 'gateway.sock')
+
+    async def scenario():
+        gateway = Gateway(slow)
+        await gateway.start(address)
+        session = asyncio.ensure_future(request(address))
+        await asyncio.sleep(0.2)
+        start = time.perf_counter()
+        await gateway.shutdown(timeout=0.2)
+        return time.perf_counter() - start, await session
+
+    elapsed, (frames, complete) = asyncio.run(scenario())
+    assert elapsed < 2
+    assert not complete
+    assert not os.path.exists(address)
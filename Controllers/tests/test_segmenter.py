@@ -0,0 +1,77 @@
+import io
+import wave
+
+import pytest
+
+from audio import Encoder, FRAMERATE, NCHANNELS, SAMPWIDTH, Segmenter, concat_segments, synthetic_speech
+
+SEGMENT = 4800  # bytes: 0.1 s of 24 kHz 16-bit mono
+
+@pytest.fixture(scope='module')
+def pcm():
+    return synthetic_speech(1.3)
+
+def split(pcm, sizes):
+    """Cut pcm into chunks of the given sizes, repeating the pattern until it is used up."""
+    chunks, start, i = [], 0, 0
+    while start < len(pcm):
+        size = sizes[i % len(sizes)]
+        chunks.append(pcm[start:start + size])
+        start += size
+        i += 1
+    return chunks
+
+def segmenter_output(chunks, segment_bytes=SEGMENT):
+    # Copy each segment before the next feed(), as the memoryview rule requires
+    segmenter, segments = Segmenter(segment_bytes), []
+    for data in chunks:
+        for segment in segmenter.feed(data):
+            segments.append(bytes(segment))
+    return segments, bytes(segmenter.flush())
+
+def concat_output(chunks, segment_bytes=SEGMENT):
+    segments = list(concat_segments(chunks, segment_bytes))
+    # What the old loop sent as its final segment
+    return segments, b''.join(chunks)[len(segments) * segment_bytes:]
+
+@pytest.mark.parametrize('sizes', [
+    [960],                   # smaller than a segment
+    [SEGMENT],               # exactly one segment
+    [3 * SEGMENT + 1234],    # several segments per chunk
+    [1000, 5 * SEGMENT + 7], # a large chunk arriving while a partial segment is buffered
+    [SEGMENT - 1, 2, SEGMENT - 1],
+], ids=['smaller', 'equal', 'larger', 'large-after-partial', 'straddling'])
+def test_segments_match_concat(pcm, sizes):
+    chunks = split(pcm, sizes)
+    assert segmenter_output(chunks) == concat_output(chunks)
+
+def test_flush_after_exact_multiple_is_empty(pcm):
+    chunks = split(pcm[:4 * SEGMENT], [1500])
+    segments, rest = segmenter_output(chunks)
+    assert (segments, rest) == concat_output(chunks)
+    assert len(segments) == 4 and rest == b''
+
+def test_flush_resets_the_buffer(pcm):
+    segmenter = Segmenter(SEGMENT)
+    assert list(segmenter.feed(pcm[:100])) == []
+    assert bytes(segmenter.flush()) == pcm[:100]
+    assert len(segmenter) == 0
+    assert [bytes(s) for s in segmenter.feed(pcm[100:100 + SEGMENT])] == [pcm[100:100 + SEGMENT]]
+
+def wav_frames(payload):
+    with wave.open(io.BytesIO(payload)) as wf:
+        assert (wf.getnchannels(), wf.getsampwidth()) == (NCHANNELS, SAMPWIDTH)
+        return wf.getframerate(), wf.readframes(wf.getnframes())
+
+def test_resampling_is_continuous_across_segments(pcm):
+    audioop = pytest.importorskip('audioop')
+    encoder = Encoder(16000, 'wav')
+    segmenter, out = Segmenter(SEGMENT), []
+    for data in split(pcm, [1000, 7000]):
+        for segment in segmenter.feed(data):
+            out.append(wav_frames(encoder.encode(segment)))
+    out.append(wav_frames(encoder.encode(segmenter.flush())))
+
+    assert {rate for rate, _ in out} == {16000}
+    expected, _ = audioop.ratecv(pcm, SAMPWIDTH, NCHANNELS, FRAMERATE, 16000, None)
+    assert b''.join(frames for _, frames in out) == expected
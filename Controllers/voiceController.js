@@ -1,5 +1,5 @@
 import { spawn } from 'child_process';
-import fs from 'fs';
+import net from 'net';
 import path from 'path';
 import { fileURLToPath } from 'url';
 import { dirname } from 'path';
@@ -9,7 +9,81 @@ import vtt from '../Utils/voiceToText.js'
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
 
+// audio.py streams length-prefixed frames: a 4-byte big-endian length, then
+// that many bytes of WAV/FLAC; a zero-length frame ends the response.
+// Returns a 'data' handler calling onFrame per frame and onEnd at the end.
+function frameReader(onFrame, onEnd) {
+  let pending = Buffer.alloc(0);
+  return (data) => {
+    pending = pending.length ? Buffer.concat([pending, data]) : data;
+    while (pending.length >= 4) {
+      const length = pending.readUInt32BE(0);
+      if (pending.length < 4 + length) break;
+      const frame = pending.subarray(4, 4 + length);
+      pending = pending.subarray(4 + length);
+      if (length === 0) onEnd();
+      else onFrame(frame);
+    }
+  };
+}
+
+// One audio.py process per request; aborting signal kills it
+async function streamFromProcess(message, segmentDuration, onFrame, signal) {
+  const scriptPath = path.join(__dirname, 'audio.py');
+  // Optional payload shrinking: resample (e.g. 16000) and/or FLAC frames
+  const encoderArgs = [];
+  if (process.env.AUDIO_SAMPLE_RATE) encoderArgs.push('--sample-rate', process.env.AUDIO_SAMPLE_RATE);
+  if (process.env.AUDIO_CODEC) encoderArgs.push('--codec', process.env.AUDIO_CODEC);
+  const pythonProcess = spawn('python', [
+    scriptPath, '--stream', 'stdout', '--segment-duration', segmentDuration, ...encoderArgs, message,
+  ], { signal });
+
+  pythonProcess.stderr.on('data', (data) => {
+    console.error('Python Error:', data.toString());
+  });
+  pythonProcess.stdout.on('data', frameReader(onFrame, () => {}));
+
+  // Wait for Python script to exit
+  const exitCode = await new Promise((resolve, reject) => {
+    pythonProcess.on('error', reject);
+    pythonProcess.on('close', resolve);
+  });
+  if (exitCode !== 0) {
+    throw new Error(`audio.py exited with code ${exitCode}`);
+  }
+}
+
+// Long-lived voice gateway (python audio.py --serve --socket ADDRESS); one
+// connection per request, ADDRESS is a Unix socket path or host:port.
+// Aborting signal closes the connection, which frees the session slot.
+function streamFromGateway(address, request, onFrame, signal) {
+  return new Promise((resolve, reject) => {
+    const match = address.match(/^(.*):(\d+)$/);
+    const socket = match ? net.connect(Number(match[2]), match[1]) : net.connect(address);
+    signal?.addEventListener('abort', () => socket.destroy(new Error('Voice client disconnected')), { once: true });
+    let ended = false;
+    socket.on('connect', () => socket.write(JSON.stringify(request) + '\n'));
+    socket.on('data', frameReader(onFrame, () => {
+      ended = true;
+      socket.end();
+    }));
+    socket.on('error', reject);
+    socket.on('close', () => {
+      if (ended) resolve();
+      else reject(new Error('Voice gateway closed the stream early'));
+    });
+  });
+}
+
 export default async function voiceController(req, res) {
+  // Stop audio.py / the gateway session when the client goes away, so an
+  // abandoned request does not hold a live session. req emits 'close' as
+  // soon as the body has been read, so watch the response instead.
+  const disconnected = new AbortController();
+  res.on('close', () => {
+    if (!res.writableEnded) disconnected.abort();
+  });
+
   try {
     const systemPrompt = process.env.SYSTEM_PROMPT;
     let { userQuery , audio} = req.body;
@@ -27,50 +101,29 @@ export default async function voiceController(req, res) {
     res.setHeader('Cache-Control', 'no-cache');
     res.flushHeaders();
 
-    const audioDir = path.join(process.cwd(), 'audio');
-
-    // clear out any old audio segments
-  fs.readdirSync(audioDir)
-  .filter(f => f.endsWith('.wav'))
-  .forEach(f => fs.unlinkSync(path.join(audioDir, f)));
-
-    // Spawn the Python script
-    const scriptPath = path.join(__dirname, 'audio.py');
-    const pythonProcess = spawn('python', [scriptPath, `${systemPrompt} User: ${userQuery}`]);
-
-    pythonProcess.stderr.on('data', (data) => {
-      console.error('Python Error:', data.toString());
-    });
+    const segmentDuration = process.env.AUDIO_SEGMENT_SECONDS || '2';
+    const message = `${systemPrompt} User: ${userQuery}`;
 
-    // Directory to watch for segments
-    
     let nextIndex = 1;
-    let finalFound = false;
-
-    // Polling loop: check for files every 500ms
-    while (!finalFound) {
-      const fileName = `audio${nextIndex}.wav`;
-      const filePath = path.join(audioDir, fileName);
-      const finalPath = path.join(audioDir, 'final.wav');
-    
-      if (fs.existsSync(filePath)) {
-        const fileData = fs.readFileSync(filePath).toString('base64');
-        
-        // Send index + audio chunk as JSON
-        res.write(`event: audio\n`);
-        res.write(`data: ${JSON.stringify({ index: nextIndex, audio: fileData })}\n\n`);
-        
-        nextIndex += 1;
-      } else if (fs.existsSync(finalPath)) {
-        finalFound = true;
-      } else {
-        await new Promise((r) => setTimeout(r, 500));
-      }
-    }
-    
+    const sendFrame = (frame) => {
+      if (disconnected.signal.aborted) return;
+      // Send index + audio chunk as JSON as soon as the frame is complete
+      res.write(`event: audio\n`);
+      res.write(`data: ${JSON.stringify({ index: nextIndex, audio: frame.toString('base64') })}\n\n`);
+      nextIndex += 1;
+    };
 
-    // Wait for Python script to exit
-    await new Promise((resolve) => pythonProcess.on('close', resolve));
+    if (process.env.VOICE_GATEWAY) {
+      await streamFromGateway(process.env.VOICE_GATEWAY, {
+        message,
+        segment_duration: Number(segmentDuration),
+        ...(process.env.AUDIO_SAMPLE_RATE && { sample_rate: Number(process.env.AUDIO_SAMPLE_RATE) }),
+        ...(process.env.AUDIO_CODEC && { codec: process.env.AUDIO_CODEC }),
+      }, sendFrame, disconnected.signal);
+    } else {
+      await streamFromProcess(message, segmentDuration, sendFrame, disconnected.signal);
+    }
+    if (disconnected.signal.aborted) return;
 
     // send a final 'done' event
     res.write(`event: done\n`);
@@ -78,6 +131,10 @@ export default async function voiceController(req, res) {
     res.end(); 
 
   } catch (error) {
+    if (disconnected.signal.aborted) {
+      console.log('Voice client disconnected; stopped its audio stream');
+      return;
+    }
     console.error('Voice processing error:', error);
     if (!res.headersSent) {
       res.status(500).json({ error: 'Voice processing failed', details: error.message });
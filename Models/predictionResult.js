@@ -23,7 +23,7 @@ const predictionResultSchema = new mongoose.Schema({
   },
   riskLevel: {
     type: String,
-    enum: ['low', 'moderate', 'high'],
+    enum: ['normal', 'low', 'moderate', 'high'],
     required: true
   },
   modelUsed: {
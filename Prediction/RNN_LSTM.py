@@ -1,102 +1,80 @@
+import argparse
 import tensorflow as tf
+import distribute
+import fast_mode
 import pandas as pd
 import csv
 from datetime import datetime
 
-gpus = tf.config.list_physical_devices('GPU')
-if gpus:
-    try:
-        tf.config.experimental.set_visible_devices(gpus[0], 'GPU')
-        tf.config.experimental.set_memory_growth(gpus[0], True)
-        print(f"Using GPU: {gpus[0]}")
-    except RuntimeError as e:
-        print(e)
-
-from sklearn.model_selection import train_test_split
-
-df = pd.read_csv('Suicide_Detection.csv', index_col=0)
-
-df['class'] = df['class'].map({'suicide': 1, 'non-suicide': 0})
-
-train_df, test_df = train_test_split(df, test_size=0.5, random_state=42)
-
-def df_to_dataset(dataframe, shuffle=True, batch_size=32):
-    texts = dataframe['text'].values
-    labels = dataframe['class'].values
-    dataset = tf.data.Dataset.from_tensor_slices((texts, labels))
-    if shuffle:
-        dataset = dataset.shuffle(buffer_size=len(dataframe))
-    return dataset.batch(batch_size)
-
-batch_size = 32
-train_ds = df_to_dataset(train_df, shuffle=True, batch_size=batch_size)
-test_ds  = df_to_dataset(test_df, shuffle=False, batch_size=batch_size)
+parser = argparse.ArgumentParser(description="Train the suicide detection BiLSTM")
+parser.add_argument("--bucketing", action="store_true",
+                    help="Train on length-bucketed batches padded to their longest text (masks padding)")
+distribute.add_arguments(parser)
+fast_mode.add_arguments(parser)
+args = parser.parse_args()
+
+# Thread pools, GPU memory growth and the (optional) multi-replica strategy
+strategy = distribute.setup(args)
+# Opt-in XLA + bfloat16; must be enabled before any layer is built
+jit_compile = fast_mode.enable()['jit_compile'] if args.fast else False
+
+from bilstm import build_core, build_model, build_vectorizer, compile_model, training_callbacks, with_vectorizer
+from bucketing import bucket_dataset
+from data_loader import class_counts, make_dataset, text_dataset
+from export_tflite import export_tflite
+
+# Stream the CSV in chunks with a hash-based train/test split and a bounded
+# shuffle buffer, so memory stays flat as the corpus grows.
+# 32 rows per replica; the global batch grows with the number of replicas
+batch_size = distribute.global_batch_size(strategy, 32)
+train_ds = make_dataset(split='train', batch_size=batch_size, shuffle=True)
+test_ds  = make_dataset(split='test', batch_size=batch_size, shuffle=False)
 
 max_features = 20000
 sequence_length = 250
-vectorize_layer = tf.keras.layers.TextVectorization(
-    max_tokens=max_features,
-    output_mode='int',
-    output_sequence_length=sequence_length)
+vectorize_layer = build_vectorizer(max_features, sequence_length)
 
-train_text = train_df['text'].tolist()
-vectorize_layer.adapt(train_text)
+vectorize_layer.adapt(text_dataset(split='train'))
 
-class_counts = df['class'].value_counts()
-print(f"Class distribution:\n{class_counts}")
-total = len(df)
-print(f"Class balance: {class_counts[1]/total:.2f} suicide, {class_counts[0]/total:.2f} non-suicide")
+counts = class_counts()
+print(f"Class distribution: {counts[1]} suicide, {counts[0]} non-suicide")
+total = counts[0] + counts[1]
+print(f"Class balance: {counts[1]/total:.2f} suicide, {counts[0]/total:.2f} non-suicide")
+
+def to_token_dataset(dataset):
+    """Vectorize text batches, drop each row's padding and re-batch rows of similar length."""
+    def trim(ids, label):
+        # Token ids are non-zero up to the padding, so the count is the text's length
+        length = tf.maximum(tf.math.count_nonzero(ids, output_type=tf.int32), 1)
+        return ids[:length], label
+    tokens = dataset.map(lambda text, label: (vectorize_layer(text), label)).unbatch()
+    return bucket_dataset(tokens.map(trim, num_parallel_calls=tf.data.AUTOTUNE), batch_size)
 
 embedding_dim = 64 
-model = tf.keras.Sequential([
-    tf.keras.layers.Input(shape=(1,), dtype=tf.string),
-    vectorize_layer,
-    tf.keras.layers.Embedding(max_features, embedding_dim, mask_zero=False),
-    tf.keras.layers.SpatialDropout1D(0.3),  
-    tf.keras.layers.BatchNormalization(),
-    tf.keras.layers.Bidirectional(tf.keras.layers.LSTM(32, return_sequences=True, 
-                                                      kernel_regularizer=tf.keras.regularizers.L2(0.01))),
-    tf.keras.layers.BatchNormalization(),
-    tf.keras.layers.Dropout(0.5),
-    tf.keras.layers.Bidirectional(tf.keras.layers.LSTM(16,  # Reduced from 32
-                                                      kernel_regularizer=tf.keras.regularizers.L2(0.01))),
-    tf.keras.layers.BatchNormalization(),
-    tf.keras.layers.Dropout(0.5),
-    tf.keras.layers.Dense(32, activation='relu',  
-                         kernel_regularizer=tf.keras.regularizers.L2(0.01)),
-    tf.keras.layers.BatchNormalization(),
-    tf.keras.layers.Dropout(0.5),
-    tf.keras.layers.Dense(1, activation='sigmoid')
-])
-
-model.summary()
-
-model.compile(
-    loss='binary_crossentropy',
-    optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
-    metrics=[
-        'accuracy', 
-        tf.keras.metrics.Precision(name='precision'),
-        tf.keras.metrics.Recall(name='recall'),
-        tf.keras.metrics.AUC(name='auc')
-    ]
-)
+with strategy.scope():
+    if args.bucketing:
+        # Train the int-input core on bucketed batches; masking makes its output
+        # independent of padding, so the saved model pads to sequence_length as before.
+        core = build_core(max_features, embedding_dim)
+        train_model, fit_train_ds, fit_test_ds = core, to_token_dataset(train_ds), to_token_dataset(test_ds)
+    else:
+        model = build_model(vectorize_layer, max_features, embedding_dim)
+        train_model, fit_train_ds, fit_test_ds = model, train_ds, test_ds
+
+    compile_model(train_model, jit_compile=jit_compile)
 
-callbacks = [
-    tf.keras.callbacks.EarlyStopping(
-        monitor='val_loss', patience=3, restore_best_weights=True),
-    tf.keras.callbacks.ReduceLROnPlateau(
-        monitor='val_loss', factor=0.5, patience=2, min_lr=0.00001)
-]
+train_model.summary()
 
-history = model.fit(
-    train_ds, 
+callbacks = training_callbacks()
+
+history = train_model.fit(
+    fit_train_ds, 
     epochs=5, 
-    validation_data=test_ds,
+    validation_data=fit_test_ds,
     callbacks=callbacks
 )
 
-loss, accuracy, precision, recall, auc = model.evaluate(test_ds)
+loss, accuracy, precision, recall, auc = train_model.evaluate(fit_test_ds)
 eval_metrics = [loss, accuracy, precision, recall, auc]
 print(f"Test Loss: {loss:.4f}")
 print(f"Test Accuracy: {accuracy:.4f}")
@@ -127,15 +105,25 @@ def save_training_metrics(history, eval_metrics, filepath=None):
     
     print(f"Training metrics saved to {filepath}")
 
-save_training_metrics(history, eval_metrics)
+if distribute.is_chief():
+    save_training_metrics(history, eval_metrics)
+
+if args.bucketing:
+    with strategy.scope():
+        model = compile_model(with_vectorizer(vectorize_layer, core))
 
-model_save_path = './suicide_detection_model.keras'  
-saved_model_path = './suicide_detection_model_saved'  
+# Every multi-worker process must save; only the chief writes the real paths
+model_save_path = distribute.output_path('./suicide_detection_model.keras')
+saved_model_path = distribute.output_path('./suicide_detection_model_saved')
 model.save(model_save_path)
 model.export(saved_model_path)  
 print(f"Model saved to {model_save_path}")
 print(f"Model exported as SavedModel to {saved_model_path}")
 
+# Slim CPU inference artifact: int-input network as TFLite plus its vocabulary
+if distribute.is_chief():
+    export_tflite(model)
+
 import matplotlib.pyplot as plt
 
 def plot_metrics(history):
@@ -155,4 +143,5 @@ def plot_metrics(history):
     plt.savefig('training_metrics.png')
     plt.show()
 
-plot_metrics(history)
+if distribute.is_chief():
+    plot_metrics(history)
@@ -0,0 +1,99 @@
+import argparse
+import re
+import pandas as pd
+from datetime import datetime
+
+import distribute
+from bilstm import build_model, build_vectorizer, compile_model, devanagari_standardize, training_callbacks
+from data_loader import iter_rows, rows_dataset, split_of
+
+# Trains a BiLSTM that reads English and Devanagari (Marathi/Hindi) text
+# directly, so predict_marathi.py can score without a translation round-trip.
+#
+# The Devanagari side comes from one or more parallel/translated corpora with
+# the same 'text','class' columns as Suicide_Detection.csv, e.g. a Marathi
+# translation of a subset of it. Every corpus is streamed through data_loader
+# with its hash-based train/test split, so English rows land on the same side
+# of the split as in RNN_LSTM.py and test_model.py.
+
+parser = argparse.ArgumentParser(description="Train the Devanagari-aware suicide detection model")
+parser.add_argument("--english-csv", default="Suicide_Detection.csv", help="English corpus with 'text','class' columns")
+parser.add_argument("--parallel-csv", nargs="+", required=True,
+                    help="Translated/parallel Devanagari corpora with 'text','class' columns")
+parser.add_argument("--english-fraction", type=float, default=1.0,
+                    help="Fraction of the English corpus to mix in (keeps the Devanagari share meaningful)")
+parser.add_argument("--max-features", type=int, default=40000,
+                    help="Vocabulary size (Devanagari inflections need more room than English alone)")
+parser.add_argument("--epochs", type=int, default=5)
+parser.add_argument("--output", default="./suicide_detection_model_multilingual.keras")
+args = parser.parse_args()
+
+distribute.configure_gpu()
+
+DEVANAGARI = re.compile('[\u0900-\u097F]')
+
+def iter_corpus(split, script=None):
+    """
+    (text, label) rows of every corpus in a split, streamed chunk by chunk.
+
+    Args:
+        split: 'train' or 'test'
+        script: None for all rows, 'english' or 'devanagari' for one slice
+    """
+    for path in [args.english_csv] + args.parallel_csv:
+        for text, label in iter_rows(path, split=split):
+            # A stable hash subsample, so the English share is the same every epoch
+            if (path == args.english_csv and args.english_fraction < 1.0
+                    and split_of(text, args.english_fraction, salt='english-fraction') != 'test'):
+                continue
+            if script is not None and bool(DEVANAGARI.search(text)) != (script == 'devanagari'):
+                continue
+            yield text, label
+
+def corpus_dataset(split, script=None, shuffle=False, batch_size=32):
+    return rows_dataset(lambda: iter_corpus(split, script), batch_size, shuffle)
+
+train_rows = devanagari_rows = 0
+for text, _ in iter_corpus('train'):
+    train_rows += 1
+    devanagari_rows += bool(DEVANAGARI.search(text))
+print(f"Training rows: {train_rows} ({devanagari_rows} Devanagari)")
+
+batch_size = 32
+train_ds = corpus_dataset('train', shuffle=True, batch_size=batch_size)
+test_ds = corpus_dataset('test', batch_size=batch_size)
+
+sequence_length = 250
+vectorize_layer = build_vectorizer(args.max_features, sequence_length, standardize=devanagari_standardize)
+vectorize_layer.adapt(corpus_dataset('train', batch_size=1024).map(lambda text, label: text))
+
+model = build_model(vectorize_layer, args.max_features)
+model.summary()
+compile_model(model)
+
+history = model.fit(
+    train_ds,
+    epochs=args.epochs,
+    validation_data=test_ds,
+    callbacks=training_callbacks()
+)
+
+# Report English and Devanagari slices separately: a good overall score can
+# hide a weak Devanagari side when English rows dominate the mix.
+for name, script in [('all', None), ('english', 'english'), ('devanagari', 'devanagari')]:
+    rows = sum(1 for _ in iter_corpus('test', script))
+    if rows == 0:
+        continue
+    loss, accuracy, precision, recall, auc = model.evaluate(corpus_dataset('test', script), verbose=0)
+    print(f"[{name}] n={rows} Loss: {loss:.4f} Accuracy: {accuracy:.4f} "
+          f"Precision: {precision:.4f} Recall: {recall:.4f} AUC: {auc:.4f}")
+
+timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+metrics_path = f'training_metrics_multilingual_{timestamp}.csv'
+df_hist = pd.DataFrame(history.history)
+df_hist['epoch'] = df_hist.index + 1
+df_hist.to_csv(metrics_path, index=False)
+print(f"Training history saved to {metrics_path}")
+
+model.save(args.output)
+print(f"Model saved to {args.output}")
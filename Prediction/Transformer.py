@@ -1,106 +1,95 @@
+import argparse
 import os
 import numpy as np
 import pandas as pd
 import tensorflow as tf
 from datetime import datetime
-from sklearn.model_selection import train_test_split
 from sklearn.utils.class_weight import compute_class_weight
-from sklearn.metrics import precision_recall_curve, classification_report
-from transformers import BertTokenizer, TFBertForSequenceClassification
+from sklearn.metrics import classification_report
+from transformers import BertTokenizerFast, TFBertForSequenceClassification
 
-# 1. Load & preprocess ------------------------------------------------------
+import distribute
+import evaluation
+import fast_mode
+import token_cache
+from bucketing import DEFAULT_BOUNDARIES
 
-# Load CSV (assumes 'Suicide_Detection.csv' with columns 'text','class')
-df = pd.read_csv('Suicide_Detection.csv', index_col=0)
+parser = argparse.ArgumentParser(description="Fine-tune BERT for suicide detection")
+distribute.add_arguments(parser)
+fast_mode.add_arguments(parser)
+args = parser.parse_args()
 
-# Map string labels to integers immediately
-df['class'] = df['class'].map({'suicide': 1, 'non-suicide': 0})
-if set(df['class'].unique()) != {0, 1}:
-    raise ValueError("Label mapping failed; check your CSV 'class' column.")
+MODEL_NAME = 'bert-base-uncased'
+MAX_LENGTH = 128
+tokenizer = BertTokenizerFast.from_pretrained(MODEL_NAME)
 
-# 2. Stratified train/validation split --------------------------------------
+# 1. Load & tokenize ---------------------------------------------------------
 
-train_df, val_df = train_test_split(
-    df,
-    test_size=0.1,
-    stratify=df['class'],
-    random_state=42
-)
+# 'Suicide_Detection.csv' (columns 'text','class') is streamed in chunks by
+# data_loader and tokenized once into memory-mapped arrays by token_cache
+# (run `python token_cache.py` to build them ahead of time). Later runs with
+# the same tokenizer, max_length and CSV reuse the cache.
 
-print(f"Train size: {len(train_df)}, Val size: {len(val_df)}")
-print("Train class counts:\n", train_df['class'].value_counts())
+# 2. Deterministic train/validation split ----------------------------------
+
+# Rows are split by a stable hash of their text: the same split the other
+# training scripts and test_model.py use.
+train_cache = token_cache.get_or_build(tokenizer, MAX_LENGTH, split='train')
+val_cache = token_cache.get_or_build(tokenizer, MAX_LENGTH, split='test')
+
+# Thread pools, GPU memory growth and the (optional) multi-replica strategy.
+# Set up after the caches so local multi-worker runs share one cache build.
+strategy = distribute.setup(args)
+# Opt-in XLA + bfloat16; must be enabled before the model is built
+jit_compile = fast_mode.enable()['jit_compile'] if args.fast else False
+
+train_labels = np.asarray(train_cache['labels'])
+val_labels = np.asarray(val_cache['labels']).astype(int)
+if set(np.unique(train_labels)) != {0, 1}:
+    raise ValueError("Label mapping failed; check your CSV 'class' column.")
+
+print(f"Train size: {len(train_labels)}, Val size: {len(val_labels)}")
+print("Train class counts:\n", pd.Series(train_labels).value_counts())
 
 # 3. Oversampling minority class --------------------------------------------
 
-num_pos = int(train_df['class'].sum())
-num_neg = len(train_df) - num_pos
+num_pos = int(train_labels.sum())
+num_neg = len(train_labels) - num_pos
 
 if num_pos == 0:
     raise ValueError("No positive (suicide) examples in training set.")
-# Compute how many times to duplicate positives
+# Compute how many times to repeat positives
 oversample_factor = max(1, num_neg // num_pos)
 
-pos_df = train_df[train_df['class'] == 1]
-neg_df = train_df[train_df['class'] == 0]
-augmented_pos = pd.concat([pos_df] * oversample_factor, ignore_index=True)
-
-# Combine & shuffle
-train_df_bal = pd.concat([neg_df, augmented_pos]) \
-                   .sample(frac=1, random_state=42) \
-                   .reset_index(drop=True)
+# Positives are repeated by index, so each row is tokenized and stored once
+train_indices = token_cache.oversampled_indices(train_labels, oversample_factor, seed=42)
 
-print(f"Balanced train size: {len(train_df_bal)} (negatives: {len(neg_df)}, positives: {len(augmented_pos)})")
+print(f"Balanced train size: {len(train_indices)} (negatives: {num_neg}, positives: {num_pos * oversample_factor})")
 
 # 4. Compute class weights --------------------------------------------------
 
 class_weights = compute_class_weight(
     class_weight='balanced',
     classes=np.array([0, 1]),
-    y=train_df_bal['class'].values
+    y=train_labels[train_indices]
 )
 class_weight_dict = {0: class_weights[0], 1: class_weights[1]}
 print("Class weights:", class_weight_dict)
 
-# 5. Tokenization ------------------------------------------------------------
-
-MODEL_NAME = 'bert-base-uncased'
-tokenizer = BertTokenizer.from_pretrained(MODEL_NAME)
-
-def encode_texts(texts, max_length=128):
-    return tokenizer(
-        texts.tolist(),
-        padding=True,
-        truncation=True,
-        max_length=max_length,
-        return_tensors='tf'
-    )
+# 5. tf.data datasets -------------------------------------------------------
 
-train_enc = encode_texts(train_df_bal['text'])
-val_enc   = encode_texts(val_df['text'])
+# 16 rows per replica; the global batch grows with the number of replicas
+batch_size = distribute.global_batch_size(strategy, 16)
 
-train_labels = tf.convert_to_tensor(train_df_bal['class'].values)
-val_labels   = tf.convert_to_tensor(val_df['class'].values)
+# Rows are bucketed by token length and each batch is padded only to its own
+# longest row, instead of every row paying for MAX_LENGTH.
+train_ds = token_cache.make_dataset(train_cache, train_indices, batch_size, shuffle=True,
+                                    boundaries=DEFAULT_BOUNDARIES)
+val_ds = token_cache.make_dataset(val_cache, batch_size=batch_size)
 
-# 6. tf.data datasets -------------------------------------------------------
+# 6. Model & training setup -------------------------------------------------
 
-batch_size = 16
-
-train_ds = tf.data.Dataset.from_tensor_slices((
-    dict(train_enc),
-    train_labels
-)).shuffle(buffer_size=1000) \
- .batch(batch_size) \
- .prefetch(tf.data.AUTOTUNE)
-
-val_ds = tf.data.Dataset.from_tensor_slices((
-    dict(val_enc),
-    val_labels
-)).batch(batch_size) \
- .prefetch(tf.data.AUTOTUNE)
-
-# 7. Model & training setup -------------------------------------------------
-
-with tf.device('/GPU:0' if tf.config.list_physical_devices('GPU') else '/CPU:0'):
+with strategy.scope():
     model = TFBertForSequenceClassification.from_pretrained(
         MODEL_NAME,
         num_labels=1,       # single output for sigmoid
@@ -117,7 +106,8 @@ with tf.device('/GPU:0' if tf.config.list_physical_devices('GPU') else '/CPU:0')
             tf.keras.metrics.AUC(name='auc'),
             tf.keras.metrics.Precision(name='precision'),
             tf.keras.metrics.Recall(name='recall')
-        ]
+        ],
+        jit_compile=jit_compile
     )
 
 callbacks = [
@@ -134,7 +124,7 @@ callbacks = [
     )
 ]
 
-# 8. Fine-tune the model ----------------------------------------------------
+# 7. Fine-tune the model ----------------------------------------------------
 
 history = model.fit(
     train_ds,
@@ -144,41 +134,39 @@ history = model.fit(
     callbacks=callbacks
 )
 
-# 9. Threshold tuning -------------------------------------------------------
+# 8. Threshold tuning -------------------------------------------------------
 
 # Predict logits on validation set
-val_logits = model.predict(val_ds).logits.flatten()
+val_logits = model.predict(val_ds).logits.astype(np.float32).flatten()
 val_probs = tf.sigmoid(val_logits).numpy()
 
-precision, recall, thresholds = precision_recall_curve(
-    val_df['class'], val_probs
-)
-# Choose threshold achieving ~90% recall
+# One vectorized sweep gives the recall-targeted thresholds, PR/ROC curves
+# and confusion matrices; the JSON report is kept next to the model.
 target_recall = 0.90
-idx = np.where(recall >= target_recall)[0]
-if len(idx) > 0:
-    best_thresh = thresholds[idx[-1]]
-else:
-    best_thresh = 0.5
+eval_report = evaluation.build_report(val_labels, val_probs, target_recalls=(0.80, target_recall, 0.95))
+best_thresh = evaluation.recall_threshold(eval_report, target_recall)
 print(f"Chosen probability threshold for {target_recall*100:.0f}% recall: {best_thresh:.3f}")
 
-# 10. Evaluation on validation (or out-of-domain) ---------------------------
+# 9. Evaluation on validation (or out-of-domain) ---------------------------
 
-val_preds = (val_probs >= best_thresh).astype(int)
-print(classification_report(val_df['class'], val_preds, digits=4))
+val_preds = (val_probs > best_thresh).astype(int)
+print(classification_report(val_labels, val_preds, digits=4))
+evaluation.print_summary(eval_report)
 
-# 11. Save model & tokenizer ------------------------------------------------
+# 10. Save model & tokenizer ------------------------------------------------
 
-OUTPUT_DIR = './suicide_bert_model'
+OUTPUT_DIR = distribute.output_path('./suicide_bert_model')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 model.save_pretrained(OUTPUT_DIR)
 tokenizer.save_pretrained(OUTPUT_DIR)
 
 print(f"Model and tokenizer saved to {OUTPUT_DIR}")
+if distribute.is_chief():
+    evaluation.write_report(eval_report, os.path.join(OUTPUT_DIR, 'evaluation_report.json'))
 
-# 12. Inference utility -----------------------------------------------------
+# 11. Inference utility -----------------------------------------------------
 
-def predict_texts(text_list, threshold=best_thresh, max_length=128):
+def predict_texts(text_list, threshold=best_thresh, max_length=MAX_LENGTH):
     enc = tokenizer(
         text_list,
         padding=True,
@@ -186,9 +174,9 @@ def predict_texts(text_list, threshold=best_thresh, max_length=128):
         max_length=max_length,
         return_tensors='tf'
     )
-    logits = model(enc).logits.numpy().flatten()
+    logits = tf.cast(model(enc).logits, tf.float32).numpy().flatten()
     probs = tf.sigmoid(logits).numpy()
-    preds = (probs >= threshold).astype(int)
+    preds = (probs > threshold).astype(int)
     return probs, preds
 
 # Example usage
@@ -201,7 +189,7 @@ if __name__ == "__main__":
     for text, p, label in zip(examples, probs, preds):
         print(f"\"{text}\" → prob={p:.3f}, suicide_flag={bool(label)}")
 
-# 13. (Optional) Save training history --------------------------------------
+# 12. (Optional) Save training history --------------------------------------
 
 def save_training_metrics(history, filepath=None):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -213,5 +201,6 @@ def save_training_metrics(history, filepath=None):
     df_hist.to_csv(filepath, index=False)
     print(f"Training history saved to {filepath}")
 
-save_training_metrics(history)
+if distribute.is_chief():
+    save_training_metrics(history)
 
@@ -0,0 +1,130 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import metrics
+
+# --- Dynamic Micro-Batching ---
+# Requests arriving close together (chat-path bursts, detector sweeps) are
+# merged so the model runs one forward pass per batch instead of per text.
+
+_STOP = object()
+
+class MicroBatcher:
+    """
+    Collects submitted texts into small batches for a single scoring function.
+
+    A batch is dispatched as soon as it holds max_batch_size texts, or when the
+    oldest queued text has waited max_delay_ms, whichever comes first.
+
+    Args:
+        predict_fn: Callable taking a list of texts and returning one result per text
+        max_batch_size: Largest batch passed to predict_fn
+        max_delay_ms: Longest time a request waits for the batch to fill
+        name: Label for this batcher's queue depth, batch size and wait metrics
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_delay_ms=5, name="default"):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        """Queue a text for scoring and return a Future for its result."""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def submit_many(self, texts):
+        """Queue several texts; returns a Future resolving to the list of results."""
+        return gather([self.submit(text) for text in texts])
+
+    def close(self):
+        """Stop accepting requests, finish queued work and stop the worker."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def _collect(self, first):
+        """Gather up to max_batch_size requests, waiting at most max_delay after the first."""
+        batch = [first]
+        stop = False
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stop = self._collect(item)
+            metrics.set_gauge('queue_depth', self._queue.qsize(), queue=self.name)
+
+            # Drop requests whose callers cancelled them while queued
+            batch = [(text, future, queued) for text, future, queued in batch
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            dispatched = time.perf_counter()
+            for _, _, queued in batch:
+                metrics.observe('queue_wait_seconds', dispatched - queued, queue=self.name)
+            metrics.observe('batch_size', len(batch), buckets=metrics.SIZE_BUCKETS, queue=self.name)
+
+            try:
+                results = self.predict_fn([text for text, _, _ in batch])
+            except Exception as e:
+                metrics.inc('errors_total', stage='predict', queue=self.name)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+def gather(futures):
+    """Return a Future that resolves to the results of all given futures, in order."""
+    combined = Future()
+    if not futures:
+        combined.set_result([])
+        return combined
+
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] > 0:
+                return
+        try:
+            combined.set_result([f.result() for f in futures])
+        except Exception as e:
+            combined.set_exception(e)
+
+    for future in futures:
+        future.add_done_callback(on_done)
+    return combined
@@ -0,0 +1,252 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from predict import DEFAULT_MODEL_PATHS, timed
+
+# --- Inference Benchmark Suite ---
+# Measures every backend and model variant the prediction layer can serve:
+# cold start (interpreter + import + model load + first inference), single-
+# text p50/p95/p99 latency, throughput at several batch sizes and text
+# lengths, and peak RSS. Each variant runs in a fresh process so cold start
+# and memory are not flattered by an earlier variant. Inputs are synthetic,
+# seeded English and Devanagari corpora, so runs are comparable across
+# commits without the dataset. Results go to benchmarks/<commit>_<time>.json;
+# compare two runs with --compare OLD.json NEW.json.
+
+RESULTS_DIR = './benchmarks'
+LENGTHS = {'short': (5, 15), 'medium': (30, 60), 'long': (150, 300)}
+BATCH_SIZES = [1, 8, 32, 128]
+
+# name -> how to load it; variants whose model file is missing are skipped
+VARIANTS = {
+    'keras': {'backend': 'keras'},
+    'keras-fast': {'backend': 'keras', 'fast': True},
+    'tflite': {'backend': 'tflite'},
+    'tflite-float16': {'backend': 'tflite', 'quantization': 'float16'},
+    'tflite-int8': {'backend': 'tflite', 'quantization': 'int8'},
+    'distilled': {'backend': 'keras', 'model_path': './suicide_detection_model_distilled.keras'},
+    'marathi-native': {'loader': 'native', 'model_path': './suicide_detection_model_multilingual.keras',
+                       'corpus': 'devanagari'},
+    'bert': {'loader': 'bert', 'model_path': './suicide_bert_model'},
+}
+
+ENGLISH_WORDS = (
+    "i you we they feel felt today tomorrow work school friend family home alone tired happy sad "
+    "anymore nobody everything nothing point life want need help talk sleep night day week good bad "
+    "really just so very never always again think know going trying hard better worse hope lost "
+    "weekend movie book game music dinner call text message thanks sorry okay maybe please"
+).split()
+DEVANAGARI_WORDS = (
+    "मी तू आम्ही ते आज उद्या काम शाळा मित्र घर एकटा थकलो आनंदी दुःखी आता कोणी सगळं काहीच नाही "
+    "आयुष्य हवं मदत बोलायचं झोप रात्र दिवस आठवडा चांगलं वाईट खूप फक्त कधीच नेहमी पुन्हा वाटतं "
+    "माहित प्रयत्न कठीण आशा हरवलो चित्रपट पुस्तक गाणं जेवण फोन धन्यवाद माफ ठीक कदाचित कृपया"
+).split()
+
+def synthetic_corpus(language='english', length='short', size=512, seed=0):
+    """Seeded random texts of one length class in English or Devanagari (Marathi) words."""
+    words = DEVANAGARI_WORDS if language == 'devanagari' else ENGLISH_WORDS
+    low, high = LENGTHS[length]
+    rng = random.Random(f"{language}:{length}:{seed}")
+    texts = []
+    for _ in range(size):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(low, high)))
+        texts.append(text[0].upper() + text[1:] + rng.choice(['.', '!', '?', '...']))
+    return texts
+
+def variant_model_path(spec):
+    """Model file a variant loads."""
+    if spec.get('model_path'):
+        return spec['model_path']
+    if spec.get('quantization'):
+        from tflite_backend import variant_path
+        return variant_path(spec['quantization'])
+    return DEFAULT_MODEL_PATHS[spec['backend']]
+
+def load_variant(spec, batch_size=32):
+    """Import the runtime and load one variant; returns an object predict.predict_proba accepts."""
+    loader = spec.get('loader')
+    if loader == 'native':
+        from predict_marathi import load_native_model
+        return load_native_model(spec['model_path'])
+    if loader == 'bert':
+        from transformers import BertTokenizerFast, TFBertForSequenceClassification
+        from distill import TeacherPredictor
+        return TeacherPredictor(TFBertForSequenceClassification.from_pretrained(spec['model_path']),
+                                BertTokenizerFast.from_pretrained(spec['model_path']))
+    from predict import load_predictor
+    return load_predictor(spec['backend'], variant_model_path(spec), quantization=spec.get('quantization'),
+                          fast=spec.get('fast', False), batch_size=batch_size)
+
+def import_runtime(spec):
+    if spec.get('loader') == 'bert':
+        import transformers  # noqa: F401
+    from predict import import_backend
+    import_backend(spec.get('backend', 'keras'))
+
+def latency_percentiles(model, texts, repeats):
+    """Single-text latency percentiles in milliseconds."""
+    from predict import predict_proba
+
+    latencies = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        predict_proba(model, [texts[i % len(texts)]], batch_size=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {f"p{q}_ms": float(np.percentile(latencies, q)) for q in (50, 95, 99)}
+
+def throughput(model, texts, batch_size, batches):
+    """Texts per second when scoring `batches` batches of batch_size."""
+    from predict import predict_proba
+
+    texts = (texts * (batch_size * batches // len(texts) + 1))[:batch_size * batches]
+    start = time.perf_counter()
+    predict_proba(model, texts, batch_size=batch_size)
+    return len(texts) / (time.perf_counter() - start)
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_variant(name, args):
+    """Benchmark one variant in this process, writing the startup line then the result as JSON lines."""
+    spec = VARIANTS[name]
+    language = spec.get('corpus', 'english')
+    timings = {}
+    # Loading chatter goes to stderr; stdout carries the two JSON lines for the parent
+    out, sys.stdout = sys.stdout, sys.stderr
+    with timed(timings, 'import'):
+        import_runtime(spec)
+    with timed(timings, 'model_load'):
+        model = load_variant(spec, batch_size=max(args.batch_sizes))
+    if model is None:
+        sys.exit(1)
+    corpora = {length: synthetic_corpus(language, length, seed=args.seed) for length in LENGTHS}
+    from predict import predict_proba
+    with timed(timings, 'first_inference'):
+        predict_proba(model, corpora['short'][:1], batch_size=1)
+    out.write(json.dumps({'startup': timings}) + "\n")
+    out.flush()
+
+    result = {
+        'variant': name,
+        'model_path': variant_model_path(spec),
+        'language': language,
+        'startup': timings,
+        'latency': {length: latency_percentiles(model, texts, args.repeats) for length, texts in corpora.items()},
+        'throughput_per_s': {
+            length: {str(b): throughput(model, texts, b, args.batches) for b in args.batch_sizes}
+            for length, texts in corpora.items()
+        },
+    }
+    result['peak_rss_mb'] = peak_rss_mb()
+    out.write(json.dumps(result) + "\n")
+    out.flush()
+
+def measure(name, args):
+    """Run one variant in a fresh process; cold start is wall time until its first inference."""
+    command = [sys.executable, os.path.abspath(__file__), '--run-variant', name,
+               '--repeats', str(args.repeats), '--batches', str(args.batches), '--seed', str(args.seed),
+               '--batch-sizes', *map(str, args.batch_sizes)]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    first = process.stdout.readline()
+    cold_start = time.perf_counter() - start
+    rest = process.stdout.read()
+    if process.wait() != 0 or not first:
+        print(f"{name}: failed (exit {process.returncode})")
+        return None
+    result = json.loads(rest.strip().splitlines()[-1])
+    result['cold_start_s'] = cold_start
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def print_result(result):
+    latency = result['latency']['short']
+    best = max(result['throughput_per_s']['short'].values())
+    print(f"{result['variant']:>15}: cold start {result['cold_start_s']:.2f} s  "
+          f"short p50/p95/p99 {latency['p50_ms']:.2f}/{latency['p95_ms']:.2f}/{latency['p99_ms']:.2f} ms  "
+          f"best {best:.0f} texts/s  peak RSS {result['peak_rss_mb']:.0f} MB")
+
+def compare(old_path, new_path):
+    """Print per-variant ratios between two result files (new / old)."""
+    with open(old_path) as f:
+        old = {r['variant']: r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = {r['variant']: r for r in json.load(f)['results']}
+    for name in sorted(old.keys() & new.keys()):
+        o, n = old[name], new[name]
+        ratios = {
+            'cold_start': n['cold_start_s'] / o['cold_start_s'],
+            'p50_short': n['latency']['short']['p50_ms'] / o['latency']['short']['p50_ms'],
+            'throughput_short_32': (n['throughput_per_s']['short'].get('32', 0) /
+                                    max(o['throughput_per_s']['short'].get('32', 0), 1e-9)),
+            'peak_rss': n['peak_rss_mb'] / o['peak_rss_mb'],
+        }
+        print(f"{name:>15}: " + "  ".join(f"{key} x{value:.2f}" for key, value in ratios.items()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction backends and model variants")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS),
+                        help="Variants to run (missing model files are skipped)")
+    parser.add_argument("--repeats", type=int, default=200, help="Single-text calls per length")
+    parser.add_argument("--batches", type=int, default=10, help="Batches per throughput measurement")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic corpus seed")
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/<commit>_<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    parser.add_argument("--run-variant", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.run_variant:
+        run_variant(args.run_variant, args)
+        return
+
+    results = []
+    for name in args.variants:
+        path = variant_model_path(VARIANTS[name])
+        if not os.path.exists(path):
+            print(f"{name}: skipped ({path} not found)")
+            continue
+        result = measure(name, args)
+        if result is not None:
+            results.append(result)
+            print_result(result)
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{commit}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'host': {'platform': platform.platform(), 'python': platform.python_version(),
+                     'cpus': os.cpu_count()},
+            'settings': {'repeats': args.repeats, 'batches': args.batches,
+                         'batch_sizes': args.batch_sizes, 'seed': args.seed},
+            'results': results,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
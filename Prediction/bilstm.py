@@ -0,0 +1,94 @@
+import tensorflow as tf
+
+# --- BiLSTM Classifier ---
+# Shared by RNN_LSTM.py (English model) and RNN_LSTM_multilingual.py
+# (Devanagari-aware model) so both train the same architecture.
+
+# ASCII punctuation stripped by TextVectorization's default standardizer,
+# plus the Devanagari danda and double danda used as sentence terminators.
+DEVANAGARI_PUNCTUATION = r'[!"#$%&()\*\+,\-\./:;<=>?@\[\\\]^_`{|}~\'।॥]'
+
+@tf.keras.utils.register_keras_serializable(package='MentalLLM')
+def devanagari_standardize(text):
+    """Lowercase Latin text and strip punctuation without touching Devanagari letters or vowel signs."""
+    text = tf.strings.lower(text, encoding='utf-8')
+    return tf.strings.regex_replace(text, DEVANAGARI_PUNCTUATION, ' ')
+
+def build_vectorizer(max_features=20000, sequence_length=250, standardize='lower_and_strip_punctuation'):
+    """Create the TextVectorization layer (call .adapt() on training text before use)."""
+    return tf.keras.layers.TextVectorization(
+        max_tokens=max_features,
+        standardize=standardize,
+        output_mode='int',
+        output_sequence_length=sequence_length)
+
+def classifier_layers(max_features=20000, embedding_dim=64, mask_zero=False):
+    """
+    The layers that follow the vectorizer.
+
+    With mask_zero=True the LSTMs skip padding, so a model's output no longer
+    depends on how far a text was padded (needed for length-bucketed batches).
+    """
+    return [
+        tf.keras.layers.Embedding(max_features, embedding_dim, mask_zero=mask_zero),
+        tf.keras.layers.SpatialDropout1D(0.3),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Bidirectional(tf.keras.layers.LSTM(32, return_sequences=True,
+                                                          kernel_regularizer=tf.keras.regularizers.L2(0.01))),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Dropout(0.5),
+        tf.keras.layers.Bidirectional(tf.keras.layers.LSTM(16,  # Reduced from 32
+                                                          kernel_regularizer=tf.keras.regularizers.L2(0.01))),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Dropout(0.5),
+        tf.keras.layers.Dense(32, activation='relu',
+                             kernel_regularizer=tf.keras.regularizers.L2(0.01)),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Dropout(0.5),
+        # float32 output keeps the sigmoid stable under a mixed-precision policy
+        tf.keras.layers.Dense(1, activation='sigmoid', dtype='float32')
+    ]
+
+def build_model(vectorize_layer, max_features=20000, embedding_dim=64, mask_zero=False):
+    """Build the BiLSTM classifier on top of an adapted vectorize_layer."""
+    return tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(1,), dtype=tf.string),
+        vectorize_layer,
+    ] + classifier_layers(max_features, embedding_dim, mask_zero))
+
+def build_core(max_features=20000, embedding_dim=64, mask_zero=True):
+    """Build the classifier on token ids of any length, for training on pre-vectorized batches."""
+    return tf.keras.Sequential(
+        [tf.keras.layers.Input(shape=(None,), dtype='int64')]
+        + classifier_layers(max_features, embedding_dim, mask_zero))
+
+def with_vectorizer(vectorize_layer, core):
+    """String-input model sharing core's weights, in the same shape as build_model's."""
+    return tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(1,), dtype=tf.string),
+        vectorize_layer,
+    ] + list(core.layers))
+
+def compile_model(model, learning_rate=0.001, jit_compile=False):
+    """Compile with the loss and metrics used by the training scripts (jit_compile: XLA train steps)."""
+    model.compile(
+        loss='binary_crossentropy',
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        metrics=[
+            'accuracy',
+            tf.keras.metrics.Precision(name='precision'),
+            tf.keras.metrics.Recall(name='recall'),
+            tf.keras.metrics.AUC(name='auc')
+        ],
+        jit_compile=jit_compile
+    )
+    return model
+
+def training_callbacks():
+    """Early stopping and LR schedule used by the training scripts."""
+    return [
+        tf.keras.callbacks.EarlyStopping(
+            monitor='val_loss', patience=3, restore_best_weights=True),
+        tf.keras.callbacks.ReduceLROnPlateau(
+            monitor='val_loss', factor=0.5, patience=2, min_lr=0.00001)
+    ]
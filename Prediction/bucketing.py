@@ -0,0 +1,80 @@
+import numpy as np
+
+# --- Length Bucketing ---
+# Chat messages are mostly a few dozen tokens, but padding every row to the
+# global sequence length makes each batch pay for the longest possible text.
+# These helpers group rows of similar length so each batch is padded only to
+# its own longest row. Shared by RNN_LSTM.py (int token datasets),
+# Transformer.py (token_cache batches) and the TFLite batch predictor.
+
+DEFAULT_BOUNDARIES = (16, 32, 64, 128, 192)
+
+def bucket_of(lengths, boundaries=DEFAULT_BOUNDARIES):
+    """Bucket index of each length: lengths <= boundaries[i] fall in bucket i."""
+    return np.searchsorted(np.asarray(boundaries), np.asarray(lengths), side='left')
+
+def bucket_batches(lengths, batch_size, boundaries=DEFAULT_BOUNDARIES, shuffle=False, seed=None):
+    """
+    Split row indices into batches whose rows share a length bucket.
+
+    Args:
+        lengths: Length of each row (tokens)
+        batch_size: Maximum rows per batch
+        boundaries: Ascending bucket upper bounds
+        shuffle: Shuffle rows within buckets and the order of batches
+        seed: Shuffle seed (vary it per epoch)
+
+    Returns:
+        List of index arrays, one per batch
+    """
+    lengths = np.asarray(lengths)
+    buckets = bucket_of(lengths, boundaries)
+    rng = np.random.default_rng(seed)
+    batches = []
+    for bucket in np.unique(buckets):
+        rows = np.flatnonzero(buckets == bucket)
+        if shuffle:
+            rng.shuffle(rows)
+        else:
+            # Without shuffling, sort within the bucket so batches are as tight as possible
+            rows = rows[np.argsort(lengths[rows], kind='stable')]
+        batches.extend(rows[start:start + batch_size] for start in range(0, len(rows), batch_size))
+    if shuffle:
+        order = rng.permutation(len(batches))
+        batches = [batches[i] for i in order]
+    return batches
+
+def length_order(lengths):
+    """Indices that sort rows by length, and the inverse permutation to restore input order."""
+    order = np.argsort(np.asarray(lengths), kind='stable')
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    return order, inverse
+
+def trim_batch(*arrays, lengths):
+    """Cut right-padded (batch, max_length) arrays down to the longest row in the batch."""
+    longest = max(int(np.max(lengths)), 1) if len(lengths) else 1
+    return tuple(array[:, :longest] for array in arrays)
+
+def bucket_dataset(dataset, batch_size, boundaries=DEFAULT_BOUNDARIES, length_fn=None):
+    """
+    Batch an unbatched tf.data dataset of (token_ids, label) by sequence length.
+
+    Each batch is zero-padded to its own longest sequence.
+
+    Args:
+        dataset: Unbatched dataset of (1-D int token ids, label)
+        batch_size: Rows per batch in every bucket
+        boundaries: Ascending bucket upper bounds
+        length_fn: Maps an element to its length (default: len of the token ids)
+    """
+    import tensorflow as tf
+
+    if length_fn is None:
+        length_fn = lambda ids, label: tf.shape(ids)[0]
+    return dataset.bucket_by_sequence_length(
+        element_length_func=length_fn,
+        bucket_boundaries=[b + 1 for b in boundaries],
+        bucket_batch_sizes=[batch_size] * (len(boundaries) + 1),
+        pad_to_bucket_boundary=False,
+    ).prefetch(tf.data.AUTOTUNE)
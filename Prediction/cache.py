@@ -0,0 +1,156 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# --- Prediction Cache ---
+# The sweep and the chat path keep re-scoring identical text (unchanged
+# conversations with a new timestamp, repeated greetings). Probabilities are
+# cached under a hash of the normalized text plus the model version, first in
+# an in-memory LRU and optionally in a size-bounded SQLite file.
+#
+# Normalization only folds what every model the daemon serves ignores anyway:
+# ASCII case (TextVectorization's tf.strings.lower is ASCII-only) and runs of
+# ASCII whitespace (its split step). Anything that can change a score, such
+# as Unicode case, NFKC forms or non-ASCII spaces, stays part of the key.
+
+# Bumped whenever normalize_text changes, so on-disk entries keyed the old
+# way are never matched
+KEY_FORMAT = 2
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+_ASCII_WHITESPACE = re.compile(r'[ \t\n\r\f\v]+')
+
+def normalize_text(text):
+    """Normalize text the way it is keyed: ASCII lowercase, collapsed ASCII whitespace."""
+    return _ASCII_WHITESPACE.sub(' ', text.translate(_ASCII_LOWER)).strip(' ')
+
+def model_version(model_path):
+    """Identify a model file by a hash of its contents (short hex digest)."""
+    digest = hashlib.sha256()
+    if os.path.isdir(model_path):
+        for root, _, files in sorted(os.walk(model_path)):
+            for name in sorted(files):
+                with open(os.path.join(root, name), 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(block)
+    else:
+        with open(model_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+class PredictionCache:
+    """
+    Two-tier cache of model probabilities keyed by normalized text hash.
+
+    Args:
+        version: Model version id mixed into every key
+        max_entries: Capacity of the in-memory LRU tier (0 disables it)
+        db_path: Optional SQLite file for the on-disk tier
+        max_db_rows: Row limit of the on-disk tier; least recently used rows are evicted
+    """
+
+    def __init__(self, version, max_entries=10000, db_path=None, max_db_rows=1000000):
+        self.version = version
+        self.max_entries = max_entries
+        self.max_db_rows = max_db_rows
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, probability REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS predictions_accessed ON predictions (accessed)")
+            self._db.commit()
+            self._db_rows = self._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def key(self, text):
+        """Cache key for a text under the current model version."""
+        payload = f"{KEY_FORMAT}\0{self.version}\0{normalize_text(text)}".encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, text):
+        """Return the cached probability for text, or None on a miss."""
+        key = self.key(text)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                metrics.inc('cache_lookups_total', result='hit_memory')
+                return self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT probability FROM predictions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE predictions SET accessed = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self.hits_disk += 1
+                    metrics.inc('cache_lookups_total', result='hit_disk')
+                    self._remember(key, row[0])
+                    return row[0]
+
+            self.misses += 1
+            metrics.inc('cache_lookups_total', result='miss')
+            return None
+
+    def put(self, text, probability):
+        """Store the probability for text in every enabled tier."""
+        key = self.key(text)
+        probability = float(probability)
+        with self._lock:
+            self._remember(key, probability)
+            if self._db is not None:
+                inserted = self._db.execute(
+                    "INSERT OR IGNORE INTO predictions (key, probability, accessed) VALUES (?, ?, ?)",
+                    (key, probability, time.time()),
+                ).rowcount
+                self._db_rows += inserted
+                if self._db_rows > self.max_db_rows:
+                    self._evict_db(self._db_rows - self.max_db_rows)
+                self._db.commit()
+
+    def stats(self):
+        """Hit/miss counters for both tiers."""
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._db_rows if self._db is not None else 0,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key, probability):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = probability
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_db(self, count):
+        self._db.execute(
+            "DELETE FROM predictions WHERE key IN "
+            "(SELECT key FROM predictions ORDER BY accessed LIMIT ?)",
+            (count,),
+        )
+        self._db_rows -= count
@@ -0,0 +1,226 @@
+import argparse
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+import metrics
+from data_loader import CSV_PATH, iter_chunks
+from predict import load_predictor, predict_proba
+
+# --- Two-Stage Cascade Scorer ---
+# Most chat traffic is clearly benign, yet every message ran the full model.
+# The cascade scores everything with a hashed word n-gram linear model (tens
+# of microseconds per text) and only forwards texts whose first-stage
+# probability lands inside the uncertainty band (low, high) to the BiLSTM or
+# BERT second stage. Below the band a text is answered as benign, above it as
+# at risk, both without touching the heavy model.
+#
+#   python cascade.py --train                 fit the first stage on the train split
+#   python cascade.py --evaluate              pick the band on the test split so
+#                                             recall does not drop below the full model's
+# serve.py loads the first stage with --cascade and --cascade-band.
+
+FILTER_PATH = './suicide_detection_filter.joblib'
+DEFAULT_BAND = (0.05, 0.99)
+# Lower band edges tried by --evaluate, widest filtering first
+CANDIDATE_LOWS = [0.5, 0.4, 0.3, 0.2, 0.1, 0.05, 0.02, 0.01, 0.005, 0.001]
+
+class NgramFilter:
+    """
+    Hashed word uni/bigram logistic regression: the cascade's cheap first stage.
+
+    Hashing needs no vocabulary, so the model trains in one streaming pass
+    over the CSV chunks and its size is fixed by n_features.
+    """
+
+    def __init__(self, n_features=2 ** 20, ngram_range=(1, 2), alpha=1e-6):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+
+        self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=ngram_range,
+                                            alternate_sign=False, norm='l2')
+        self.classifier = SGDClassifier(loss='log_loss', alpha=alpha, random_state=42)
+
+    def fit(self, csv_path=CSV_PATH, epochs=3):
+        """Train on the train split, one CSV chunk at a time."""
+        for epoch in range(epochs):
+            rows = 0
+            for chunk in iter_chunks(csv_path, split='train'):
+                features = self.vectorizer.transform(chunk['text'].tolist())
+                self.classifier.partial_fit(features, chunk['class'].values, classes=np.array([0, 1]))
+                rows += len(chunk)
+            print(f"Epoch {epoch + 1}/{epochs}: {rows} rows")
+        return self
+
+    def predict_proba(self, texts, batch_size=None):
+        """1-D array of probabilities, one per text."""
+        if len(texts) == 0:
+            return np.zeros(0, dtype=np.float32)
+        features = self.vectorizer.transform(list(texts))
+        return self.classifier.predict_proba(features)[:, 1].astype(np.float32)
+
+    def save(self, path=FILTER_PATH):
+        import joblib
+        joblib.dump(self, path)
+        print(f"First stage saved to {path}")
+
+    @staticmethod
+    def load(path=FILTER_PATH):
+        import joblib
+        return joblib.load(path)
+
+class CascadeScorer:
+    """
+    First stage on everything, second stage only inside the uncertainty band.
+
+    Usable anywhere predict.py expects a model. Thread-safe statistics: the
+    daemon scores on its batcher thread and reads stats from the main thread.
+
+    Args:
+        first_stage: Cheap model with predict_proba (e.g. NgramFilter)
+        second_stage: Any model predict.predict_proba accepts
+        low: First-stage probabilities <= low are answered as benign
+        high: First-stage probabilities >= high are answered as at risk
+    """
+
+    def __init__(self, first_stage, second_stage, low=DEFAULT_BAND[0], high=DEFAULT_BAND[1]):
+        if not 0 <= low < high <= 1:
+            raise ValueError(f"Invalid uncertainty band ({low}, {high})")
+        self.first_stage = first_stage
+        self.second_stage = second_stage
+        self.low = low
+        self.high = high
+        self._lock = threading.Lock()
+        self._counts = {"texts": 0, "stage1_benign": 0, "stage1_risky": 0, "stage2": 0}
+        self._seconds = {"stage1": 0.0, "stage2": 0.0}
+
+    def predict_proba(self, texts, batch_size=32):
+        """1-D array of probabilities; second-stage scores replace first-stage ones inside the band."""
+        texts = list(texts)
+        start = time.perf_counter()
+        with metrics.span('cascade_stage1'):
+            probabilities = np.array(self.first_stage.predict_proba(texts), dtype=np.float32)
+        stage1_seconds = time.perf_counter() - start
+
+        benign = int(np.sum(probabilities <= self.low))
+        uncertain = np.flatnonzero((probabilities > self.low) & (probabilities < self.high))
+        stage2_seconds = 0.0
+        if len(uncertain):
+            start = time.perf_counter()
+            probabilities[uncertain] = predict_proba(self.second_stage, [texts[i] for i in uncertain], batch_size)
+            stage2_seconds = time.perf_counter() - start
+
+        with self._lock:
+            self._counts["texts"] += len(texts)
+            self._counts["stage1_benign"] += benign
+            self._counts["stage1_risky"] += len(texts) - benign - len(uncertain)
+            self._counts["stage2"] += len(uncertain)
+            self._seconds["stage1"] += stage1_seconds
+            self._seconds["stage2"] += stage2_seconds
+        return probabilities
+
+    def stats(self):
+        """Per-stage hit rates and mean latency per text scored by that stage."""
+        with self._lock:
+            counts = dict(self._counts)
+            seconds = dict(self._seconds)
+        total = counts["texts"]
+        resolved = counts["stage1_benign"] + counts["stage1_risky"]
+        return {
+            "band": [self.low, self.high],
+            **counts,
+            "stage1_hit_rate": resolved / total if total else None,
+            "stage2_rate": counts["stage2"] / total if total else None,
+            "stage1_ms_per_text": seconds["stage1"] * 1000 / total if total else None,
+            "stage2_ms_per_text": seconds["stage2"] * 1000 / counts["stage2"] if counts["stage2"] else None,
+        }
+
+def cascade_probabilities(first, second, low, high):
+    """Cascade output given both stages' probabilities for the same texts (for offline tuning)."""
+    uncertain = (first > low) & (first < high)
+    return np.where(uncertain, second, first), uncertain
+
+def evaluate(first_stage, second_stage, csv_path=CSV_PATH, low=None, high=DEFAULT_BAND[1], threshold=0.5):
+    """
+    Compare the cascade against the second stage alone on the test split.
+
+    With low=None the widest band edge whose recall matches the second stage
+    alone is chosen from CANDIDATE_LOWS.
+
+    Returns:
+        Report dict; report["ok"] is False if the cascade loses recall
+    """
+    from quantize import classification_metrics
+    from test_model import prepare_test_data
+
+    test_df = prepare_test_data(csv_path)
+    texts = test_df['text'].tolist()
+    y_true = test_df['class'].values.astype(int)
+
+    first = first_stage.predict_proba(texts)
+    second = predict_proba(second_stage, texts, batch_size=256)
+    baseline = classification_metrics(y_true, second, threshold)
+
+    candidates = []
+    for candidate in ([low] if low is not None else CANDIDATE_LOWS):
+        combined, uncertain = cascade_probabilities(first, second, candidate, high)
+        candidates.append({
+            "band": [candidate, high],
+            "stage2_rate": float(np.mean(uncertain)) if len(texts) else 0.0,
+            **classification_metrics(y_true, combined, threshold),
+        })
+    keeping_recall = [c for c in candidates if c["recall"] >= baseline["recall"]]
+    chosen = keeping_recall[0] if keeping_recall else candidates[-1]
+
+    return {
+        "test_rows": len(texts),
+        "threshold": threshold,
+        "second_stage_only": baseline,
+        "first_stage_only": classification_metrics(y_true, first, threshold),
+        "candidates": candidates,
+        "chosen": chosen,
+        "ok": bool(keeping_recall),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and evaluate the two-stage cascade scorer")
+    parser.add_argument("--train", action="store_true", help="Fit the n-gram first stage on the train split")
+    parser.add_argument("--evaluate", action="store_true", help="Check cascade recall on the test split")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--filter-path", default=FILTER_PATH)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras", help="Second-stage backend")
+    parser.add_argument("--model-path", default=None, help="Second-stage model (BiLSTM or distilled student)")
+    parser.add_argument("--low", type=float, default=None, help="Fixed lower band edge (default: pick one)")
+    parser.add_argument("--high", type=float, default=DEFAULT_BAND[1])
+    parser.add_argument("--report", default="cascade_report.json")
+    args = parser.parse_args()
+    if not (args.train or args.evaluate):
+        parser.error("nothing to do: pass --train and/or --evaluate")
+
+    if args.train:
+        NgramFilter().fit(args.csv, args.epochs).save(args.filter_path)
+
+    if args.evaluate:
+        second_stage = load_predictor(args.backend, args.model_path)
+        if second_stage is None:
+            sys.exit(1)
+        report = evaluate(NgramFilter.load(args.filter_path), second_stage, args.csv, args.low, args.high)
+        for candidate in report["candidates"]:
+            print(f"band {candidate['band']}: {candidate['stage2_rate']:.1%} to stage 2, "
+                  f"recall {candidate['recall']:.4f}, precision {candidate['precision']:.4f}")
+        print(f"Second stage alone: recall {report['second_stage_only']['recall']:.4f}")
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.report}")
+        if not report["ok"]:
+            print("Cascade recall regresses against the second stage alone")
+            sys.exit(1)
+        low, high = report["chosen"]["band"]
+        print(f"Use: python serve.py --cascade {args.filter_path} --cascade-band {low} {high}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+# --- Streaming Dataset Loader ---
+# Shared by RNN_LSTM.py, Transformer.py, test_model.py and the tools built on
+# them. The CSV is read in fixed-size chunks and never held in memory as a
+# whole; rows are assigned to train/test by a stable hash of their text, so
+# every script sees the same split without a global train_test_split, and
+# the split does not move when rows are appended to the corpus.
+
+CSV_PATH = 'Suicide_Detection.csv'
+LABELS = {'suicide': 1, 'non-suicide': 0}
+TEST_FRACTION = 0.2
+CHUNK_SIZE = 10000
+
+def split_of(text, test_fraction=TEST_FRACTION, salt='mentalllm'):
+    """Deterministically assign a text to 'train' or 'test' by hashing it."""
+    digest = hashlib.md5(f"{salt}:{text}".encode('utf-8')).digest()
+    bucket = int.from_bytes(digest[:8], 'big') / 2 ** 64
+    return 'test' if bucket < test_fraction else 'train'
+
+def source_fingerprint(csv_path=CSV_PATH, split=None, test_fraction=TEST_FRACTION):
+    """Short hash identifying a split of a CSV as it is on disk (path, size, mtime), for cache keys."""
+    stat = os.stat(csv_path)
+    source = f"{os.path.abspath(csv_path)}:{stat.st_size}:{stat.st_mtime_ns}:{split}:{test_fraction}"
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:12]
+
+def iter_chunks(csv_path=CSV_PATH, split=None, test_fraction=TEST_FRACTION, chunksize=CHUNK_SIZE):
+    """
+    Yield DataFrame chunks with 'text' (str) and 'class' (0/1) columns.
+
+    Args:
+        csv_path: Dataset CSV with 'text' and 'class' columns
+        split: 'train', 'test' or None for all rows
+        test_fraction: Share of rows hashed into the test split
+        chunksize: Rows read from disk per chunk
+    """
+    for chunk in pd.read_csv(csv_path, usecols=['text', 'class'], chunksize=chunksize):
+        chunk = chunk.dropna(subset=['text'])
+        chunk['text'] = chunk['text'].astype(str)
+        chunk['class'] = chunk['class'].map(LABELS)
+        chunk = chunk.dropna(subset=['class'])
+        chunk['class'] = chunk['class'].astype(np.int64)
+        if split is not None:
+            in_split = chunk['text'].map(lambda t: split_of(t, test_fraction)) == split
+            chunk = chunk[in_split]
+        if len(chunk):
+            yield chunk
+
+def iter_rows(csv_path=CSV_PATH, split=None, test_fraction=TEST_FRACTION, chunksize=CHUNK_SIZE):
+    """Yield (text, label) pairs of a split, one chunk in memory at a time."""
+    for chunk in iter_chunks(csv_path, split, test_fraction, chunksize):
+        yield from zip(chunk['text'].tolist(), chunk['class'].tolist())
+
+def load_split(csv_path=CSV_PATH, split=None, test_fraction=TEST_FRACTION, chunksize=CHUNK_SIZE):
+    """Materialize a split as a DataFrame (for evaluation sets and tools that need random access)."""
+    chunks = list(iter_chunks(csv_path, split, test_fraction, chunksize))
+    if not chunks:
+        return pd.DataFrame({'text': pd.Series(dtype=str), 'class': pd.Series(dtype=np.int64)})
+    return pd.concat(chunks, ignore_index=True)
+
+def class_counts(csv_path=CSV_PATH, split=None, test_fraction=TEST_FRACTION, chunksize=CHUNK_SIZE):
+    """Count rows per class without loading the dataset: {0: n_negative, 1: n_positive}."""
+    counts = {0: 0, 1: 0}
+    for chunk in iter_chunks(csv_path, split, test_fraction, chunksize):
+        for label, n in chunk['class'].value_counts().items():
+            counts[int(label)] += int(n)
+    return counts
+
+def make_dataset(csv_path=CSV_PATH, split='train', batch_size=32, shuffle=True, shuffle_buffer=10000,
+                 test_fraction=TEST_FRACTION, chunksize=CHUNK_SIZE, seed=42):
+    """
+    Streaming tf.data pipeline of (text, label) batches.
+
+    Memory is bounded by one CSV chunk plus shuffle_buffer rows, regardless of
+    corpus size, and batches are prefetched while the model trains.
+
+    Args:
+        csv_path: Dataset CSV
+        split: 'train', 'test' or None
+        batch_size: Rows per batch
+        shuffle: Shuffle within a bounded buffer (off for evaluation)
+        shuffle_buffer: Rows held in the shuffle buffer
+        test_fraction: Share of rows hashed into the test split
+        chunksize: Rows read from disk per chunk
+        seed: Shuffle seed
+    """
+    return rows_dataset(lambda: iter_rows(csv_path, split, test_fraction, chunksize),
+                        batch_size, shuffle, shuffle_buffer, seed)
+
+def rows_dataset(rows, batch_size=32, shuffle=True, shuffle_buffer=10000, seed=42):
+    """
+    make_dataset() over any (text, label) rows, e.g. several corpora chained.
+
+    Args:
+        rows: Callable returning a fresh iterator of (text, label) pairs per epoch
+        batch_size, shuffle, shuffle_buffer, seed: As for make_dataset()
+    """
+    import tensorflow as tf
+
+    dataset = tf.data.Dataset.from_generator(
+        rows,
+        output_signature=(
+            tf.TensorSpec(shape=(), dtype=tf.string),
+            tf.TensorSpec(shape=(), dtype=tf.int64),
+        ),
+    )
+    if shuffle:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+def text_dataset(csv_path=CSV_PATH, split='train', batch_size=1024, test_fraction=TEST_FRACTION):
+    """Streaming batches of texts only, e.g. for TextVectorization.adapt()."""
+    return make_dataset(csv_path, split, batch_size=batch_size, shuffle=False,
+                        test_fraction=test_fraction).map(lambda text, label: text)
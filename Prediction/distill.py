@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import types
+
+import numpy as np
+import tensorflow as tf
+
+import token_cache
+from bilstm import build_model, build_vectorizer, compile_model, training_callbacks
+from cache import model_version
+from data_loader import CSV_PATH, iter_rows, text_dataset
+from predict import predict_proba
+from quantize import classification_metrics, measure_latency
+
+# --- Knowledge Distillation: BERT teacher -> BiLSTM student ---
+# Transformer.py's BERT model is accurate but heavy; RNN_LSTM.py's BiLSTM is
+# cheap but weaker. This trains the BiLSTM architecture on the teacher's soft
+# labels (its logits, softened by a temperature) mixed with the hard labels.
+# Teacher logits are computed once per (teacher, token cache) and stored next
+# to the token cache, so re-running with other student settings is cheap.
+# The student is a regular string-input Keras model: the predictor, the
+# TFLite export and the daemon load it like the production BiLSTM.
+
+TEACHER_DIR = './suicide_bert_model'
+STUDENT_PATH = './suicide_detection_model_distilled.keras'
+
+class TeacherPredictor:
+    """The BERT teacher behind the predict_proba interface, for latency comparisons."""
+
+    def __init__(self, model, tokenizer, max_length=128):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+
+    def predict_proba(self, texts, batch_size=32):
+        probabilities = []
+        for start in range(0, len(texts), batch_size):
+            enc = self.tokenizer(list(texts[start:start + batch_size]), padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors='tf')
+            logits = tf.cast(self.model(enc).logits, tf.float32)
+            probabilities.append(tf.sigmoid(logits).numpy().reshape(-1))
+        return np.concatenate(probabilities) if probabilities else np.zeros(0, dtype=np.float32)
+
+def teacher_logits(teacher, tokenizer, split, teacher_dir=TEACHER_DIR, max_length=128,
+                   csv_path=CSV_PATH, batch_size=64):
+    """
+    Teacher logits for every row of a split, in data_loader order, cached on disk.
+
+    The cache file is keyed by the teacher's weights, so a retrained teacher
+    is scored afresh.
+
+    Returns:
+        1-D float32 array, one logit per row
+    """
+    cache = token_cache.get_or_build(tokenizer, max_length, csv_path, split)
+    cache_dir = os.path.join(token_cache.CACHE_ROOT,
+                             token_cache.cache_key(tokenizer.name_or_path, max_length, split, csv_path))
+    path = os.path.join(cache_dir, f"teacher_{model_version(teacher_dir)}.npy")
+    if os.path.exists(path):
+        print(f"Using cached teacher logits {path}")
+        return np.load(path)
+
+    print(f"Scoring the {split} split with the teacher")
+    dataset = token_cache.make_dataset(cache, batch_size=batch_size)
+    logits = teacher.predict(dataset.map(lambda features, label: features)).logits
+    logits = np.asarray(logits, dtype=np.float32).reshape(-1)
+    np.save(path, logits)
+    return logits
+
+def distillation_loss(alpha=0.5, temperature=2.0):
+    """
+    Blend of hard-label BCE and temperature-softened BCE against the teacher.
+
+    y_true carries [hard label, teacher logit]; y_pred is the student's sigmoid
+    output, turned back into a logit so both sides can be softened alike.
+    """
+    def loss(y_true, y_pred):
+        hard = y_true[:, :1]
+        teacher = y_true[:, 1:]
+        y_pred = tf.clip_by_value(tf.cast(y_pred, tf.float32), 1e-7, 1 - 1e-7)
+        student = tf.math.log(y_pred) - tf.math.log1p(-y_pred)
+        soft_loss = tf.keras.losses.binary_crossentropy(
+            tf.sigmoid(teacher / temperature), tf.sigmoid(student / temperature))
+        hard_loss = tf.keras.losses.binary_crossentropy(hard, y_pred)
+        return alpha * hard_loss + (1 - alpha) * soft_loss * temperature ** 2
+    return loss
+
+def student_dataset(logits, split, csv_path=CSV_PATH, batch_size=32, shuffle=True):
+    """Streaming (text, [label, teacher logit]) batches aligned with the cached logits."""
+    def rows():
+        for (text, label), logit in zip(iter_rows(csv_path, split), logits):
+            yield text, np.array([label, logit], dtype=np.float32)
+
+    dataset = tf.data.Dataset.from_generator(rows, output_signature=(
+        tf.TensorSpec(shape=(), dtype=tf.string),
+        tf.TensorSpec(shape=(2,), dtype=tf.float32),
+    ))
+    if shuffle:
+        dataset = dataset.shuffle(10000, seed=42, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the BERT classifier into a BiLSTM student")
+    parser.add_argument("--teacher", default=TEACHER_DIR, help="Directory written by Transformer.py")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--max-length", type=int, default=128, help="Teacher tokens per text")
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--alpha", type=float, default=0.5, help="Weight of the hard-label loss")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--max-features", type=int, default=20000)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--baseline", default="./suicide_detection_model.keras",
+                        help="Production BiLSTM to include in the report, if present")
+    parser.add_argument("--output", default=STUDENT_PATH)
+    parser.add_argument("--report", default="distillation_report.json")
+    args = parser.parse_args()
+
+    from transformers import BertTokenizerFast, TFBertForSequenceClassification
+
+    tokenizer = BertTokenizerFast.from_pretrained(args.teacher)
+    teacher = TFBertForSequenceClassification.from_pretrained(args.teacher)
+    train_logits = teacher_logits(teacher, tokenizer, 'train', args.teacher, args.max_length, args.csv)
+    test_logits = teacher_logits(teacher, tokenizer, 'test', args.teacher, args.max_length, args.csv)
+
+    # --- Train the student ---
+    vectorize_layer = build_vectorizer(args.max_features, 250)
+    vectorize_layer.adapt(text_dataset(args.csv, split='train'))
+    student = build_model(vectorize_layer, args.max_features)
+    student.compile(
+        loss=distillation_loss(args.alpha, args.temperature),
+        optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
+    )
+    student.fit(
+        student_dataset(train_logits, 'train', args.csv),
+        epochs=args.epochs,
+        validation_data=student_dataset(test_logits, 'test', args.csv, shuffle=False),
+        callbacks=training_callbacks()
+    )
+    # Recompile with the standard loss so the saved file loads without distill.py
+    compile_model(student)
+    student.save(args.output)
+    print(f"Student saved to {args.output}")
+
+    # --- Report: teacher vs student (vs the current BiLSTM) on the test split ---
+    texts, labels = zip(*iter_rows(args.csv, 'test'))
+    texts, y_true = list(texts), np.array(labels)
+    candidates = [
+        ("teacher_bert", TeacherPredictor(teacher, tokenizer, args.max_length), 1 / (1 + np.exp(-test_logits))),
+        ("student_bilstm", student, None),
+    ]
+    if os.path.exists(args.baseline):
+        import bilstm  # noqa: F401  registers custom standardizers used by saved models
+        candidates.append(("baseline_bilstm", tf.keras.models.load_model(args.baseline), None))
+
+    report = {"teacher": args.teacher, "student": args.output, "test_rows": len(texts),
+              "threshold": args.threshold, "temperature": args.temperature, "alpha": args.alpha, "models": []}
+    for name, model, probabilities in candidates:
+        predictor = model if hasattr(model, 'predict_proba') else types.SimpleNamespace(
+            predict_proba=lambda batch, batch_size=32, model=model: predict_proba(model, batch, batch_size))
+        if probabilities is None:
+            probabilities = predictor.predict_proba(texts, batch_size=256)
+        entry = {
+            "model": name,
+            **classification_metrics(y_true, probabilities, args.threshold),
+            **measure_latency(predictor, texts, repeats=100),
+        }
+        report["models"].append(entry)
+        print(f"{name:>16}: recall {entry['recall']:.4f}  precision {entry['precision']:.4f}  "
+              f"f1 {entry['f1']:.4f}  p50 {entry['p50_ms']:.2f} ms  {entry['throughput_per_s']:.0f} texts/s")
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
+    print(f"Serve the student with: python predict.py --model-path {args.output}")
+
+if __name__ == "__main__":
+    main()
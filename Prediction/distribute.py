@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import tensorflow as tf
+
+# --- Multi-core / Multi-worker Training ---
+# The training scripts used to assume one device. On CPU build boxes that
+# leaves most cores idle, so this adds three knobs shared by RNN_LSTM.py and
+# Transformer.py:
+#   --intra-op-threads / --inter-op-threads  TensorFlow's thread pools
+#   --strategy mirrored --workers N          N CPU replicas in one process
+#                                            (or all local GPUs)
+#   --strategy multiworker --workers N       N local worker processes under
+#                                            MultiWorkerMirroredStrategy
+# Run `python distribute.py --benchmark` for epoch time vs worker count.
+
+STRATEGIES = ['default', 'mirrored', 'multiworker']
+
+def add_arguments(parser):
+    """Add the distribution and threading flags to a training script's parser."""
+    group = parser.add_argument_group("distribution")
+    group.add_argument("--strategy", choices=STRATEGIES, default="default",
+                       help="default: one device; mirrored: replicas in this process; "
+                            "multiworker: one process per worker")
+    group.add_argument("--workers", type=int, default=1,
+                       help="CPU replicas (mirrored) or local worker processes (multiworker)")
+    group.add_argument("--intra-op-threads", type=int, default=0,
+                       help="Threads used inside one op (0 lets TensorFlow decide)")
+    group.add_argument("--inter-op-threads", type=int, default=0,
+                       help="Ops run concurrently (0 lets TensorFlow decide)")
+    return parser
+
+def configure_threads(intra_op_threads=0, inter_op_threads=0):
+    """Set TensorFlow's thread pools; must run before the first op executes."""
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+def configure_gpu():
+    """Use the first GPU with memory growth, if there is one. Returns the visible GPUs."""
+    gpus = tf.config.list_physical_devices('GPU')
+    if gpus:
+        try:
+            tf.config.experimental.set_visible_devices(gpus[0], 'GPU')
+            tf.config.experimental.set_memory_growth(gpus[0], True)
+            print(f"Using GPU: {gpus[0]}")
+        except RuntimeError as e:
+            print(e)
+    return gpus
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+def launch_local_workers(workers, argv=None):
+    """
+    Re-run the current script as `workers` local processes sharing a TF_CONFIG cluster.
+
+    Returns:
+        Exit code of the chief (worker 0); the first non-zero code if any worker failed
+    """
+    argv = list(sys.argv if argv is None else argv)
+    cluster = {'worker': [f'localhost:{_free_port()}' for _ in range(workers)]}
+    processes = []
+    for index in range(workers):
+        env = dict(os.environ, TF_CONFIG=json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}}))
+        processes.append(subprocess.Popen([sys.executable] + argv, env=env))
+    codes = [p.wait() for p in processes]
+    return next((code for code in codes if code), 0)
+
+def is_chief():
+    """True unless this process is a non-chief worker of a TF_CONFIG cluster."""
+    config = json.loads(os.environ.get('TF_CONFIG', '{}'))
+    task = config.get('task', {})
+    return task.get('type', 'worker') in ('worker', 'chief') and task.get('index', 0) == 0
+
+def setup(args):
+    """
+    Apply the thread and device flags and build the requested strategy.
+
+    For --strategy multiworker without TF_CONFIG this launches the local
+    workers and exits with their status instead of returning.
+
+    Returns:
+        A tf.distribute.Strategy; build and compile models inside its scope()
+    """
+    if args.strategy == 'multiworker' and 'TF_CONFIG' not in os.environ:
+        print(f"Launching {args.workers} local workers")
+        sys.exit(launch_local_workers(args.workers))
+
+    configure_threads(args.intra_op_threads, args.inter_op_threads)
+    gpus = configure_gpu()
+
+    if args.strategy == 'multiworker':
+        strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    elif args.strategy == 'mirrored':
+        if gpus:
+            strategy = tf.distribute.MirroredStrategy()
+        else:
+            # Split the CPU into logical devices, one replica each
+            cpu = tf.config.list_physical_devices('CPU')[0]
+            tf.config.set_logical_device_configuration(
+                cpu, [tf.config.LogicalDeviceConfiguration() for _ in range(args.workers)])
+            devices = [device.name for device in tf.config.list_logical_devices('CPU')]
+            strategy = tf.distribute.MirroredStrategy(devices=devices)
+    else:
+        strategy = tf.distribute.get_strategy()
+    print(f"Strategy: {args.strategy}, replicas in sync: {strategy.num_replicas_in_sync}")
+    return strategy
+
+def global_batch_size(strategy, per_replica_batch_size):
+    """Batch size to feed model.fit so every replica gets per_replica_batch_size rows."""
+    return per_replica_batch_size * strategy.num_replicas_in_sync
+
+def output_path(path):
+    """Where this process should write an artifact: path on the chief, a scratch copy elsewhere."""
+    if is_chief():
+        return path
+    task = json.loads(os.environ['TF_CONFIG'])['task']
+    return os.path.join('/tmp', f"worker{task['index']}_{os.path.basename(path.rstrip('/'))}")
+
+# --- Scaling Benchmark ---
+
+def synthetic_corpus(rows, vocabulary=5000, seed=0):
+    """Random chat-length texts (5-60 words) and 0/1 labels for timing runs."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(vocabulary)])
+    texts = [' '.join(rng.choice(words, size=rng.integers(5, 60))) for _ in range(rows)]
+    return texts, rng.integers(0, 2, size=rows)
+
+def run_epoch(args):
+    """Train the BiLSTM for one epoch on synthetic text and print the epoch time as JSON."""
+    from bilstm import build_model, build_vectorizer, compile_model
+
+    strategy = setup(args)
+    texts, labels = synthetic_corpus(args.rows)
+
+    batch_size = global_batch_size(strategy, args.batch_size)
+    dataset = tf.data.Dataset.from_tensor_slices((texts, labels)).batch(batch_size).prefetch(tf.data.AUTOTUNE)
+    vectorize_layer = build_vectorizer(5000, 64)
+    vectorize_layer.adapt(texts)
+    with strategy.scope():
+        model = compile_model(build_model(vectorize_layer, 5000))
+
+    model.fit(dataset.take(2), epochs=1, verbose=0)  # warm-up: tracing and graph building
+    start = time.perf_counter()
+    model.fit(dataset, epochs=1, verbose=0)
+    elapsed = time.perf_counter() - start
+    if is_chief():
+        print(json.dumps({"strategy": args.strategy, "workers": args.workers,
+                          "replicas": strategy.num_replicas_in_sync, "epoch_s": elapsed}))
+
+def benchmark(args):
+    """Measure epoch time for each worker count, one fresh process per configuration."""
+    results = []
+    for workers in args.worker_counts:
+        command = [sys.executable, os.path.abspath(__file__), "--run-epoch",
+                   "--strategy", args.strategy, "--workers", str(workers),
+                   "--rows", str(args.rows), "--batch-size", str(args.batch_size),
+                   "--intra-op-threads", str(args.intra_op_threads),
+                   "--inter-op-threads", str(args.inter_op_threads)]
+        if workers == 1 and args.strategy == 'multiworker':
+            command[command.index('multiworker')] = 'default'
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        speedup = results[0]["epoch_s"] / result["epoch_s"]
+        print(f"workers={workers}: epoch {result['epoch_s']:.2f} s  (x{speedup:.2f} vs {args.worker_counts[0]})")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BiLSTM epoch time against worker count on CPU")
+    add_arguments(parser)
+    parser.add_argument("--benchmark", action="store_true", help="Run every --worker-counts configuration")
+    parser.add_argument("--run-epoch", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-counts", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic training rows")
+    parser.add_argument("--batch-size", type=int, default=32, help="Rows per replica per step")
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    if args.run_epoch:
+        run_epoch(args)
+    else:
+        if args.strategy == 'default':
+            args.strategy = 'mirrored'
+        benchmark(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from data_loader import CSV_PATH, TEST_FRACTION, source_fingerprint
+
+# --- Evaluation Reports ---
+# Shared by test_model.py, Transformer.py and the tools that compare models.
+# Predictions for a (model, dataset split) pair are computed once and cached
+# as .npz; every threshold-dependent number (confusion matrices, PR/ROC
+# curves, recall-targeted thresholds, best F1) then comes from one sorted
+# pass over the probabilities instead of re-predicting per threshold. The
+# result is a JSON report; plots are optional and rendered with the Agg
+# backend, so nothing blocks on a headless host.
+
+CACHE_DIR = './eval_cache'
+DEFAULT_TARGET_RECALLS = (0.80, 0.90, 0.95)
+
+def cached_predictions(model_path, score_fn, csv_path=CSV_PATH, split='test',
+                       test_fraction=TEST_FRACTION, cache_dir=CACHE_DIR):
+    """
+    Probabilities and labels for a split, scored once per model version.
+
+    Args:
+        model_path: Model file or directory; its content hash keys the cache
+        score_fn: Called as score_fn(texts) -> probabilities on a cache miss
+            (load the model inside it so cache hits skip loading entirely)
+        csv_path: Dataset CSV
+        split: 'train', 'test' or None
+        test_fraction: Share of rows hashed into the test split
+        cache_dir: Directory for the .npz files
+
+    Returns:
+        (y_true, probabilities) as numpy arrays
+    """
+    from cache import model_version
+    from data_loader import load_split
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{model_version(model_path)}_{split}_"
+                                   f"{source_fingerprint(csv_path, split, test_fraction)}.npz")
+    if os.path.exists(path):
+        print(f"Using cached predictions {path}")
+        cached = np.load(path)
+        return cached['y_true'], cached['probabilities']
+
+    df = load_split(csv_path, split=split, test_fraction=test_fraction)
+    y_true = df['class'].values.astype(np.int8)
+    probabilities = np.asarray(score_fn(df['text'].tolist()), dtype=np.float32).reshape(-1)
+    np.savez(path, y_true=y_true, probabilities=probabilities)
+    return y_true, probabilities
+
+def threshold_sweep(y_true, probabilities, thresholds):
+    """
+    Confusion counts and metrics at every threshold in one vectorized pass.
+
+    A text is predicted positive when its probability > threshold, the same
+    comparison predict.classify makes in production.
+
+    Returns:
+        dict of arrays aligned with thresholds: tp, fp, fn, tn, precision,
+        recall, f1, fpr
+    """
+    y_true = np.asarray(y_true).astype(bool)
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    order = np.argsort(probabilities)
+    sorted_probs = probabilities[order]
+    # positives_from[i]: positives among sorted rows i..n-1
+    positives_from = np.concatenate([np.cumsum(y_true[order][::-1])[::-1], [0]])
+    first_predicted = np.searchsorted(sorted_probs, thresholds, side='right')
+
+    n, n_pos = len(y_true), int(y_true.sum())
+    predicted = n - first_predicted
+    tp = positives_from[first_predicted]
+    fp = predicted - tp
+    fn = n_pos - tp
+    tn = (n - n_pos) - fp
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, tp / predicted, 1.0)
+        recall = tp / n_pos if n_pos else np.zeros_like(thresholds)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        fpr = fp / (n - n_pos) if n > n_pos else np.zeros_like(thresholds)
+    return {'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn,
+            'precision': precision, 'recall': recall, 'f1': f1, 'fpr': fpr}
+
+def _confusion(sweep, i, threshold):
+    return {
+        'threshold': float(threshold),
+        'confusion_matrix': [[int(sweep['tn'][i]), int(sweep['fp'][i])],
+                             [int(sweep['fn'][i]), int(sweep['tp'][i])]],
+        'precision': float(sweep['precision'][i]),
+        'recall': float(sweep['recall'][i]),
+        'f1': float(sweep['f1'][i]),
+    }
+
+def build_report(y_true, probabilities, target_recalls=DEFAULT_TARGET_RECALLS, default_threshold=0.5,
+                 grid_size=1001):
+    """
+    Everything threshold-related about one model's predictions.
+
+    Returns:
+        JSON-serializable dict with the metrics at exactly default_threshold,
+        the highest grid threshold reaching each target recall, the best-F1
+        grid threshold, ROC AUC, average precision and PR/ROC curves sampled
+        on a grid of grid_size thresholds
+    """
+    y_true = np.asarray(y_true).astype(int)
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+
+    # Exact curves over every distinct score (plus a threshold below all of them)
+    exact = np.append(-np.inf, np.unique(probabilities))
+    curve = threshold_sweep(y_true, probabilities, exact)
+    tpr, fpr = curve['recall'][::-1], curve['fpr'][::-1]
+    roc_auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+    average_precision = float(np.sum(np.diff(tpr) * curve['precision'][::-1][1:]))
+
+    grid = np.linspace(0.0, 1.0, grid_size)
+    sweep = threshold_sweep(y_true, probabilities, grid)
+    at_default = threshold_sweep(y_true, probabilities, [default_threshold])
+
+    recall_targets = {}
+    for target in target_recalls:
+        # Highest threshold that still reaches the target recall
+        reaching = np.flatnonzero(sweep['recall'] >= target)
+        recall_targets[f"{target:.2f}"] = _confusion(sweep, reaching[-1], grid[reaching[-1]]) if len(reaching) else None
+    best = int(np.argmax(sweep['f1']))
+
+    return {
+        'rows': int(len(y_true)),
+        'positives': int(y_true.sum()),
+        'roc_auc': roc_auc,
+        'average_precision': average_precision,
+        'at_default_threshold': _confusion(at_default, 0, default_threshold),
+        'recall_targets': recall_targets,
+        'best_f1': _confusion(sweep, best, grid[best]),
+        'curves': {
+            'thresholds': grid.tolist(),
+            'precision': sweep['precision'].tolist(),
+            'recall': sweep['recall'].tolist(),
+            'fpr': sweep['fpr'].tolist(),
+        },
+    }
+
+def recall_threshold(report, target_recall, fallback=0.5):
+    """Threshold chosen for target_recall in a build_report() result, or fallback if unreachable."""
+    entry = report['recall_targets'].get(f"{target_recall:.2f}")
+    return entry['threshold'] if entry else fallback
+
+def write_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Evaluation report written to {path}")
+
+def plot_report(report, prefix='evaluation'):
+    """Save the confusion matrix and PR/ROC curves as PNGs (no window is opened)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    matrix = np.array(report['at_default_threshold']['confusion_matrix'])
+    fig, ax = plt.subplots(figsize=(6, 5))
+    ax.imshow(matrix, cmap='Blues')
+    for (row, col), value in np.ndenumerate(matrix):
+        ax.text(col, row, str(value), ha='center', va='center')
+    ax.set_xticks([0, 1], labels=['Non-Suicide', 'Suicide'])
+    ax.set_yticks([0, 1], labels=['Non-Suicide', 'Suicide'])
+    ax.set_xlabel('Predicted Label')
+    ax.set_ylabel('True Label')
+    ax.set_title(f"Confusion Matrix (threshold {report['at_default_threshold']['threshold']:.2f})")
+    fig.savefig(f'{prefix}_confusion_matrix.png', bbox_inches='tight')
+    plt.close(fig)
+
+    curves = report['curves']
+    fig, (pr, roc) = plt.subplots(1, 2, figsize=(12, 5))
+    pr.plot(curves['recall'], curves['precision'])
+    pr.set_xlabel('Recall')
+    pr.set_ylabel('Precision')
+    pr.set_title(f"PR curve (AP {report['average_precision']:.4f})")
+    roc.plot(curves['fpr'], curves['recall'])
+    roc.plot([0, 1], [0, 1], linestyle='--', color='grey')
+    roc.set_xlabel('False positive rate')
+    roc.set_ylabel('True positive rate')
+    roc.set_title(f"ROC curve (AUC {report['roc_auc']:.4f})")
+    fig.savefig(f'{prefix}_curves.png', bbox_inches='tight')
+    plt.close(fig)
+    print(f"Plots written to {prefix}_confusion_matrix.png and {prefix}_curves.png")
+
+def print_summary(report):
+    default = report['at_default_threshold']
+    print(f"ROC AUC: {report['roc_auc']:.4f}  Average precision: {report['average_precision']:.4f}")
+    print(f"At threshold {default['threshold']:.2f}: precision {default['precision']:.4f}  "
+          f"recall {default['recall']:.4f}  f1 {default['f1']:.4f}")
+    for target, entry in report['recall_targets'].items():
+        if entry:
+            print(f"Recall >= {target}: threshold {entry['threshold']:.3f}  precision {entry['precision']:.4f}")
+    best = report['best_f1']
+    print(f"Best F1 {best['f1']:.4f} at threshold {best['threshold']:.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a model on the held-out split and write a JSON report")
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras")
+    parser.add_argument("--model-path", default=None, help="Model file (defaults to the backend's standard path)")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--target-recall", type=float, nargs="+", default=list(DEFAULT_TARGET_RECALLS))
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--report", default="evaluation_report.json")
+    parser.add_argument("--plots", action="store_true", help="Also write confusion matrix and PR/ROC PNGs")
+    args = parser.parse_args()
+
+    from predict import DEFAULT_MODEL_PATHS, load_predictor, predict_proba
+
+    model_path = args.model_path or DEFAULT_MODEL_PATHS[args.backend]
+
+    def score(texts):
+        model = load_predictor(args.backend, model_path)
+        if model is None:
+            raise SystemExit(1)
+        return predict_proba(model, texts, batch_size=256)
+
+    y_true, probabilities = cached_predictions(model_path, score, args.csv)
+    report = build_report(y_true, probabilities, args.target_recall, args.threshold)
+    report['model'] = model_path
+    print_summary(report)
+    write_report(report, args.report)
+    if args.plots:
+        plot_report(report, os.path.splitext(args.report)[0])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import json
+
+import tensorflow as tf
+
+# --- TFLite Export ---
+# The detector hosts are CPU-only, and a full TensorFlow install just to run
+# model.predict is heavy. This splits the trained model into its
+# TextVectorization vocabulary (a plain JSON file) and the integer-input
+# network (a .tflite flatbuffer), which tflite_backend.py can run on the
+# lightweight tflite_runtime interpreter.
+
+TFLITE_MODEL_PATH = './suicide_detection_model.tflite'
+VOCAB_PATH = './suicide_detection_vocab.json'
+# Keras 3 LSTMs are not fused into the TFLite LSTM op, and lowering their
+# loops needs every shape static. Such models are exported with a fixed
+# (FIXED_BATCH_SIZE, sequence_length) input instead; TFLitePredictor reads
+# the input shape and pads each batch up to it.
+FIXED_BATCH_SIZE = 32
+
+def uses_masking(model):
+    """True if the model's embedding masks padding, i.e. its output does not depend on padded length."""
+    return any(isinstance(layer, tf.keras.layers.Embedding) and layer.mask_zero for layer in model.layers)
+
+def split_model(model):
+    """
+    Separate the string-input model into its vectorizer and an int-input core.
+
+    Args:
+        model: Sequential model built by bilstm.build_model
+
+    Returns:
+        (vectorize_layer, core): the TextVectorization layer and a Keras model
+        taking token ids of shape (batch, sequence_length) that shares weights
+        with model. Models that mask padding get a core taking any length.
+    """
+    vectorize_layer = model.layers[0]
+    if not isinstance(vectorize_layer, tf.keras.layers.TextVectorization):
+        raise ValueError("Expected the first layer to be TextVectorization")
+    sequence_length = vectorize_layer.get_config()['output_sequence_length']
+    if uses_masking(model):
+        sequence_length = None
+    core = tf.keras.Sequential(
+        [tf.keras.layers.Input(shape=(sequence_length,), dtype='int64')] + list(model.layers[1:])
+    )
+    return vectorize_layer, core
+
+def write_vocabulary(vectorize_layer, path=VOCAB_PATH, dynamic_padding=False):
+    """
+    Write the vectorizer vocabulary and settings needed to tokenize without TensorFlow.
+
+    dynamic_padding tells the TFLite backend it may pad each batch only to its
+    longest text (set for models that mask padding).
+    """
+    config = vectorize_layer.get_config()
+    standardize = config['standardize']
+    if not isinstance(standardize, str):
+        # Registered custom standardizers serialize as their registered name
+        standardize = getattr(standardize, '__name__', str(standardize))
+    payload = {
+        'sequence_length': config['output_sequence_length'],
+        'standardize': standardize,
+        'dynamic_padding': dynamic_padding,
+        'vocabulary': vectorize_layer.get_vocabulary(),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+    print(f"Vocabulary ({len(payload['vocabulary'])} tokens) written to {path}")
+
+def convert_core(core, quantization=None, sequence_length=None):
+    """
+    Convert the int-input core to a TFLite flatbuffer.
+
+    The batch dimension is left dynamic where the converter allows it;
+    otherwise the model is converted at a fixed (FIXED_BATCH_SIZE,
+    sequence_length) input.
+
+    Args:
+        core: Keras model from split_model
+        quantization: None (float32), 'int8' (dynamic-range) or 'float16'
+        sequence_length: The vectorizer's output length, used for the fixed
+            input when core takes any length
+
+    Returns:
+        Serialized TFLite model bytes
+    """
+    try:
+        return _convert(core, [None, core.input_shape[1]], quantization)
+    except Exception as e:  # ConverterError, which tf.lite does not export
+        fixed_shape = [FIXED_BATCH_SIZE, core.input_shape[1] or sequence_length]
+        if fixed_shape[1] is None:
+            raise
+        print(f"Dynamic-shape conversion failed ({str(e).splitlines()[0]}); "
+              f"converting with a fixed {fixed_shape} input")
+        return _convert(core, fixed_shape, quantization)
+
+def _convert(core, input_shape, quantization):
+    run = tf.function(
+        lambda ids: core(ids, training=False),
+        input_signature=[tf.TensorSpec(input_shape, tf.int64)],
+    )
+    # Without the trackable the weights are frozen into constants, which the
+    # interpreter can read inside the LSTM while loops
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([run.get_concrete_function()])
+    if quantization == 'int8':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif quantization == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization is not None:
+        raise ValueError(f"Unknown quantization {quantization!r}")
+    return converter.convert()
+
+def export_tflite(model, model_path=TFLITE_MODEL_PATH, vocab_path=VOCAB_PATH, quantization=None):
+    """Write the .tflite network and its vocabulary file for a trained model."""
+    vectorize_layer, core = split_model(model)
+    write_vocabulary(vectorize_layer, vocab_path, dynamic_padding=uses_masking(model))
+    with open(model_path, 'wb') as f:
+        f.write(convert_core(core, quantization, vectorize_layer.get_config()['output_sequence_length']))
+    print(f"TFLite model written to {model_path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the suicide detection model to TFLite plus a vocabulary file")
+    parser.add_argument("--model-path", default="./suicide_detection_model.keras")
+    parser.add_argument("--output", default=TFLITE_MODEL_PATH)
+    parser.add_argument("--vocab-output", default=VOCAB_PATH)
+    args = parser.parse_args()
+
+    import bilstm  # noqa: F401  registers custom standardizers used by saved models
+    model = tf.keras.models.load_model(args.model_path)
+    export_tflite(model, args.output, args.vocab_output)
+
+if __name__ == "__main__":
+    main()
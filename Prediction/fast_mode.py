@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+import metrics
+
+# --- Fast Mode: XLA + bfloat16 Mixed Precision ---
+# Opt-in speedups for the training scripts and the predictor:
+#   training  --fast builds the model under the 'mixed_bfloat16' policy (when
+#             the CPU/GPU has native bfloat16 support) and compiles train
+#             steps with XLA (jit_compile=True)
+#   inference CompiledPredictor runs the network through one XLA-compiled
+#             function with a fixed (batch_size, sequence_length) input, so
+#             every call reuses the same compiled program instead of going
+#             through model.predict's eager-to-graph path
+# Run `python fast_mode.py --benchmark` to compare against the defaults.
+
+def add_arguments(parser):
+    """Add the --fast flag to a training script's parser."""
+    parser.add_argument("--fast", action="store_true",
+                        help="XLA-compiled steps and bfloat16 mixed precision where the hardware supports it")
+    return parser
+
+def bf16_supported():
+    """True if bfloat16 math is native here: an Ampere+ GPU or a CPU with AVX512-BF16/AMX."""
+    for gpu in tf.config.list_physical_devices('GPU'):
+        capability = tf.config.experimental.get_device_details(gpu).get('compute_capability', (0, 0))
+        if capability >= (8, 0):
+            return True
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+def enable(mixed_precision=True):
+    """
+    Turn on fast mode before any model is built.
+
+    Returns:
+        dict with the 'policy' in effect and whether 'jit_compile' should be used
+    """
+    policy = 'float32'
+    if mixed_precision and bf16_supported():
+        policy = 'mixed_bfloat16'
+        tf.keras.mixed_precision.set_global_policy(policy)
+    elif mixed_precision:
+        print("bfloat16 is not native on this hardware; keeping float32 and using XLA only")
+    print(f"Fast mode: policy {policy}, XLA jit_compile on")
+    return {'policy': policy, 'jit_compile': True}
+
+class CompiledPredictor:
+    """
+    Scores texts through an XLA-compiled, fixed-shape copy of the network.
+
+    The string vectorizer runs outside XLA (string ops cannot be compiled);
+    its token ids are padded to batch_size rows so every call hits the same
+    compiled program. Usable anywhere predict.py expects a model.
+
+    Args:
+        model: String-input Keras model built by bilstm.build_model
+        batch_size: Rows per compiled call; smaller batches are padded up to it
+    """
+
+    def __init__(self, model, batch_size=32):
+        from export_tflite import split_model
+
+        self.vectorize_layer, self.core = split_model(model)
+        self.batch_size = batch_size
+        self.sequence_length = self.vectorize_layer.get_config()['output_sequence_length']
+        self._run = tf.function(
+            lambda ids: self.core(ids, training=False),
+            input_signature=[tf.TensorSpec([batch_size, self.sequence_length], tf.int64)],
+            jit_compile=True,
+        )
+        # Compile once up front rather than on the first request
+        self._run(tf.zeros([batch_size, self.sequence_length], tf.int64))
+
+    def predict_proba(self, texts, batch_size=None):
+        """1-D array of probabilities, one per text (batch_size is fixed at construction)."""
+        probabilities = np.zeros(len(texts), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            chunk = list(texts[start:start + self.batch_size])
+            with metrics.span('vectorize', backend='keras-fast'):
+                ids = tf.cast(self.vectorize_layer(tf.constant(chunk)), tf.int64)
+                ids = tf.pad(ids, [[0, self.batch_size - len(chunk)], [0, 0]])
+            with metrics.span('forward', backend='keras-fast'):
+                output = self._run(ids).numpy().reshape(-1)
+            probabilities[start:start + len(chunk)] = output[:len(chunk)]
+        return probabilities
+
+# --- Benchmark ---
+
+def run_mode(args):
+    """Time train steps and inference for one mode on synthetic text; print JSON."""
+    from bilstm import build_model, build_vectorizer, compile_model
+    from distribute import synthetic_corpus
+    from predict import predict_proba
+
+    fast = args.mode == 'fast'
+    settings = enable() if fast else {'policy': 'float32', 'jit_compile': False}
+    texts, labels = synthetic_corpus(args.rows)
+    dataset = tf.data.Dataset.from_tensor_slices((texts, labels)).batch(args.batch_size).prefetch(tf.data.AUTOTUNE)
+
+    vectorize_layer = build_vectorizer(5000, 250)
+    vectorize_layer.adapt(texts)
+    model = compile_model(build_model(vectorize_layer, 5000), jit_compile=settings['jit_compile'])
+    model.fit(dataset.take(2), epochs=1, verbose=0)  # warm-up: tracing and compilation
+    steps = len(texts) // args.batch_size
+    start = time.perf_counter()
+    model.fit(dataset.take(steps), epochs=1, verbose=0)
+    step_ms = (time.perf_counter() - start) / steps * 1000
+
+    # Inference always runs in float32 weights; fast mode adds the compiled signature
+    predictor = CompiledPredictor(model, args.batch_size) if fast else model
+    predict_proba(predictor, texts[:args.batch_size], args.batch_size)
+    latencies = []
+    for i in range(args.repeats):
+        start = time.perf_counter()
+        predict_proba(predictor, [texts[i % len(texts)]], args.batch_size)
+        latencies.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    predict_proba(predictor, texts, args.batch_size)
+    throughput = len(texts) / (time.perf_counter() - start)
+
+    print(json.dumps({
+        "mode": args.mode,
+        "policy": settings['policy'],
+        "train_step_ms": step_ms,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "throughput_per_s": throughput,
+    }))
+
+def benchmark(args):
+    """Run the default and fast modes in fresh processes (the precision policy is global)."""
+    results = []
+    for mode in ['default', 'fast']:
+        command = [sys.executable, os.path.abspath(__file__), "--run-mode", mode,
+                   "--rows", str(args.rows), "--batch-size", str(args.batch_size), "--repeats", str(args.repeats)]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{mode:>8} ({result['policy']}): train step {result['train_step_ms']:.1f} ms  "
+              f"p50 {result['p50_ms']:.2f} ms  p95 {result['p95_ms']:.2f} ms  "
+              f"{result['throughput_per_s']:.0f} texts/s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fast mode (XLA + bfloat16) against the defaults")
+    parser.add_argument("--benchmark", action="store_true", help="Run both modes and print the comparison")
+    parser.add_argument("--run-mode", dest="mode", choices=["default", "fast"], default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, default=4096, help="Synthetic texts")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=200, help="Single-text inference calls timed")
+    parser.add_argument("--output", default=None, help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args)
+    else:
+        benchmark(args)
+
+if __name__ == "__main__":
+    main()
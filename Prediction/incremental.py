@@ -0,0 +1,160 @@
+import threading
+from collections import OrderedDict
+
+from predict import classify
+
+# --- Incremental Conversation Scoring ---
+# The detector used to join a conversation's whole chatHistory and score it
+# again after every message, even though TextVectorization only looks at the
+# first 250 tokens. Here each conversation (keyed by uuid) keeps a short tail
+# of its previous text; only new messages are scored, each prefixed with that
+# tail for context, and the per-turn scores are combined into one risk.
+
+COMBINE_MODES = ('max', 'mean', 'ewma')
+
+class ConversationState:
+    """Per-conversation cache: how many messages were scored and their turn scores."""
+
+    def __init__(self):
+        self.n_messages = 0
+        self.last_message = None
+        self.tail = []
+        self.scores = []
+
+class PendingTurns:
+    """What prepare() read from a conversation, applied by commit() once its texts are scored."""
+
+    def __init__(self, seen, n_scores, n_messages, last_message, tail):
+        self.seen = seen
+        self.n_scores = n_scores
+        self.n_messages = n_messages
+        self.last_message = last_message
+        self.tail = tail
+
+class ConversationScorer:
+    """
+    Scores chat histories turn by turn instead of re-scoring the concatenation.
+
+    Scoring is split into prepare() (pick the texts to score) and commit()
+    (record their probabilities) so callers can send the texts through the
+    micro-batcher without holding a lock. The conversation state only moves
+    in commit(), so a batch that fails before commit() leaves the messages
+    unscored and a retry scores them again.
+
+    Args:
+        context_tokens: Words of previous conversation prepended to each new message
+        combine: How turn scores become a conversation score: 'max', 'mean' or 'ewma'
+        decay: Weight of the previous value in 'ewma' mode
+        max_conversations: Least recently used conversations beyond this are forgotten
+    """
+
+    def __init__(self, context_tokens=50, combine='max', decay=0.5, max_conversations=10000):
+        if combine not in COMBINE_MODES:
+            raise ValueError(f"combine must be one of {COMBINE_MODES}, got {combine!r}")
+        self.context_tokens = context_tokens
+        self.combine = combine
+        self.decay = decay
+        self.max_conversations = max_conversations
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, uuid, messages):
+        """Return the cached state for uuid, resetting it if the history no longer matches."""
+        state = self._states.get(uuid)
+        if state is not None:
+            seen = state.n_messages
+            # The history is append-only; anything else means we must start over
+            if len(messages) < seen or (seen and messages[seen - 1] != state.last_message):
+                state = None
+        if state is None:
+            state = ConversationState()
+            self._states[uuid] = state
+        self._touch(uuid)
+        return state
+
+    def _touch(self, uuid):
+        self._states.move_to_end(uuid)
+        while len(self._states) > self.max_conversations:
+            self._states.popitem(last=False)
+
+    def prepare(self, uuid, messages, transform=None):
+        """
+        Select the new messages of a conversation for scoring.
+
+        Args:
+            uuid: Conversation id
+            messages: Full chat history (list of strings), oldest first
+            transform: Optional callable applied to the list of new messages
+                before scoring (e.g. translation); runs outside the lock
+
+        Returns:
+            (pending, texts): a PendingTurns to pass back to commit(), and the
+            context-prefixed texts to score for it
+        """
+        with self._lock:
+            state = self._state(uuid, messages)
+            seen, n_scores, tail = state.n_messages, len(state.scores), state.tail
+        new_messages = messages[seen:]
+        if transform is not None and new_messages:
+            new_messages = transform(new_messages)
+        texts = []
+        for message in new_messages:
+            words = message.split()
+            texts.append(' '.join(tail + words))
+            tail = (tail + words)[-self.context_tokens:] if self.context_tokens else []
+        pending = PendingTurns(seen, n_scores, len(messages), messages[-1] if messages else None, tail)
+        return pending, texts
+
+    def commit(self, uuid, pending, probabilities):
+        """
+        Record turn probabilities and return the conversation-level prediction.
+
+        Returns:
+            (prediction, label, confidence) for the whole conversation
+
+        Raises:
+            ValueError: The conversation has no scored messages
+        """
+        probabilities = [float(p) for p in probabilities]
+        with self._lock:
+            state = self._states.get(uuid)
+            if state is None and pending.seen == 0:
+                state = ConversationState()
+                self._states[uuid] = state
+                self._touch(uuid)
+            if state is not None and (state.n_messages, len(state.scores)) == (pending.seen, pending.n_scores):
+                state.scores.extend(probabilities)
+                state.tail = pending.tail
+                state.n_messages = pending.n_messages
+                state.last_message = pending.last_message
+                scores = list(state.scores)
+            elif state is not None and state.n_messages >= pending.n_messages:
+                # A concurrent request for the same history committed first
+                scores = list(state.scores)
+            else:
+                # Evicted or reset while scoring; answer from what was just scored
+                scores = probabilities
+        if not scores:
+            raise ValueError(f"No scored messages for conversation {uuid}")
+        return classify(self._combine(scores))
+
+    def score(self, uuid, messages, score_fn, transform=None):
+        """Synchronous prepare/commit using score_fn(texts) -> probabilities."""
+        pending, texts = self.prepare(uuid, messages, transform)
+        probabilities = score_fn(texts) if texts else []
+        return self.commit(uuid, pending, probabilities)
+
+    def forget(self, uuid):
+        """Drop the cached state for a conversation."""
+        with self._lock:
+            self._states.pop(uuid, None)
+
+    def _combine(self, scores):
+        if self.combine == 'max':
+            return max(scores)
+        if self.combine == 'mean':
+            return sum(scores) / len(scores)
+        risk = scores[0]
+        for score in scores[1:]:
+            risk = self.decay * risk + (1 - self.decay) * score
+        return risk
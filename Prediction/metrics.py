@@ -0,0 +1,211 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Scoring Metrics ---
+# In-process counters, gauges and histograms for the scoring hot path, so we
+# can see where latency goes without grepping logs. Spans time a block into
+# the mentalllm_span_seconds histogram (span="vectorize" | "forward" |
+# "translation" | ...); the daemon adds request totals, queue depth, batch
+# sizes, cache lookups and errors. Two exporters:
+#   serve_http(port)          Prometheus text format on http://127.0.0.1:port/metrics
+#   JsonLinesWriter(path, s)  one JSON snapshot line every s seconds
+# Recording is a dict update under a lock, cheap enough to leave on.
+
+PREFIX = 'mentalllm_'
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets + ('+Inf',), self.counts):
+            running += n
+            cumulative[str(bound)] = running
+        return {'count': self.count, 'sum': self.sum, 'buckets': cumulative}
+
+class Registry:
+    """Thread-safe store of labelled counters, gauges and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._collectors = []
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def register_collector(self, collect):
+        """Add a callable returning {(name, ((label, value), ...)): value} gauges, read at export time."""
+        self._collectors.append(collect)
+
+    def _collected(self):
+        gauges = {}
+        for collect in self._collectors:
+            try:
+                for (name, labels), value in collect().items():
+                    gauges[(name, tuple(sorted(labels)))] = value
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        return gauges
+
+    def snapshot(self):
+        """All metrics as a JSON-serializable dict."""
+        collected = self._collected()
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = {**self._gauges, **collected}
+            histograms = {key: h.snapshot() for key, h in self._histograms.items()}
+
+        def entries(items, field):
+            return [{'name': name, 'labels': dict(labels), field: value} for (name, labels), value in items.items()]
+
+        return {
+            'counters': entries(counters, 'value'),
+            'gauges': entries(gauges, 'value'),
+            'histograms': entries(histograms, 'histogram'),
+        }
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{str(v)}"' for k, v in pairs) + '}'
+
+        collected = self._collected()
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = {**self._gauges, **collected}
+            histograms = {key: h.snapshot() for key, h in self._histograms.items()}
+
+        lines = []
+        for kind, items in (('counter', counters), ('gauge', gauges)):
+            for name in sorted({name for name, _ in items}):
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                for (metric, labels), value in sorted(items.items()):
+                    if metric == name:
+                        lines.append(f"{PREFIX}{name}{label_text(labels)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for (metric, labels), h in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in h['buckets'].items():
+                    lines.append(f"{PREFIX}{name}_bucket{label_text(labels, [('le', bound)])} {count}")
+                lines.append(f"{PREFIX}{name}_sum{label_text(labels)} {h['sum']}")
+                lines.append(f"{PREFIX}{name}_count{label_text(labels)} {h['count']}")
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+def inc(name, value=1, **labels):
+    REGISTRY.inc(name, value, **labels)
+
+def set_gauge(name, value, **labels):
+    REGISTRY.set_gauge(name, value, **labels)
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    REGISTRY.observe(name, value, buckets, **labels)
+
+@contextmanager
+def span(name, **labels):
+    """Time the block into span_seconds{span=name, ...}, whether or not it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe('span_seconds', time.perf_counter() - start, span=name, **labels)
+
+def serve_http(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve /metrics in the Prometheus text format from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # keep scrapes out of the daemon's log
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    print(f"Metrics served on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+class JsonLinesWriter:
+    """
+    Append a metrics snapshot as one JSON line every interval seconds.
+
+    Args:
+        path: File to append to
+        interval: Seconds between snapshots
+        registry: Registry to snapshot
+    """
+
+    def __init__(self, path, interval=10.0, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+        self._thread.start()
+
+    def write(self):
+        line = json.dumps({'time': time.time(), **self.registry.snapshot()})
+        with open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self):
+        """Stop the writer after one final snapshot."""
+        self._stop.set()
+        self._thread.join()
+        self.write()
@@ -1,18 +1,53 @@
-import tensorflow as tf
-import numpy as np
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
 
-def load_model(model_path='./suicide_detection_model.keras'):
-    """Load the saved model."""
+import metrics
+
+# TensorFlow and NumPy are imported inside the functions that need them:
+# importing TensorFlow dominates cold start, and argument parsing, --help and
+# input validation should not pay for it.
+
+@contextmanager
+def timed(timings, name):
+    """Record the wall-clock duration of the block in timings[name] (seconds)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+def report_startup(timings):
+    """Print the startup-time breakdown as one JSON line on stderr."""
+    print(json.dumps({"startup": {name: round(seconds, 4) for name, seconds in timings.items()}}),
+          file=sys.stderr)
+
+def import_backend(backend='keras'):
+    """Import the runtime a backend needs (used to time imports separately from model load)."""
+    if backend == 'tflite':
+        import tflite_backend  # noqa: F401
+    else:
+        import tensorflow  # noqa: F401
+
+def load_model(model_path='./suicide_detection_model.keras', saved_model_path='./suicide_detection_model_saved'):
+    """Load the saved model, falling back to saved_model_path (None disables the fallback)."""
+    import tensorflow as tf
     try:
         # Try loading .keras format first
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(model_path)
         model = tf.keras.models.load_model(model_path)
         print("Model loaded successfully from .keras format!")
         return model
     except Exception as e:
         print(f"Could not load .keras format: {e}")
+        if saved_model_path is None:
+            return None
         try:
             # Fallback to SavedModel format
-            saved_model_path = './suicide_detection_model_saved'
             model = tf.keras.models.load_model(saved_model_path)
             print("Model loaded successfully from SavedModel format!")
             return model
@@ -20,6 +55,53 @@ def load_model(model_path='./suicide_detection_model.keras'):
             print(f"Error loading model: {e}")
             return None
 
+DEFAULT_MODEL_PATHS = {
+    'keras': './suicide_detection_model.keras',
+    'tflite': './suicide_detection_model.tflite',
+}
+
+def load_predictor(backend='keras', model_path=None, vocab_path='./suicide_detection_vocab.json',
+                   quantization=None, fast=False, batch_size=32):
+    """
+    Load a scoring backend.
+
+    Args:
+        backend: 'keras' (full TensorFlow) or 'tflite' (exported model, see export_tflite.py)
+        model_path: Model file; defaults to the backend's standard path
+        vocab_path: Vocabulary file for the tflite backend
+        quantization: 'int8' or 'float16' to load a quantized TFLite variant
+            written by quantize.py (implies the tflite backend)
+        fast: Wrap a keras model in fast_mode.CompiledPredictor (XLA, fixed shape)
+        batch_size: Rows per compiled call when fast is set
+
+    Returns:
+        A model usable with predict_text/predict_batch, or None if loading failed
+    """
+    if quantization is not None:
+        backend = 'tflite'
+    if backend == 'keras':
+        model = load_model(model_path or DEFAULT_MODEL_PATHS['keras'])
+        if fast and model is not None:
+            from fast_mode import CompiledPredictor
+            model = CompiledPredictor(model, batch_size)
+        return model
+    if backend == 'tflite':
+        from tflite_backend import TFLitePredictor, variant_path
+        try:
+            model = TFLitePredictor(model_path or variant_path(quantization), vocab_path)
+            print("Model loaded successfully from TFLite format!")
+            return model
+        except Exception as e:
+            print(f"Error loading TFLite model: {e}")
+            return None
+    raise ValueError(f"Unknown backend {backend!r}")
+
+def classify(prediction, threshold=0.5):
+    """Turn a raw probability into (prediction, label, confidence)."""
+    label = "suicide" if prediction > threshold else "non-suicide"
+    confidence = prediction if prediction > threshold else 1 - prediction
+    return prediction, label, confidence
+
 def predict_text(model, text):
     """
     Make predictions on input text.
@@ -32,6 +114,12 @@ def predict_text(model, text):
         prediction: Float value (probability of suicidal content)
         label: String interpretation of the prediction
     """
+    if hasattr(model, 'predict_proba'):
+        # Lightweight backends (tflite_backend.TFLitePredictor) tokenize themselves
+        return classify(model.predict_proba([text])[0])
+
+    import tensorflow as tf
+
     # Convert text to tensor format expected by the model
     text_tensor = tf.convert_to_tensor([text])
     
@@ -39,16 +127,140 @@ def predict_text(model, text):
     prediction = model.predict(text_tensor)[0][0]
     
     # Classify prediction
-    label = "suicide" if prediction > 0.5 else "non-suicide"
-    confidence = prediction if prediction > 0.5 else 1 - prediction
-    
-    return prediction, label, confidence
+    return classify(prediction)
+
+def predict_proba(model, texts, batch_size=32):
+    """
+    Score many texts with one forward pass per batch.
+
+    Args:
+        model: Loaded TensorFlow model
+        texts: List of string inputs
+        batch_size: Number of texts per forward pass
+
+    Returns:
+        1-D numpy array of probabilities, one per input text
+    """
+    import numpy as np
+
+    if len(texts) == 0:
+        return np.zeros(0, dtype=np.float32)
+    if hasattr(model, 'predict_proba'):
+        return model.predict_proba(list(texts), batch_size=batch_size)
+
+    import tensorflow as tf
+    text_tensor = tf.constant(list(texts))
+    # The Keras model vectorizes inside its graph, so this span covers both
+    with metrics.span('forward', backend='keras'):
+        return model.predict(text_tensor, batch_size=batch_size, verbose=0).reshape(-1)
+
+def predict_batch(model, texts, batch_size=32):
+    """
+    Make predictions on a list of texts.
+
+    Args:
+        model: Loaded TensorFlow model
+        texts: List of string inputs
+        batch_size: Number of texts per forward pass
+
+    Returns:
+        List of (prediction, label, confidence) tuples in input order
+    """
+    return [classify(p) for p in predict_proba(model, texts, batch_size)]
+
+def windowed(model, args):
+    """Wrap model in a windowing.WindowedPredictor when --windowed was given."""
+    if not args.windowed:
+        return model
+    from windowing import WindowedPredictor
+    return WindowedPredictor(model, args.window_size, args.window_stride, args.window_combine)
+
+def read_batch(stream):
+    """Read one text per line; lines may be JSON strings (to carry newlines) or plain text."""
+    texts = []
+    for line in stream:
+        line = line.rstrip('\n')
+        if not line.strip():
+            continue
+        try:
+            text = json.loads(line)
+        except json.JSONDecodeError:
+            text = line
+        if isinstance(text, dict):
+            text = text.get('text', '')
+        texts.append(str(text))
+    return texts
+
+def run_batch(model, batch_size, timings=None):
+    """Batch mode: score every text on stdin and print one JSON result per line."""
+    texts = read_batch(sys.stdin)
+    # Keras prints progress to stdout; keep stdout clean for results
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        with timed(timings if timings is not None else {}, "first_inference"):
+            results = predict_batch(model, texts, batch_size=batch_size)
+    finally:
+        sys.stdout = out
+    for prediction, label, confidence in results:
+        print(json.dumps({
+            "probability": float(prediction),
+            "label": label,
+            "confidence": float(confidence),
+        }))
 
 def main():
     """Command-line interface for text prediction."""
-    model = load_model()
+    parser = argparse.ArgumentParser(description="Suicide risk detection on English text")
+    parser.add_argument("--batch", action="store_true",
+                        help="Read one text per line (JSON string or plain) from stdin and print JSON results")
+    parser.add_argument("--batch-size", type=int, default=32, help="Texts per forward pass in batch mode")
+    parser.add_argument("--timings", action="store_true",
+                        help="Report import / model load / first inference times as JSON on stderr")
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras",
+                        help="keras: full TensorFlow model; tflite: exported model on the lightweight runtime")
+    parser.add_argument("--model-path", default=None, help="Model file (defaults to the backend's standard path)")
+    parser.add_argument("--quantization", choices=["int8", "float16"], default=None,
+                        help="Use a quantized TFLite variant written by quantize.py (implies --backend tflite)")
+    parser.add_argument("--fast", action="store_true",
+                        help="Score the keras model through an XLA-compiled fixed-shape signature")
+    parser.add_argument("--windowed", action="store_true",
+                        help="Score texts longer than the model's input as overlapping windows (see windowing.py)")
+    parser.add_argument("--window-size", type=int, default=None, help="Words per window (default: model input length)")
+    parser.add_argument("--window-stride", type=int, default=None, help="Words between window starts (default: 3/4 of the size)")
+    parser.add_argument("--window-combine", choices=["max", "mean", "attention"], default="max",
+                        help="How window scores combine into one risk score")
+    args = parser.parse_args()
+    if args.quantization:
+        args.backend = "tflite"
+
+    timings = {}
+    if args.batch:
+        # Model loading messages would interleave with the JSON output
+        out = sys.stdout
+        sys.stdout = sys.stderr
+        with timed(timings, "import"):
+            import_backend(args.backend)
+        with timed(timings, "model_load"):
+            model = load_predictor(args.backend, args.model_path, quantization=args.quantization,
+                                   fast=args.fast, batch_size=args.batch_size)
+        sys.stdout = out
+        if model is None:
+            sys.exit(1)
+        model = windowed(model, args)
+        run_batch(model, args.batch_size, timings)
+        if args.timings:
+            report_startup(timings)
+        return
+
+    with timed(timings, "import"):
+        import_backend(args.backend)
+    with timed(timings, "model_load"):
+        model = load_predictor(args.backend, args.model_path, quantization=args.quantization,
+                               fast=args.fast, batch_size=args.batch_size)
     if model is None:
         return
+    model = windowed(model, args)
     
     print("Suicide Risk Detection Model")
     print("Enter your text (use multiple lines if needed)")
@@ -66,7 +278,8 @@ def main():
         return
         
     user_input = '\n'.join(lines)
-    prediction, label, confidence = predict_text(model, user_input)
+    with timed(timings, "first_inference"):
+        prediction, label, confidence = predict_text(model, user_input)
     
     print(f"\nPrediction: {label}")
     print(f"Confidence: {confidence:.2%}")
@@ -77,5 +290,8 @@ def main():
     else:
         print("\n️ 🟩This text doesn't strongly indicate suicidal Tendencies")
 
+    if args.timings:
+        report_startup(timings)
+
 if __name__ == "__main__":
     main()
@@ -1,14 +1,26 @@
-import tensorflow as tf
-import numpy as np
-import google.generativeai as genai
+import argparse
+import hashlib
 import os
+import re
+import sqlite3
 import sys
+import threading
+
+import metrics
+from predict import report_startup, timed
+
+# TensorFlow and google.generativeai are imported lazily (see predict.py):
+# the native path never needs Gemini, and the translation path does not
+# need TensorFlow until a model is loaded.
 
 # --- Model Loading (same as predict.py) ---
 def load_model(model_path='./suicide_detection_model.keras'):
     """Load the saved model."""
+    import tensorflow as tf
     try:
         # Try loading .keras format first
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(model_path)
         model = tf.keras.models.load_model(model_path)
         print("Suicide detection model loaded successfully from .keras format!")
         return model
@@ -24,6 +36,24 @@ def load_model(model_path='./suicide_detection_model.keras'):
             print(f"Error loading suicide detection model: {e}")
             return None
 
+# --- Native Model Loading ---
+NATIVE_MODEL_PATH = './suicide_detection_model_multilingual.keras'
+
+def load_native_model(model_path=NATIVE_MODEL_PATH):
+    """Load the Devanagari-aware model trained by RNN_LSTM_multilingual.py, or None if unavailable."""
+    if not os.path.exists(model_path):
+        print(f"Multilingual model not found at {model_path}")
+        return None
+    import tensorflow as tf
+    import bilstm  # registers the custom standardizer the saved vectorizer refers to
+    try:
+        model = tf.keras.models.load_model(model_path)
+        print("Multilingual suicide detection model loaded successfully!")
+        return model
+    except Exception as e:
+        print(f"Error loading multilingual model: {e}")
+        return None
+
 # --- Prediction Function (same as predict.py) ---
 def predict_text(model, text):
     """
@@ -41,6 +71,8 @@ def predict_text(model, text):
     if not text: # Handle empty string after potential translation failure
         return 0.0, "non-suicide", 1.0
 
+    import tensorflow as tf
+
     # Convert text to tensor format expected by the model
     text_tensor = tf.convert_to_tensor([text])
 
@@ -53,7 +85,13 @@ def predict_text(model, text):
 
     return prediction, label, confidence
 
-# --- Translation Function ---
+# --- Translation Functions ---
+def init_gemini(api_key, model_name='gemini-2.0-flash'):
+    """Configure the Gemini client and return the translation model."""
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
 def translate_to_english(text, gemini_model):
     """Translates text to English using Gemini."""
     if not text:
@@ -77,28 +115,184 @@ def translate_to_english(text, gemini_model):
         print(f"Error during translation: {e}")
         return "" # Return empty string on error
 
+# --- Translation Memo ---
+class TranslationMemo:
+    """
+    Persistent cache of translations keyed by a hash of the source text.
+
+    Identical Devanagari messages come back on every detector sweep; with the
+    memo each distinct message is sent to Gemini once.
+
+    Args:
+        db_path: SQLite file to store translations in (None keeps them in memory only)
+    """
+
+    def __init__(self, db_path='./translation_memo.sqlite'):
+        self._db = sqlite3.connect(db_path or ':memory:', check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, translation TEXT NOT NULL)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(text.strip().encode('utf-8')).hexdigest()
+
+    def get(self, text):
+        with self._lock:
+            row = self._db.execute("SELECT translation FROM translations WHERE key = ?", (self.key(text),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, text, translation):
+        if not translation:
+            return  # never memoize failures
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO translations (key, translation) VALUES (?, ?)",
+                             (self.key(text), translation))
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+# --- Batched Translation ---
+def _segment_marker(i):
+    return f"<<<{i}>>>"
+
+def translate_batch(texts, gemini_model, memo=None, max_batch_chars=8000):
+    """
+    Translate many texts to English with as few Gemini calls as possible.
+
+    Texts already in the memo are not sent again. The rest are packed into
+    requests of at most max_batch_chars characters, each segment introduced by
+    a numbered <<<i>>> marker, and the response is split back on those markers.
+    If a response cannot be split cleanly, its texts are translated one by one.
+
+    Args:
+        texts: List of source strings
+        gemini_model: Any object with a generate_content(prompt) method
+        memo: Optional TranslationMemo
+        max_batch_chars: Upper bound on source characters per request
+
+    Returns:
+        List of translations (empty string where translation failed), in input order
+    """
+    translated = {}
+    pending = []
+    memo_hits = 0
+    for text in dict.fromkeys(t for t in texts if t):
+        cached = memo.get(text) if memo is not None else None
+        if cached is not None:
+            translated[text] = cached
+            memo_hits += 1
+        else:
+            pending.append(text)
+
+    batches, current, size = [], [], 0
+    for text in pending:
+        if current and size + len(text) > max_batch_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += len(text)
+    if current:
+        batches.append(current)
+
+    metrics.inc('translation_texts_total', memo_hits, source='memo')
+    metrics.inc('translation_texts_total', len(pending), source='gemini')
+    for batch in batches:
+        metrics.inc('translation_requests_total')
+        with metrics.span('translation_request'):
+            translations = _translate_segments(batch, gemini_model)
+        if translations is None:
+            metrics.inc('errors_total', stage='translation')
+            translations = [translate_to_english(text, gemini_model) for text in batch]
+        for text, translation in zip(batch, translations):
+            translated[text] = translation
+            if memo is not None:
+                memo.put(text, translation)
+    return [translated.get(text, "") for text in texts]
+
+def _translate_segments(segments, gemini_model):
+    """Translate delimited segments in one request; None if the reply cannot be split."""
+    if len(segments) == 1:
+        return [translate_to_english(segments[0], gemini_model)]
+    body = "\n".join(f"{_segment_marker(i)}\n{segment}" for i, segment in enumerate(segments))
+    prompt = (
+        "Translate each of the following segments to English. Keep every <<<n>>> marker "
+        "exactly as it is on its own line, followed by the translation of that segment. "
+        "Do not add anything else.\n\n" + body + "\n\nTranslation:"
+    )
+    try:
+        response = gemini_model.generate_content(prompt)
+        reply = ''.join(part.text for part in response.parts if hasattr(part, 'text'))
+    except Exception as e:
+        print(f"Error during batch translation: {e}")
+        return None
+
+    parts = re.split(r"<<<(\d+)>>>", reply)
+    translations = {}
+    for index, text in zip(parts[1::2], parts[2::2]):
+        translations[int(index)] = text.strip()
+    if sorted(translations) != list(range(len(segments))):
+        print("Warning: batch translation reply did not match the request; translating individually.")
+        return None
+    return [translations[i] for i in range(len(segments))]
+
 # --- Main Execution ---
 def main():
     """Command-line interface for text prediction with translation."""
+    parser = argparse.ArgumentParser(description="Suicide risk detection on Marathi/Hindi text")
+    parser.add_argument("--mode", choices=["auto", "native", "translate"], default="auto",
+                        help="native: score Devanagari directly with the multilingual model; "
+                             "translate: translate to English first; auto: native if that model is available")
+    parser.add_argument("--native-model-path", default=NATIVE_MODEL_PATH, help="Path to the multilingual .keras model")
+    parser.add_argument("--timings", action="store_true",
+                        help="Report import / model load / translation / first inference times as JSON on stderr")
+    args = parser.parse_args()
+    timings = {}
 
-    # --- Gemini Setup ---
-    try:
+    # --- Load Native (Devanagari-aware) Model ---
+    native_model = None
+    if args.mode != "translate" and os.path.exists(args.native_model_path):
+        with timed(timings, "import"):
+            import tensorflow  # noqa: F401
+        with timed(timings, "model_load"):
+            native_model = load_native_model(args.native_model_path)
+    if native_model is None and args.mode != "translate":
+        if args.mode == "native":
+            print(f"No usable multilingual model at {args.native_model_path}")
+            return
+        print("Falling back to translation + English model.")
+
+    if native_model is None:
+        # --- Gemini Setup ---
         api_key = os.environ.get("GOOGLE_API_KEY")
         if not api_key:
             print("Error: GOOGLE_API_KEY environment variable not set.")
             print("Please set the GOOGLE_API_KEY environment variable to your API key.")
             sys.exit(1) # Exit if API key is not set
-        genai.configure(api_key=api_key)
-        gemini_model = genai.GenerativeModel('gemini-2.0-flash')
-        print("Gemini model initialized successfully.")
-    except Exception as e:
-        print(f"Error initializing Gemini: {e}")
-        return
+        try:
+            with timed(timings, "import_genai"):
+                import google.generativeai  # noqa: F401
+            gemini_model = init_gemini(api_key)
+            print("Gemini model initialized successfully.")
+        except Exception as e:
+            print(f"Error initializing Gemini: {e}")
+            return
+        memo = TranslationMemo()
 
-    # --- Load Suicide Detection Model ---
-    suicide_model = load_model()
-    if suicide_model is None:
-        return
+        # --- Load Suicide Detection Model ---
+        with timed(timings, "import"):
+            import tensorflow  # noqa: F401
+        with timed(timings, "model_load"):
+            suicide_model = load_model()
+        if suicide_model is None:
+            return
 
     print("\nSuicide Risk Detection Model (Marathi/Hindi Input)")
     print("Enter your text in Marathi or Hindi (use multiple lines if needed)")
@@ -121,32 +315,44 @@ def main():
     user_input = '\n'.join(lines)
     print(f"\nOriginal Text ({len(user_input)} chars): {user_input[:100]}...") # Show snippet
 
-    # --- Translate Text ---
-    print("Translating text to English...")
-    translated_text = translate_to_english(user_input, gemini_model)
+    if native_model is not None:
+        # --- Predict directly on the Devanagari text ---
+        with timed(timings, "first_inference"):
+            prediction, label, confidence = predict_text(native_model, user_input)
+        source = "original text"
+    else:
+        # --- Translate Text ---
+        print("Translating text to English...")
+        with timed(timings, "translation"):
+            translated_text = translate_batch([user_input], gemini_model, memo)[0]
 
-    if not translated_text:
-        print("Translation failed or resulted in empty text. Skipping prediction.")
-        return
+        if not translated_text:
+            print("Translation failed or resulted in empty text. Skipping prediction.")
+            return
 
-    print(f"Translated Text ({len(translated_text)} chars): {translated_text[:100]}...") # Show snippet
+        print(f"Translated Text ({len(translated_text)} chars): {translated_text[:100]}...") # Show snippet
 
-    # --- Predict using Suicide Model ---
-    prediction, label, confidence = predict_text(suicide_model, translated_text)
+        # --- Predict using Suicide Model ---
+        with timed(timings, "first_inference"):
+            prediction, label, confidence = predict_text(suicide_model, translated_text)
+        source = "translated text"
 
     print(f"\nPrediction: {label}")
     print(f"Confidence: {confidence:.2%}")
-    print(f"Raw probability (based on translated text): {prediction:.4f}")
+    print(f"Raw probability (based on {source}): {prediction:.4f}")
 
     if label == "suicide":
         print("\n🟥This text indicates SUICIDAL Tendencies")
     else:
         print("\n️ 🟩This text doesn't strongly indicate suicidal Tendencies")
 
+    if args.timings:
+        report_startup(timings)
+
 if __name__ == "__main__":
     # Add a note about dependencies and API key
     print("---")
     print("Ensure you have installed the necessary libraries: pip install tensorflow google-generativeai")
-    print("Make sure the GOOGLE_API_KEY environment variable is set.")
+    print("Make sure the GOOGLE_API_KEY environment variable is set (not needed with the multilingual model).")
     print("---")
     main()
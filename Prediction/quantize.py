@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+import bilstm  # noqa: F401  registers custom standardizers used by saved models
+from export_tflite import VOCAB_PATH, convert_core, split_model, uses_masking, write_vocabulary
+from tflite_backend import TFLitePredictor, variant_path
+
+# --- Post-Training Quantization ---
+# Writes dynamic-range int8 and float16 variants of the exported TFLite model
+# and an accuracy-vs-latency report on the held-out split of test_model.py,
+# so the smallest variant that keeps recall above the threshold can be picked.
+# The predictor loads a variant with --quantization int8|float16.
+
+VARIANTS = [None, 'float16', 'int8']
+
+def classification_metrics(y_true, probabilities, threshold=0.5):
+    """Accuracy, precision, recall and F1 at a fixed threshold."""
+    y_pred = (probabilities > threshold).astype(int)
+    tp = int(np.sum((y_pred == 1) & (y_true == 1)))
+    fp = int(np.sum((y_pred == 1) & (y_true == 0)))
+    fn = int(np.sum((y_pred == 0) & (y_true == 1)))
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "accuracy": float(np.mean(y_pred == y_true)),
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+    }
+
+def measure_latency(predictor, texts, repeats=200, batch_size=32):
+    """Single-text p50/p95 latency (ms) and batch throughput (texts/s)."""
+    latencies = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        predictor.predict_proba([texts[i % len(texts)]])
+        latencies.append((time.perf_counter() - start) * 1000)
+    batch = [texts[i % len(texts)] for i in range(batch_size * 10)]
+    start = time.perf_counter()
+    predictor.predict_proba(batch, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "throughput_per_s": len(batch) / elapsed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the suicide detection model and report accuracy vs latency")
+    parser.add_argument("--model-path", default="./suicide_detection_model.keras")
+    parser.add_argument("--vocab-path", default=VOCAB_PATH)
+    parser.add_argument("--csv", default="Suicide_Detection.csv", help="Dataset for the held-out evaluation split")
+    parser.add_argument("--min-recall", type=float, default=0.90, help="Recall the recommended variant must keep")
+    parser.add_argument("--report", default="quantization_report.json")
+    args = parser.parse_args()
+
+    from test_model import prepare_test_data
+
+    model = tf.keras.models.load_model(args.model_path)
+    vectorize_layer, core = split_model(model)
+    write_vocabulary(vectorize_layer, args.vocab_path, dynamic_padding=uses_masking(model))
+    sequence_length = vectorize_layer.get_config()['output_sequence_length']
+
+    test_df = prepare_test_data(args.csv)
+    texts = test_df['text'].astype(str).tolist()
+    y_true = test_df['class'].values.astype(int)
+
+    report = {"model": args.model_path, "test_rows": len(texts), "min_recall": args.min_recall, "variants": []}
+    for quantization in VARIANTS:
+        path = variant_path(quantization)
+        with open(path, 'wb') as f:
+            f.write(convert_core(core, quantization, sequence_length))
+        predictor = TFLitePredictor(path, args.vocab_path)
+
+        probabilities = predictor.predict_proba(texts, batch_size=256)
+        entry = {
+            "quantization": quantization or "float32",
+            "path": path,
+            "size_bytes": os.path.getsize(path),
+            **classification_metrics(y_true, probabilities),
+            **measure_latency(predictor, texts),
+        }
+        report["variants"].append(entry)
+        print(f"{entry['quantization']:>8}: {entry['size_bytes'] / 1e6:6.2f} MB  "
+              f"recall {entry['recall']:.4f}  precision {entry['precision']:.4f}  "
+              f"p50 {entry['p50_ms']:.2f} ms  {entry['throughput_per_s']:.0f} texts/s")
+
+    eligible = [v for v in report["variants"] if v["recall"] >= args.min_recall]
+    recommended = min(eligible, key=lambda v: v["size_bytes"]) if eligible else None
+    report["recommended"] = recommended["quantization"] if recommended else None
+    if recommended:
+        print(f"\nSmallest variant with recall >= {args.min_recall:.2f}: {recommended['quantization']}")
+    else:
+        print(f"\nNo variant keeps recall >= {args.min_recall:.2f}")
+
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import metrics
+from batcher import MicroBatcher, gather
+from cache import PredictionCache, model_version
+from incremental import ConversationScorer
+from predict import DEFAULT_MODEL_PATHS, classify, import_backend, load_predictor, predict_batch, timed
+
+# --- Scoring Daemon ---
+# Keeps the suicide detection model warm in a single long-lived process so the
+# detector no longer pays for the TensorFlow import and model load per chat.
+#
+# Protocol (JSON lines over stdin/stdout):
+#   request:  {"id": 1, "text": "...", "language": "english" | "marathi"}
+#             (marathi is scored natively when the multilingual model is present,
+#             otherwise translated with Gemini first)
+#   response: {"id": 1, "probability": 0.93, "label": "suicide", "confidence": 0.93}
+#   batch:    {"id": 2, "texts": ["...", "..."]} -> {"id": 2, "results": [{...}, {...}]}
+#   incremental: {"id": 3, "uuid": "...", "messages": ["...", ...]} -> same fields as a
+#             single request, scored only on messages not seen before (see incremental.py)
+#   stats:    {"id": 4, "stats": true} -> {"id": 4, "cache": {"hits_memory": ..., "misses": ...},
+#             "cascade": {"stage1_hit_rate": ..., ...} (with --cascade)}
+#   error:    {"id": 1, "error": "..."}
+# With --metrics-port the same counters, plus timing spans for vectorize,
+# forward pass, translation and whole requests, are served in the Prometheus
+# text format on http://127.0.0.1:PORT/metrics; --metrics-file appends JSON
+# snapshots instead (see metrics.py). Neither touches stdout.
+# A single {"ready": true, "startup": {...}} line is written once the model has
+# been loaded and warmed up; "startup" breaks down import, model load and first
+# inference time in seconds.
+#
+# Requests are answered as soon as they are scored, so responses may arrive
+# out of order; clients match them by id. Texts from concurrent requests are
+# merged into micro-batches (see batcher.py) before reaching the model, and
+# texts already scored by the same model version are answered from the
+# prediction cache (see cache.py) without touching the model at all. With
+# --windowed, texts longer than the model's input are scored as overlapping
+# windows instead of being truncated (see windowing.py). Gemini translations
+# run on a small worker pool (--translation-workers), so a slow translation
+# holds up only its own request, not reading and batching of the others.
+
+class ModelQueue:
+    """One loaded model with its micro-batcher and (optional) prediction cache."""
+
+    def __init__(self, model, max_batch_size=32, max_delay_ms=5, cache=None, name="english"):
+        self.model = model
+        self.batcher = MicroBatcher(
+            lambda texts: predict_batch(self.model, texts, batch_size=max_batch_size),
+            max_batch_size=max_batch_size,
+            max_delay_ms=max_delay_ms,
+            name=name,
+        )
+        self.cache = cache
+
+    def submit(self, text):
+        """Answer text from the cache, or queue it on the micro-batcher and cache the result."""
+        if self.cache is None:
+            return self.batcher.submit(text)
+
+        probability = self.cache.get(text)
+        if probability is not None:
+            future = Future()
+            future.set_result(classify(probability))
+            return future
+
+        def store(prediction):
+            self.cache.put(text, prediction[0])
+            return prediction
+
+        return chain(self.batcher.submit(text), store)
+
+    def submit_many(self, texts):
+        """Like submit() for several texts; resolves to the list of results."""
+        return gather([self.submit(text) for text in texts])
+
+    def stats(self):
+        stats = {"cache": self.cache.stats() if self.cache is not None else None}
+        if hasattr(self.model, "stats"):
+            # Cascade: per-stage hit rates and latency
+            stats["cascade"] = self.model.stats()
+        return stats
+
+    def close(self):
+        self.batcher.close()
+        if self.cache is not None:
+            self.cache.close()
+
+class Scorer:
+    """
+    Routes requests to the English model queue or, for Marathi/Hindi, to the
+    native multilingual queue when one is loaded and to translation + the
+    English queue otherwise. Translation runs on a worker pool and its result
+    is queued from there, so it never blocks the caller.
+    """
+
+    def __init__(self, english, native=None, conversations=None,
+                 translation_memo_path='./translation_memo.sqlite', translation_workers=4):
+        self.english = english
+        self.native = native
+        self.conversations = conversations or ConversationScorer()
+        self.translation_memo_path = translation_memo_path
+        self._gemini_model = None
+        self._translation_memo = None
+        self._translator_lock = threading.Lock()
+        self._translation_pool = ThreadPoolExecutor(max_workers=translation_workers,
+                                                    thread_name_prefix="translation")
+
+    def translator(self):
+        """Initialize the Gemini translation model and memo on first use."""
+        with self._translator_lock:
+            if self._gemini_model is None:
+                from predict_marathi import TranslationMemo, init_gemini
+                api_key = os.environ.get("GOOGLE_API_KEY")
+                if not api_key:
+                    raise RuntimeError("GOOGLE_API_KEY environment variable not set")
+                self._translation_memo = TranslationMemo(self.translation_memo_path)
+                self._gemini_model = init_gemini(api_key)
+                print("Gemini model initialized successfully.")
+            return self._gemini_model
+
+    def translate(self, texts):
+        """Translate Marathi/Hindi texts to English before scoring."""
+        from predict_marathi import translate_batch
+        with metrics.span('translation'):
+            translated = translate_batch(texts, self.translator(), self._translation_memo)
+        if not all(translated):
+            raise RuntimeError("Translation failed or resulted in empty text")
+        return translated
+
+    def route(self, language):
+        """Return (queue, transform) for a request language; transform may be None."""
+        if language != "marathi":
+            return self.english, None
+        if self.native is not None:
+            return self.native, None
+        return self.english, self.translate
+
+    def score(self, text, language="english"):
+        """
+        Queue a single text for scoring.
+
+        Args:
+            text: String text input
+            language: "english" or "marathi"
+
+        Returns:
+            Future resolving to a dict with probability, label and confidence
+        """
+        queue, transform = self.route(language)
+        if transform is None:
+            return chain(queue.submit(text), to_result)
+        translated = self._translation_pool.submit(transform, [text])
+        return chain(then(translated, lambda texts: queue.submit(texts[0])), to_result)
+
+    def score_batch(self, texts, language="english"):
+        """Queue a list of texts; returns a Future resolving to a list of result dicts."""
+        queue, transform = self.route(language)
+        if transform is None:
+            scored = queue.submit_many(texts)
+        else:
+            scored = then(self._translation_pool.submit(transform, texts), queue.submit_many)
+        return chain(scored, lambda results: [to_result(r) for r in results])
+
+    def score_conversation(self, uuid, messages, language="english"):
+        """Queue only the unseen messages of a conversation; resolves to the conversation result."""
+        queue, transform = self.route(language)
+        if transform is None:
+            prepared = Future()
+            prepared.set_result(self.conversations.prepare(uuid, messages))
+        else:
+            prepared = self._translation_pool.submit(self.conversations.prepare, uuid, messages, transform)
+
+        def submit(prepared):
+            pending, texts = prepared
+            return chain(
+                queue.submit_many(texts),
+                lambda results: to_result(self.conversations.commit(uuid, pending, [r[0] for r in results])),
+            )
+
+        return then(prepared, submit)
+
+    def stats(self):
+        memo = self._translation_memo
+        return {
+            **self.english.stats(),
+            "native": self.native.stats() if self.native is not None else None,
+            "translation_memo": {"hits": memo.hits, "misses": memo.misses} if memo is not None else None,
+        }
+
+    def close(self):
+        # Translations in flight still queue their texts; let them finish first
+        self._translation_pool.shutdown(wait=True)
+        self.english.close()
+        if self.native is not None:
+            self.native.close()
+        if self._translation_memo is not None:
+            self._translation_memo.close()
+
+def stats_gauges(scorer):
+    """Flatten the numeric fields of Scorer.stats() into {(name, labels): value} for metrics.py."""
+    gauges = {}
+
+    def add(prefix, values, labels):
+        for key, value in (values or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges[(f"{prefix}_{key}", labels)] = value
+
+    stats = scorer.stats()
+    for queue, queue_stats in (("english", stats), ("native", stats.get("native"))):
+        if queue_stats is None:
+            continue
+        add("cache", queue_stats.get("cache"), (("queue", queue),))
+        add("cascade", queue_stats.get("cascade"), (("queue", queue),))
+    add("translation_memo", stats.get("translation_memo"), ())
+    return gauges
+
+def request_kind(request):
+    """Label for a request's metrics: stats, batch, conversation or single."""
+    if request.get("stats"):
+        return "stats"
+    if "texts" in request:
+        return "batch"
+    if "messages" in request:
+        return "conversation"
+    return "single"
+
+def to_result(prediction):
+    """Convert a (prediction, label, confidence) tuple to a JSON-serializable dict."""
+    probability, label, confidence = prediction
+    return {
+        "probability": float(probability),
+        "label": label,
+        "confidence": float(confidence),
+    }
+
+def chain(future, fn):
+    """Return a Future resolving to fn(result of future)."""
+    chained = Future()
+
+    def on_done(done):
+        try:
+            chained.set_result(fn(done.result()))
+        except Exception as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(on_done)
+    return chained
+
+def then(future, fn):
+    """Return a Future resolving to the result of the Future that fn(result of future) returns."""
+    chained = Future()
+
+    def on_inner(inner):
+        try:
+            chained.set_result(inner.result())
+        except Exception as e:
+            chained.set_exception(e)
+
+    def on_done(done):
+        try:
+            fn(done.result()).add_done_callback(on_inner)
+        except Exception as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(on_done)
+    return chained
+
+def handle_request(scorer, request):
+    """Dispatch one decoded request; returns a Future resolving to the response fields."""
+    if request.get("stats"):
+        future = Future()
+        future.set_result(scorer.stats())
+        return future
+
+    language = request.get("language", "english")
+    if "texts" in request:
+        texts = request["texts"]
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise ValueError("'texts' must be a list of strings")
+        return chain(scorer.score_batch(texts, language), lambda results: {"results": results})
+
+    if "messages" in request:
+        uuid = request.get("uuid")
+        messages = request["messages"]
+        if not isinstance(uuid, str) or not uuid:
+            raise ValueError("'uuid' is required with 'messages'")
+        if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+            raise ValueError("'messages' must be a list of strings")
+        return scorer.score_conversation(uuid, messages, language)
+
+    text = request.get("text")
+    if not isinstance(text, str):
+        raise ValueError("'text' must be a string")
+    return scorer.score(text, language)
+
+def serve(scorer, requests, out):
+    """Read JSON-line requests until EOF, writing one response line per request."""
+    write_lock = threading.Lock()
+
+    def respond(response):
+        with write_lock:
+            out.write(json.dumps(response) + "\n")
+            out.flush()
+
+    def on_scored(request_id, kind, start):
+        def callback(future):
+            metrics.observe('request_seconds', time.perf_counter() - start, kind=kind)
+            try:
+                respond({"id": request_id, **future.result()})
+            except Exception as e:
+                metrics.inc('errors_total', stage='request')
+                respond({"id": request_id, "error": str(e)})
+        return callback
+
+    for line in requests:
+        line = line.strip()
+        if not line:
+            continue
+        start = time.perf_counter()
+        request = {}
+        try:
+            request = json.loads(line)
+            kind = request_kind(request)
+            metrics.inc('requests_total', kind=kind)
+            future = handle_request(scorer, request)
+        except Exception as e:
+            metrics.inc('errors_total', stage='parse')
+            respond({"id": request.get("id") if isinstance(request, dict) else None, "error": str(e)})
+            continue
+        future.add_done_callback(on_scored(request.get("id"), kind, start))
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived JSON-lines scoring daemon for the suicide detection model")
+    parser.add_argument("--backend", choices=["keras", "tflite"], default="keras",
+                        help="keras: full TensorFlow model; tflite: exported model on the lightweight runtime")
+    parser.add_argument("--model-path", default=None, help="Model file (defaults to the backend's standard path)")
+    parser.add_argument("--vocab-path", default="./suicide_detection_vocab.json", help="Vocabulary file for the tflite backend")
+    parser.add_argument("--quantization", choices=["int8", "float16"], default=None,
+                        help="Use a quantized TFLite variant written by quantize.py (implies --backend tflite)")
+    parser.add_argument("--cascade", default=None, metavar="FILTER_PATH",
+                        help="Screen English texts with the n-gram first stage from cascade.py; "
+                             "only uncertain ones reach the model")
+    parser.add_argument("--cascade-band", type=float, nargs=2, default=None, metavar=("LOW", "HIGH"),
+                        help="First-stage probabilities strictly between LOW and HIGH go to the model")
+    parser.add_argument("--fast", action="store_true",
+                        help="Score the keras model through an XLA-compiled signature fixed at --max-batch-size rows")
+    parser.add_argument("--windowed", action="store_true",
+                        help="Score texts longer than the model's input as overlapping windows (see windowing.py)")
+    parser.add_argument("--window-size", type=int, default=None, help="Words per window (default: model input length)")
+    parser.add_argument("--window-stride", type=int, default=None, help="Words between window starts (default: 3/4 of the size)")
+    parser.add_argument("--window-combine", choices=["max", "mean", "attention"], default="max",
+                        help="How window scores combine into one risk score")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="Largest micro-batch sent to the model")
+    parser.add_argument("--max-delay-ms", type=float, default=5, help="Longest time a request waits for its micro-batch to fill")
+    parser.add_argument("--context-tokens", type=int, default=50, help="Words of earlier conversation prepended to each new message")
+    parser.add_argument("--combine", choices=["max", "mean", "ewma"], default="max", help="How turn scores combine into a conversation score")
+    parser.add_argument("--cache-size", type=int, default=10000, help="Entries in the in-memory prediction cache (0 disables caching)")
+    parser.add_argument("--cache-db", default=None, help="Optional SQLite file for the on-disk prediction cache tier")
+    parser.add_argument("--cache-db-max-rows", type=int, default=1000000, help="Row limit of the on-disk prediction cache")
+    parser.add_argument("--translation-memo", default="./translation_memo.sqlite", help="SQLite file memoizing Marathi/Hindi translations")
+    parser.add_argument("--native-model-path", default="./suicide_detection_model_multilingual.keras",
+                        help="Devanagari-aware model used for Marathi/Hindi without translation, if present")
+    parser.add_argument("--translation-workers", type=int, default=4,
+                        help="Threads translating Marathi/Hindi requests concurrently with batching")
+    parser.add_argument("--translate-only", action="store_true", help="Always translate Marathi/Hindi instead of using the native model")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file", default=None, help="Append a JSON metrics snapshot to this file periodically")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between --metrics-file snapshots")
+    args = parser.parse_args()
+    if args.quantization:
+        from tflite_backend import variant_path
+        args.backend = "tflite"
+        model_path = args.model_path or variant_path(args.quantization)
+    else:
+        model_path = args.model_path or DEFAULT_MODEL_PATHS[args.backend]
+
+    # stdout is reserved for protocol messages; send everything else
+    # (model loading chatter, Keras progress bars) to stderr.
+    out = sys.stdout
+    sys.stdout = sys.stderr
+
+    timings = {}
+    with timed(timings, "import"):
+        import_backend(args.backend)
+    with timed(timings, "model_load"):
+        model = load_predictor(args.backend, model_path, args.vocab_path,
+                               fast=args.fast, batch_size=args.max_batch_size)
+    if model is None:
+        out.write(json.dumps({"ready": False, "error": "model failed to load"}) + "\n")
+        out.flush()
+        sys.exit(1)
+
+    # Backends score the same model file slightly differently (XLA/bfloat16,
+    # quantized weights); keep their cached results apart
+    backend_variant = f":{args.backend}:{args.quantization or 'float32'}"
+    if args.fast and args.backend == "keras":
+        backend_variant += f":fast:{args.max_batch_size}"
+
+    def make_cache(model_path, variant=""):
+        if not os.path.exists(model_path):
+            print(f"Prediction cache disabled: cannot version {model_path}")
+            return None
+        if args.cache_size <= 0 and not args.cache_db:
+            return None
+        return PredictionCache(model_version(model_path) + variant, max_entries=args.cache_size,
+                               db_path=args.cache_db, max_db_rows=args.cache_db_max_rows)
+
+    def windowed(model):
+        """The model behind a WindowedPredictor with --windowed, and its cache key suffix."""
+        if not args.windowed:
+            return model, ""
+        from windowing import WindowedPredictor
+        wrapped = WindowedPredictor(model, args.window_size, args.window_stride, args.window_combine)
+        return wrapped, f":windowed:{wrapped.size}:{wrapped.stride}:{wrapped.mode}"
+
+    english_model, cache_variant = windowed(model)
+    if args.windowed:
+        print(f"Windowed scoring: {english_model.size}-word windows every {english_model.stride} words, "
+              f"combined by {english_model.mode}")
+    if args.cascade:
+        from cascade import DEFAULT_BAND, CascadeScorer, NgramFilter
+        low, high = args.cascade_band or DEFAULT_BAND
+        english_model = CascadeScorer(NgramFilter.load(args.cascade), english_model, low, high)
+        # Cascaded scores differ from the model's alone; keep them apart in the cache
+        cache_variant += f":cascade:{model_version(args.cascade)}:{low}:{high}"
+        print(f"Cascade enabled: band ({low}, {high})")
+    english = ModelQueue(english_model, args.max_batch_size, args.max_delay_ms,
+                         make_cache(model_path, backend_variant + cache_variant))
+
+    native = None
+    if not args.translate_only:
+        from predict_marathi import load_native_model
+        native_model = load_native_model(args.native_model_path)
+        if native_model is not None:
+            native_model, native_variant = windowed(native_model)
+            native = ModelQueue(native_model, args.max_batch_size, args.max_delay_ms,
+                                make_cache(args.native_model_path, native_variant), name="native")
+    if native is None:
+        print("Marathi/Hindi requests will be translated and scored with the English model.")
+
+    # Trace the inference graph now rather than on the first real request
+    # (the model itself, so a cascade in front of it cannot skip the warm-up)
+    with timed(timings, "first_inference"):
+        predict_batch(model, ["warm up"])
+
+    conversations = ConversationScorer(context_tokens=args.context_tokens, combine=args.combine)
+    scorer = Scorer(english, native, conversations=conversations, translation_memo_path=args.translation_memo,
+                    translation_workers=args.translation_workers)
+    metrics.REGISTRY.register_collector(lambda: stats_gauges(scorer))
+    if args.metrics_port is not None:
+        metrics.serve_http(args.metrics_port)
+    metrics_writer = metrics.JsonLinesWriter(args.metrics_file, args.metrics_interval) if args.metrics_file else None
+    startup = {name: round(seconds, 4) for name, seconds in timings.items()}
+    out.write(json.dumps({"ready": True, "startup": startup}) + "\n")
+    out.flush()
+    try:
+        serve(scorer, sys.stdin, out)
+    finally:
+        # Drain queued requests before exiting
+        scorer.close()
+        if metrics_writer is not None:
+            metrics_writer.close()
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import { fileURLToPath } from 'url';
 import { dirname } from 'path';
 import dotenv from 'dotenv';
 import fs from 'fs';
+import readline from 'readline';
 
 // Load environment variables from .env file
 dotenv.config();
@@ -63,92 +64,146 @@ const containsMarathiOrHindi = (text) => {
   return devanagariRange.test(text);
 };
 
-// Function to run prediction on text using the appropriate model
-const runPrediction = (text, useMarathiModel = false) => {
-  return new Promise((resolve, reject) => {
-    // Determine which script to use
-    const scriptPath = path.join(__dirname, useMarathiModel ? 'predict_marathi.py' : 'predict.py');
-    const scriptName = useMarathiModel ? 'predict_marathi.py' : 'predict.py';
-    
-    log(`Running prediction using ${scriptName}`);
-    log(`Text length: ${text.length} characters`, 'DEBUG', false);
-    
-    // Log a snippet of the text (first 200 chars) to avoid excessive logging
-    const textSnippet = text.length > 200 ? text.substring(0, 200) + '...' : text;
-    log(`Text snippet: ${textSnippet}`, 'DEBUG', false);
-    
-    const pythonProcess = spawn('python3', [scriptPath]);
-    
-    let outputData = '';
-    let errorData = '';
+// Persistent scoring daemon (serve.py). The model is loaded once and every
+// prediction is a JSON-lines request/response over the daemon's stdin/stdout.
+let scorerProcess = null;
+let scorerReady = null;
+let nextRequestId = 1;
+const pendingRequests = new Map();
 
-    // Send text to stdin
-    pythonProcess.stdin.write(text + '\n');
-    pythonProcess.stdin.write('END\n\n');
-    pythonProcess.stdin.end();
+const startScorer = () => {
+  if (scorerReady) return scorerReady;
 
-    // Collect stdout data
-    pythonProcess.stdout.on('data', (data) => {
-      outputData += data.toString();
-    });
+  log('Starting scoring daemon serve.py');
+  const pythonProcess = spawn('python3', [path.join(__dirname, 'serve.py')], { cwd: __dirname });
+  scorerProcess = pythonProcess;
 
-    // Collect stderr data
-    pythonProcess.stderr.on('data', (data) => {
-      errorData += data.toString();
-      log(`Python error output: ${data.toString()}`, 'ERROR');
-    });
+  scorerReady = new Promise((resolve, reject) => {
+    const lines = readline.createInterface({ input: pythonProcess.stdout });
 
-    // Handle process completion
-    pythonProcess.on('close', (code) => {
-      if (code !== 0) {
-        log(`Python process exited with code ${code}`, 'ERROR');
-        log(`Full error output: ${errorData}`, 'ERROR');
-        reject(new Error(`Python process failed with code ${code}`));
+    lines.on('line', (line) => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (error) {
+        log(`Unparseable scorer output: ${line}`, 'ERROR');
         return;
       }
 
-      try {
-        // Log the full Python output to log file (but not console)
-        log(`Full Python output: ${outputData}`, 'DEBUG', false);
-        
-        // Parse prediction results from output
-        const predictionMatch = outputData.match(/Prediction: (suicide|non-suicide)/i);
-        const confidenceMatch = outputData.match(/Confidence: (\d+\.\d+)%/);
-        
-        if (!predictionMatch || !confidenceMatch) {
-          log('Failed to parse prediction output', 'ERROR');
-          log(`Output was: ${outputData}`, 'ERROR');
-          reject(new Error('Failed to parse prediction output'));
-          return;
-        }
-
-        const predictionType = predictionMatch[1].toLowerCase();
-        let confidence = parseFloat(confidenceMatch[1]);
-
-        // Calculate suicide risk percentage
-        let suicideRiskPercent;
-        if (predictionType === 'suicide') {
-          suicideRiskPercent = confidence;
+      if ('ready' in message) {
+        if (message.ready) {
+          log(`Scoring daemon ready (startup: ${JSON.stringify(message.startup)})`);
+          resolve(pythonProcess);
         } else {
-          // If non-suicide, invert the confidence as requested
-          suicideRiskPercent = 100 - confidence;
+          reject(new Error(`Scoring daemon failed to start: ${message.error}`));
         }
+        return;
+      }
 
-        log(`Prediction result: ${predictionType}, Confidence: ${confidence}%, Risk: ${suicideRiskPercent}%`);
-        
-        resolve({
-          suicideRiskPercent,
-          predictionType,
-          modelUsed: useMarathiModel ? 'marathi' : 'english'
-        });
-      } catch (error) {
-        log(`Error parsing prediction output: ${error}`, 'ERROR');
-        reject(error);
+      const pending = pendingRequests.get(message.id);
+      if (!pending) return;
+      pendingRequests.delete(message.id);
+      if (message.error) {
+        pending.reject(new Error(message.error));
+      } else {
+        pending.resolve(message);
+      }
+    });
+
+    // A missing python3, a dead daemon or a broken stdin pipe all end up
+    // here: reject the startup promise and everything still in flight so the
+    // callers see an error instead of the detector crashing.
+    const fail = (error) => {
+      reject(error);
+      for (const pending of pendingRequests.values()) {
+        pending.reject(error);
+      }
+      pendingRequests.clear();
+      if (scorerProcess === pythonProcess) {
+        scorerProcess = null;
+        scorerReady = null;
       }
+    };
+
+    pythonProcess.on('error', (error) => {
+      log(`Scoring daemon error: ${error.message}`, 'ERROR');
+      fail(new Error(`Scoring daemon error: ${error.message}`));
+      pythonProcess.kill('SIGTERM');
+    });
+
+    pythonProcess.stdin.on('error', (error) => {
+      log(`Scoring daemon stdin error: ${error.message}`, 'ERROR');
+      fail(new Error(`Scoring daemon stdin error: ${error.message}`));
+    });
+
+    pythonProcess.on('close', (code) => {
+      log(`Scoring daemon exited with code ${code}`, code === 0 ? 'INFO' : 'ERROR');
+      fail(new Error(`Scoring daemon exited with code ${code}`));
     });
   });
+
+  // TensorFlow writes its startup chatter to stderr; keep it out of the console
+  pythonProcess.stderr.on('data', (data) => {
+    log(`Scorer stderr: ${data.toString()}`, 'DEBUG', false);
+  });
+
+  return scorerReady;
+};
+
+const sendToScorer = async (request) => {
+  const pythonProcess = await startScorer();
+  const id = nextRequestId++;
+  return new Promise((resolve, reject) => {
+    if (scorerProcess !== pythonProcess || !pythonProcess.stdin.writable) {
+      reject(new Error('Scoring daemon exited'));
+      return;
+    }
+    pendingRequests.set(id, { resolve, reject });
+    pythonProcess.stdin.write(JSON.stringify({ id, ...request }) + '\n');
+  });
+};
+
+const stopScorer = () => {
+  if (scorerProcess) {
+    scorerProcess.stdin.end();
+    scorerProcess.kill('SIGTERM');
+  }
+};
+
+// Function to run prediction on a batch of conversations using the appropriate model.
+// Each conversation is sent as an incremental request keyed by uuid, so the
+// daemon only scores messages it has not seen yet; the requests are issued
+// together and merged into micro-batches on the Python side.
+const runPredictionBatch = async (chatLogs, useMarathiModel = false) => {
+  const modelUsed = useMarathiModel ? 'marathi' : 'english';
+
+  log(`Running batch prediction on ${chatLogs.length} conversations using the ${modelUsed} scoring path`);
+
+  const settled = await Promise.allSettled(chatLogs.map((chatLog) => sendToScorer({
+    uuid: chatLog.uuid,
+    messages: chatLog.chatHistory,
+    language: modelUsed
+  })));
+
+  return settled.map((outcome) => {
+    if (outcome.status === 'rejected') return outcome;
+    const result = outcome.value;
+    const suicideRiskPercent = result.probability * 100;
+    log(`Prediction result: ${result.label}, Confidence: ${(result.confidence * 100).toFixed(2)}%, Risk: ${suicideRiskPercent}%`, 'DEBUG', false);
+    return {
+      status: 'fulfilled',
+      value: {
+        suicideRiskPercent,
+        predictionType: result.label,
+        modelUsed
+      }
+    };
+  });
 };
 
+// Number of conversations sent to the scoring daemon at once
+const SWEEP_BATCH_SIZE = parseInt(process.env.SWEEP_BATCH_SIZE || '64');
+
 // Function to determine risk level based on percentage
 const getRiskLevel = (percentage) => {
   if (percentage >= 80) return 'high';
@@ -166,6 +221,8 @@ const processAllChats = async () => {
     const chatLogs = await ChatLog.find({}).sort({ timestamp: -1 });
     log(`Found ${chatLogs.length} chat logs to process`);
     
+    // Collect the chat logs that have new messages since their last prediction
+    const pending = { english: [], marathi: [] };
     for (const chatLog of chatLogs) {
       try {
         log(`Processing UUID: ${chatLog.uuid}, IP: ${chatLog.ipAddress || 'N/A'}`);
@@ -183,7 +240,8 @@ const processAllChats = async () => {
           continue;
         }
         
-        // Combine all chat history into one string
+        // Join the history only to log its size and detect its script;
+        // scoring itself is incremental per message
         const fullText = chatLog.chatHistory.join(' ');
         log(`Processing chat log for ${chatLog.uuid} with ${chatLog.chatHistory.length} messages, total length: ${fullText.length} chars`);
         
@@ -191,35 +249,52 @@ const processAllChats = async () => {
         const useMarathiModel = containsMarathiOrHindi(fullText);
         log(`Using ${useMarathiModel ? 'Marathi' : 'English'} model for prediction`);
         
-        // Run prediction
-        const predictionResult = await runPrediction(fullText, useMarathiModel);
-        
-        // Determine risk level
-        const riskLevel = getRiskLevel(predictionResult.suicideRiskPercent);
-        
-        // Update chat log with prediction results
-        chatLog.suicideRiskPercent = predictionResult.suicideRiskPercent;
-        chatLog.riskLevel = riskLevel;
-        await chatLog.save();
-        log(`Updated ChatLog with suicideRiskPercent: ${predictionResult.suicideRiskPercent}%, riskLevel: ${riskLevel}`);
-        
-        // Save prediction result
-        const newPrediction = await PredictionResult.create({
-          ipAddress: chatLog.ipAddress,
-          uuid: chatLog.uuid,
-          lastProcessedTimestamp: chatLog.timestamp,
-          suicideRiskPercent: predictionResult.suicideRiskPercent,
-          riskLevel: riskLevel,
-          modelUsed: predictionResult.modelUsed
-        });
-        log(`Created PredictionResult record: ${newPrediction._id}`);
-        
-        log(`Successfully processed ${chatLog.uuid}: Risk ${predictionResult.suicideRiskPercent.toFixed(2)}%, Level: ${riskLevel}, Model: ${predictionResult.modelUsed}`);
+        pending[useMarathiModel ? 'marathi' : 'english'].push(chatLog);
       } catch (error) {
         log(`Error processing chat log ${chatLog.uuid}: ${error}`, 'ERROR');
         // Continue with next chat log
       }
     }
+
+    for (const [language, entries] of Object.entries(pending)) {
+      for (let start = 0; start < entries.length; start += SWEEP_BATCH_SIZE) {
+        const batch = entries.slice(start, start + SWEEP_BATCH_SIZE);
+
+        const predictionResults = await runPredictionBatch(batch, language === 'marathi');
+
+        for (const [i, chatLog] of batch.entries()) {
+          try {
+            if (predictionResults[i].status === 'rejected') throw predictionResults[i].reason;
+            const predictionResult = predictionResults[i].value;
+
+            // Determine risk level
+            const riskLevel = getRiskLevel(predictionResult.suicideRiskPercent);
+            
+            // Update chat log with prediction results
+            chatLog.suicideRiskPercent = predictionResult.suicideRiskPercent;
+            chatLog.riskLevel = riskLevel;
+            await chatLog.save();
+            log(`Updated ChatLog with suicideRiskPercent: ${predictionResult.suicideRiskPercent}%, riskLevel: ${riskLevel}`);
+            
+            // Save prediction result
+            const newPrediction = await PredictionResult.create({
+              ipAddress: chatLog.ipAddress,
+              uuid: chatLog.uuid,
+              lastProcessedTimestamp: chatLog.timestamp,
+              suicideRiskPercent: predictionResult.suicideRiskPercent,
+              riskLevel: riskLevel,
+              modelUsed: predictionResult.modelUsed
+            });
+            log(`Created PredictionResult record: ${newPrediction._id}`);
+            
+            log(`Successfully processed ${chatLog.uuid}: Risk ${predictionResult.suicideRiskPercent.toFixed(2)}%, Level: ${riskLevel}, Model: ${predictionResult.modelUsed}`);
+          } catch (error) {
+            log(`Error processing chat log ${chatLog.uuid}: ${error}`, 'ERROR');
+            // Continue with next chat log
+          }
+        }
+      }
+    }
     
     log('Finished processing all chat logs');
   } catch (error) {
@@ -236,9 +311,18 @@ const processAllChats = async () => {
  * Environment variables:
  * - MONGO_URI: MongoDB connection string (required)
  * - PROCESSING_INTERVAL_MINUTES: Interval between processing runs (default: 15)
+ * - SWEEP_BATCH_SIZE: Number of conversations sent to the scoring daemon at once (default: 64)
  * - GOOGLE_API_KEY: API key for Google's services (required for Marathi/Hindi detection)
+ * - SWEEP_WORKER: set when Prediction/sweep.py does the sweeping; this loop is then
+ *   switched off, so chats are not scored twice and PredictionResult keeps
+ *   sweep.py's one row per (uuid, ipAddress)
  */
 const startDetectorService = async (intervalMinutes = 15) => {
+  if (process.env.SWEEP_WORKER) {
+    log('SWEEP_WORKER is set: chats are swept by sweep.py, detector loop disabled');
+    return;
+  }
+
   try {
     // Log startup information
     log(`Starting Detector Service with ${intervalMinutes} minute interval`);
@@ -262,6 +346,7 @@ const startDetectorService = async (intervalMinutes = 15) => {
     process.on('SIGINT', () => {
       log('Received SIGINT. Gracefully shutting down...', 'INFO');
       clearInterval(intervalId);
+      stopScorer();
       log('Detector service stopped.', 'INFO');
       process.exit(0);
     });
@@ -269,6 +354,7 @@ const startDetectorService = async (intervalMinutes = 15) => {
     process.on('SIGTERM', () => {
       log('Received SIGTERM. Gracefully shutting down...', 'INFO');
       clearInterval(intervalId);
+      stopScorer();
       log('Detector service stopped.', 'INFO');
       process.exit(0);
     });
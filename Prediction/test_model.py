@@ -1,9 +1,10 @@
+import argparse
+
 import tensorflow as tf
-import pandas as pd
-import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-from sklearn.metrics import confusion_matrix, classification_report
+from sklearn.metrics import classification_report
+
+import evaluation
+from data_loader import load_split
 
 def load_model(model_path='./suicide_detection_model.keras'):
     """Load the saved model."""
@@ -16,61 +17,41 @@ def load_model(model_path='./suicide_detection_model.keras'):
         return None
 
 def prepare_test_data(csv_path='Suicide_Detection.csv', test_size=0.2):
-    """Load and prepare test data."""
-    # Load dataset
-    df = pd.read_csv(csv_path, index_col=0)
-    df['class'] = df['class'].map({'suicide': 1, 'non-suicide': 0})
-    
-    # Split dataset
-    from sklearn.model_selection import train_test_split
-    _, test_df = train_test_split(df, test_size=test_size, random_state=42)
-    
-    return test_df
-
-def create_confusion_matrix(y_true, y_pred):
-    """Create and display confusion matrix."""
-    cm = confusion_matrix(y_true, y_pred)
-    plt.figure(figsize=(10, 8))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
-                xticklabels=['Non-Suicide', 'Suicide'],
-                yticklabels=['Non-Suicide', 'Suicide'])
-    plt.title('Confusion Matrix')
-    plt.ylabel('True Label')
-    plt.xlabel('Predicted Label')
-    plt.savefig('confusion_matrix.png')
-    plt.show()
+    """Load the held-out split (the same hash split the training scripts exclude)."""
+    return load_split(csv_path, split='test', test_fraction=test_size)
 
 def main():
-    # Load model
-    model = load_model()
-    if model is None:
-        return
-
-    # Prepare test data
-    test_df = prepare_test_data()
-    
-    # Create dataset
-    test_ds = tf.data.Dataset.from_tensor_slices(
-        (test_df['text'].values, test_df['class'].values)
-    ).batch(32)
-
-    # Get predictions
-    y_pred_proba = model.predict(test_ds)
-    y_pred = (y_pred_proba > 0.5).astype(int)
-    y_true = test_df['class'].values
-
-    # Create confusion matrix
-    create_confusion_matrix(y_true, y_pred.flatten())
+    parser = argparse.ArgumentParser(description="Evaluate the suicide detection model on the held-out split")
+    parser.add_argument("--model-path", default='./suicide_detection_model.keras')
+    parser.add_argument("--csv", default='Suicide_Detection.csv')
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--target-recall", type=float, nargs="+", default=list(evaluation.DEFAULT_TARGET_RECALLS))
+    parser.add_argument("--report", default="test_report.json")
+    parser.add_argument("--plots", action="store_true", help="Also write confusion matrix and PR/ROC PNGs")
+    args = parser.parse_args()
+
+    def score(texts):
+        # Only runs when no cached predictions exist for this model version
+        model = load_model(args.model_path)
+        if model is None:
+            raise SystemExit(1)
+        dataset = tf.data.Dataset.from_tensor_slices(texts).batch(256)
+        return model.predict(dataset, verbose=0).reshape(-1)
+
+    y_true, y_pred_proba = evaluation.cached_predictions(args.model_path, score, args.csv, split='test')
+    y_pred = (y_pred_proba > args.threshold).astype(int)  # as predict.classify
 
     # Print classification report
     print("\nClassification Report:")
-    print(classification_report(y_true, y_pred, 
+    print(classification_report(y_true, y_pred,
                               target_names=['Non-Suicide', 'Suicide']))
 
-    # Print additional metrics
-    from sklearn.metrics import roc_auc_score, average_precision_score
-    print(f"\nROC AUC Score: {roc_auc_score(y_true, y_pred_proba):.4f}")
-    print(f"Average Precision Score: {average_precision_score(y_true, y_pred_proba):.4f}")
+    report = evaluation.build_report(y_true, y_pred_proba, args.target_recall, args.threshold)
+    report['model'] = args.model_path
+    evaluation.print_summary(report)
+    evaluation.write_report(report, args.report)
+    if args.plots:
+        evaluation.plot_report(report, 'test')
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from evaluation import build_report, threshold_sweep
+from predict import classify
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 2, 2000)
+    # Rounded so many scores sit exactly on the thresholds being tested
+    probabilities = np.round(np.clip(y_true * 0.3 + rng.random(2000) * 0.7, 0, 1), 2)
+    probabilities[:40] = 0.5
+    return y_true, probabilities
+
+def confusion(y_true, probabilities, threshold):
+    predicted = np.array([classify(p, threshold)[1] == 'suicide' for p in probabilities])
+    actual = y_true.astype(bool)
+    return [[int(np.sum(~actual & ~predicted)), int(np.sum(~actual & predicted))],
+            [int(np.sum(actual & ~predicted)), int(np.sum(actual & predicted))]]
+
+@pytest.mark.parametrize('threshold', [0.3, 0.5, 0.5004, 0.77])
+def test_default_threshold_matches_classify(scores, threshold):
+    y_true, probabilities = scores
+    entry = build_report(y_true, probabilities, default_threshold=threshold)['at_default_threshold']
+    assert entry['threshold'] == threshold
+    assert entry['confusion_matrix'] == confusion(y_true, probabilities, threshold)
+
+def test_sweep_matches_classify_on_every_grid_threshold(scores):
+    y_true, probabilities = scores
+    grid = np.linspace(0, 1, 101)
+    sweep = threshold_sweep(y_true, probabilities, grid)
+    for i, threshold in enumerate(grid):
+        (tn, fp), (fn, tp) = confusion(y_true, probabilities, threshold)
+        assert (sweep['tn'][i], sweep['fp'][i], sweep['fn'][i], sweep['tp'][i]) == (tn, fp, fn, tp)
+
+def test_auc_and_average_precision_match_sklearn(scores):
+    metrics = pytest.importorskip('sklearn.metrics')
+    y_true, probabilities = scores
+    report = build_report(y_true, probabilities)
+    assert report['roc_auc'] == pytest.approx(metrics.roc_auc_score(y_true, probabilities))
+    assert report['average_precision'] == pytest.approx(metrics.average_precision_score(y_true, probabilities))
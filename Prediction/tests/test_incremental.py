@@ -0,0 +1,50 @@
+import pytest
+
+from incremental import ConversationScorer
+
+def fake_scores(texts):
+    # Risky only when the newest message ends the text with "die"
+    return [0.95 if text.endswith('die') else 0.1 for text in texts]
+
+def test_only_new_messages_are_scored():
+    scorer = ConversationScorer(context_tokens=2)
+    scored = []
+
+    def score(texts):
+        scored.extend(texts)
+        return fake_scores(texts)
+
+    scorer.score('chat', ['hi there', 'I want to die'], score)
+    assert scorer.score('chat', ['hi there', 'I want to die', 'ok'], score)[1] == 'suicide'
+    assert scored == ['hi there', 'hi there I want to die', 'to die ok']
+
+def test_failed_scoring_does_not_advance_the_conversation():
+    scorer = ConversationScorer()
+    messages = ['hello', 'I want to die']
+    # The batch fails between prepare() and commit()
+    pending, texts = scorer.prepare('chat', messages)
+    assert len(texts) == 2
+
+    # The retry scores the same messages again instead of reporting nothing new
+    pending, texts = scorer.prepare('chat', messages)
+    assert len(texts) == 2
+    assert scorer.commit('chat', pending, fake_scores(texts))[1] == 'suicide'
+    assert scorer.score('chat', messages, fake_scores)[1] == 'suicide'
+
+def test_conversation_without_scored_messages_raises():
+    scorer = ConversationScorer()
+    with pytest.raises(ValueError):
+        scorer.score('chat', [], fake_scores)
+
+def test_edited_history_is_rescored():
+    scorer = ConversationScorer()
+    scorer.score('chat', ['I want to die'], fake_scores)
+    assert scorer.score('chat', ['all good now'], fake_scores)[1] == 'non-suicide'
+
+def test_concurrent_commits_for_the_same_history_count_once():
+    scorer = ConversationScorer(combine='mean')
+    first, texts = scorer.prepare('chat', ['I want to die'])
+    second, _ = scorer.prepare('chat', ['I want to die'])
+    scorer.commit('chat', first, fake_scores(texts))
+    scorer.commit('chat', second, fake_scores(texts))
+    assert scorer.score('chat', ['I want to die', 'fine'], fake_scores)[0] == pytest.approx((0.95 + 0.1) / 2)
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+pytest.importorskip('mongomock')
+
+from sweep import CHATS, FAILURES, PREDICTIONS, Sweeper, connect, load_watermark, utcnow
+
+class KeywordModel:
+    """0.9 for texts mentioning 'die', 0.1 otherwise; raises on 'POISON' or while down."""
+
+    def __init__(self):
+        self.down = False
+
+    def predict_proba(self, texts, batch_size=None):
+        if self.down or any('POISON' in text for text in texts):
+            raise RuntimeError("model failed")
+        return np.array([0.9 if 'die' in text else 0.1 for text in texts], dtype=np.float32)
+
+def add_chats(db, *chats):
+    start = utcnow() - timedelta(minutes=5)
+    for i, (uuid, history, ip) in enumerate(chats):
+        chat = {'uuid': uuid, 'chatHistory': history, 'timestamp': start + timedelta(seconds=i)}
+        if ip:
+            chat['ipAddress'] = ip
+        db[CHATS].insert_one(chat)
+
+def touch(db, uuid, message='one more'):
+    db[CHATS].update_one({'uuid': uuid}, {'$push': {'chatHistory': message},
+                                          '$set': {'timestamp': utcnow() - timedelta(seconds=1)}})
+
+def levels(db, collection):
+    return {doc['uuid']: doc.get('riskLevel') for doc in db[collection].find()}
+
+def errors(db):
+    return {doc['uuid']: doc['error'] for doc in db[FAILURES].find()}
+
+@pytest.fixture
+def db():
+    return connect(mock=True)
+
+def test_bad_chats_are_skipped_and_the_watermark_moves_on(db):
+    add_chats(db,
+              ('risky', ['I want to die'], '10.0.0.1'),
+              ('marathi', ['मला मरायचे आहे'], '10.0.0.2'),
+              ('empty', [], '10.0.0.3'),
+              ('poison', ['POISON'], '10.0.0.4'),
+              ('fine', ['all good'], '10.0.0.5'))
+    stats = Sweeper(db, KeywordModel(), lag_seconds=0).sweep()
+
+    assert (stats['chats'], stats['failed']) == (2, 3)
+    assert levels(db, CHATS) == {'risky': 'high', 'marathi': None, 'empty': None, 'poison': None, 'fine': 'normal'}
+    assert set(errors(db)) == {'marathi', 'empty', 'poison'}
+    assert load_watermark(db) is not None
+    # Nothing left to sweep: the failed chats do not block later pages
+    assert Sweeper(db, KeywordModel(), lag_seconds=0).sweep()['chats'] == 0
+
+def test_empty_translation_is_rejected(db):
+    add_chats(db, ('marathi', ['मला मरायचे आहे'], '10.0.0.2'))
+    sweeper = Sweeper(db, KeywordModel(), translate=lambda texts: ['' for _ in texts], lag_seconds=0)
+    assert sweeper.sweep()['failed'] == 1
+    assert db[PREDICTIONS].count_documents({}) == 0
+    assert 'Translation failed' in errors(db)['marathi']
+
+    # Once the chat changes and translation works, it is scored and the failure cleared
+    touch(db, 'marathi', 'मला मरायचे आहे')
+    sweeper.translate = lambda texts: ['I want to die' for _ in texts]
+    assert sweeper.sweep()['chats'] == 1
+    assert levels(db, PREDICTIONS) == {'marathi': 'high'}
+    assert errors(db) == {}
+
+def test_chat_without_ip_gets_no_prediction_row(db):
+    add_chats(db, ('no-ip', ['I want to die'], None))
+    stats = Sweeper(db, KeywordModel(), lag_seconds=0).sweep()
+    assert stats['without_ip'] == 1
+    assert levels(db, CHATS) == {'no-ip': 'high'}
+    assert db[PREDICTIONS].count_documents({}) == 0
+
+def test_page_is_retried_when_the_model_fails_for_every_chat(db):
+    add_chats(db, ('a', ['I want to die'], '10.0.0.1'), ('b', ['hello'], '10.0.0.2'))
+    model = KeywordModel()
+    model.down = True
+    sweeper = Sweeper(db, model, lag_seconds=0)
+    with pytest.raises(RuntimeError):
+        sweeper.sweep()
+    assert load_watermark(db) is None
+
+    model.down = False
+    assert sweeper.sweep()['chats'] == 2
+    assert levels(db, PREDICTIONS) == {'a': 'high', 'b': 'normal'}
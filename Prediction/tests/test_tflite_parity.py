@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from tflite_backend import PARITY_TEXTS, Tokenizer
+
+# The Keras side needs TensorFlow; those tests are skipped where it is not
+# installed. The tokenizer expectations below run everywhere.
+
+CORPUS = [
+    "i feel so alone and tired of everything",
+    "today was a wonderful day with friends",
+    "nobody would notice if i was gone",
+    "can anyone recommend a good book",
+    "मला खूप एकटे वाटते आणि जगायचे नाही।",
+    "आज खूप छान दिवस होता",
+]
+
+def test_tokens_split_only_on_ascii_whitespace():
+    tokenizer = Tokenizer(['', '[UNK]'], sequence_length=10)
+    assert tokenizer.tokens("Feel\u00a0EMPTY\u2028now\t  and\nthen ") == ['feel\u00a0empty\u2028now', 'and', 'then']
+
+def test_default_standardize_lowercases_ascii_only():
+    tokenizer = Tokenizer(['', '[UNK]'], sequence_length=10)
+    assert tokenizer.tokens("ÉCOLE Don't!") == ['École', 'dont']
+
+@pytest.fixture(scope='module')
+def tf():
+    return pytest.importorskip('tensorflow')
+
+@pytest.fixture(scope='module', params=['lower_and_strip_punctuation', 'devanagari_standardize'])
+def model(request, tf):
+    import bilstm
+    standardize = bilstm.devanagari_standardize if request.param == 'devanagari_standardize' else request.param
+    vectorize_layer = bilstm.build_vectorizer(max_features=64, sequence_length=12, standardize=standardize)
+    vectorize_layer.adapt(CORPUS + PARITY_TEXTS)
+    tf.keras.utils.set_random_seed(0)
+    return bilstm.build_model(vectorize_layer, max_features=64, embedding_dim=8)
+
+@pytest.fixture(scope='module')
+def exported(model, tmp_path_factory):
+    from export_tflite import export_tflite
+    directory = tmp_path_factory.mktemp('tflite')
+    keras_path = str(directory / 'model.keras')
+    tflite_path = str(directory / 'model.tflite')
+    vocab_path = str(directory / 'vocab.json')
+    model.save(keras_path)
+    export_tflite(model, tflite_path, vocab_path)
+    return keras_path, tflite_path, vocab_path
+
+def test_token_ids_match_text_vectorization(model, exported):
+    texts = CORPUS + PARITY_TEXTS
+    expected = model.layers[0](np.array(texts)).numpy()
+    actual = Tokenizer.from_file(exported[2]).encode(texts)
+    np.testing.assert_array_equal(actual, expected)
+
+def test_tflite_probabilities_match_keras(exported):
+    from tflite_backend import check_parity
+    max_diff, ok = check_parity(*exported, CORPUS + PARITY_TEXTS)
+    assert ok, f"max |keras - tflite| = {max_diff}"
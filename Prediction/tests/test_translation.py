@@ -0,0 +1,103 @@
+import re
+import types
+
+import pytest
+
+import metrics
+from predict_marathi import TranslationMemo, translate_batch
+
+# Offline tests for batched translation: StubGemini stands in for the Gemini
+# model and answers from a fixed dictionary, recording every prompt it gets.
+
+TRANSLATIONS = {
+    'मला मरायचे आहे': 'I want to die',
+    'नमस्कार': 'Hello',
+    'आज छान दिवस आहे': 'Today is a nice day',
+}
+
+def response(text):
+    return types.SimpleNamespace(parts=[types.SimpleNamespace(text=text)])
+
+class StubGemini:
+    """generate_content() translates each <<<n>>> segment (or a single text) from TRANSLATIONS."""
+
+    def __init__(self, garble=None):
+        self.prompts = []
+        self.garble = garble  # optional reply -> reply rewrite applied to batch replies
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        if '<<<0>>>' not in prompt:
+            source = prompt.split('\n\n')[1]
+            return response(TRANSLATIONS[source])
+        body = prompt.split('\n\n', 1)[1].rsplit('\n\nTranslation:', 1)[0]
+        segments = re.split(r'<<<(\d+)>>>\n', body)
+        reply = ''.join(f"<<<{index}>>>\n{TRANSLATIONS[text.strip()]}\n"
+                        for index, text in zip(segments[1::2], segments[2::2]))
+        return response(self.garble(reply) if self.garble else reply)
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, 'REGISTRY', registry)
+    return registry
+
+def counter(registry, name, **labels):
+    for entry in registry.snapshot()['counters']:
+        if entry['name'] == name and entry['labels'] == labels:
+            return entry['value']
+    return 0
+
+def test_batch_is_split_on_markers():
+    gemini = StubGemini()
+    texts = list(TRANSLATIONS)
+    assert translate_batch(texts, gemini) == list(TRANSLATIONS.values())
+    assert len(gemini.prompts) == 1
+
+def test_duplicates_and_empty_texts_keep_input_order():
+    gemini = StubGemini()
+    texts = ['नमस्कार', '', 'मला मरायचे आहे', 'नमस्कार']
+    assert translate_batch(texts, gemini) == ['Hello', '', 'I want to die', 'Hello']
+    assert len(gemini.prompts) == 1
+
+def test_batches_respect_max_batch_chars():
+    gemini = StubGemini()
+    texts = list(TRANSLATIONS)
+    assert translate_batch(texts, gemini, max_batch_chars=1) == list(TRANSLATIONS.values())
+    # Every text is over the limit on its own, so each goes in its own request
+    assert len(gemini.prompts) == len(texts)
+
+@pytest.mark.parametrize('garble', [
+    lambda reply: reply.replace('<<<1>>>\n', ''),            # segment missing
+    lambda reply: reply.replace('<<<2>>>', '<<2>>'),          # marker garbled
+    lambda reply: reply.replace('<<<1>>>', '<<<7>>>'),        # wrong index
+])
+def test_unsplittable_reply_falls_back_to_single_calls(garble, registry):
+    gemini = StubGemini(garble)
+    texts = list(TRANSLATIONS)
+    assert translate_batch(texts, gemini) == list(TRANSLATIONS.values())
+    # One batch request, then one request per text
+    assert len(gemini.prompts) == 1 + len(texts)
+    assert counter(registry, 'errors_total', stage='translation') == 1
+
+def test_memo_hits_skip_gemini(registry):
+    memo = TranslationMemo(None)
+    translate_batch(['नमस्कार', 'मला मरायचे आहे'], StubGemini(), memo)
+
+    gemini = StubGemini()
+    result = translate_batch(['नमस्कार', 'नमस्कार', '', 'आज छान दिवस आहे'], gemini, memo)
+    assert result == ['Hello', 'Hello', '', 'Today is a nice day']
+    assert len(gemini.prompts) == 1
+    assert 'नमस्कार' not in gemini.prompts[0]
+    # Only real memo lookups count as hits: not the duplicate, not the empty text
+    assert counter(registry, 'translation_texts_total', source='memo') == 1
+    assert memo.hits == 1
+
+def test_failed_translations_are_not_memoized():
+    class Failing:
+        def generate_content(self, prompt):
+            raise RuntimeError("quota exceeded")
+
+    memo = TranslationMemo(None)
+    assert translate_batch(['नमस्कार'], Failing(), memo) == ['']
+    assert memo.get('नमस्कार') is None
@@ -0,0 +1,193 @@
+import argparse
+import json
+import re
+import sys
+
+import numpy as np
+
+import metrics
+from bucketing import length_order
+
+# --- TFLite Predictor Backend ---
+# Runs the network exported by export_tflite.py without TensorFlow: texts are
+# tokenized in Python with the exported vocabulary (mirroring the model's
+# TextVectorization layer) and scored by the tflite_runtime interpreter.
+# Falls back to tf.lite.Interpreter when only full TensorFlow is installed.
+
+# TextVectorization's 'lower_and_strip_punctuation' regex
+DEFAULT_STRIP_REGEX = r'[!"#$%&()\*\+,-\./:;<=>?@\[\\\]^_`{|}~\']'
+# bilstm.devanagari_standardize's regex
+DEVANAGARI_STRIP_REGEX = r'[!"#$%&()\*\+,\-\./:;<=>?@\[\\\]^_`{|}~\'।॥]'
+
+# standardize mode -> (strip regex, replacement, Unicode-aware lowercasing)
+STANDARDIZERS = {
+    'lower_and_strip_punctuation': (DEFAULT_STRIP_REGEX, '', False),
+    'devanagari_standardize': (DEVANAGARI_STRIP_REGEX, ' ', True),
+}
+
+# TextVectorization's tf.strings.lower only lowercases ASCII letters; str.lower
+# would also fold other scripts and drift from the Keras vectorizer.
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+# Its split step (tf.strings.split) only breaks on ASCII whitespace; str.split
+# would also break on NBSP, U+2028 and friends and produce different tokens.
+_ASCII_WHITESPACE = re.compile(r'[ \t\n\r\f\v]+')
+
+def variant_path(quantization=None, base='./suicide_detection_model'):
+    """File name of an exported TFLite variant: float32 (None), 'int8' or 'float16'."""
+    return f"{base}.tflite" if quantization is None else f"{base}_{quantization}.tflite"
+
+def _interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+class Tokenizer:
+    """Pure-Python equivalent of the exported TextVectorization layer."""
+
+    def __init__(self, vocabulary, sequence_length, standardize='lower_and_strip_punctuation', dynamic_padding=False):
+        if standardize not in STANDARDIZERS:
+            raise ValueError(f"Unsupported standardize mode {standardize!r}")
+        self.sequence_length = sequence_length
+        self.dynamic_padding = dynamic_padding
+        self.index = {token: i for i, token in enumerate(vocabulary)}
+        self.oov_index = self.index.get('[UNK]', 1)
+        regex, self.replacement, self.unicode_lower = STANDARDIZERS[standardize]
+        self.strip = re.compile(regex)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+        return cls(payload['vocabulary'], payload['sequence_length'], payload['standardize'],
+                   payload.get('dynamic_padding', False))
+
+    def tokens(self, text):
+        """Standardized tokens of text, split on ASCII whitespace."""
+        text = text.lower() if self.unicode_lower else text.translate(_ASCII_LOWER)
+        return [token for token in _ASCII_WHITESPACE.split(self.strip.sub(self.replacement, text)) if token]
+
+    def encode(self, texts):
+        """
+        Token ids of shape (len(texts), sequence_length), zero-padded and truncated.
+
+        With dynamic_padding the width is the longest text in texts instead.
+        """
+        rows = [self.tokens(text)[:self.sequence_length] for text in texts]
+        width = self.sequence_length
+        if self.dynamic_padding:
+            width = max([len(tokens) for tokens in rows] + [1])
+        ids = np.zeros((len(texts), width), dtype=np.int64)
+        for row, tokens in enumerate(rows):
+            ids[row, :len(tokens)] = [self.index.get(token, self.oov_index) for token in tokens]
+        return ids
+
+class TFLitePredictor:
+    """
+    Scores texts with a .tflite model; usable anywhere predict.py expects a model.
+
+    Args:
+        model_path: .tflite file written by export_tflite.py
+        vocab_path: Vocabulary JSON written alongside it
+        num_threads: Interpreter threads (None lets the runtime decide)
+    """
+
+    def __init__(self, model_path, vocab_path, num_threads=None):
+        self.tokenizer = Tokenizer.from_file(vocab_path)
+        self.interpreter = _interpreter_class()(model_path=model_path, num_threads=num_threads)
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._shape = None
+        # Models converted at a fixed input shape (see export_tflite.convert_core)
+        # take exactly that many rows of exactly that length
+        signature = self._input.get('shape_signature', self._input['shape'])
+        self.fixed_batch_size = int(signature[0]) if signature[0] > 0 else None
+        if signature[1] > 0:
+            self.tokenizer.dynamic_padding = False
+
+    def _resize(self, shape):
+        if shape != self._shape:
+            self.interpreter.resize_tensor_input(self._input['index'], list(shape))
+            self.interpreter.allocate_tensors()
+            self._shape = shape
+
+    def predict_proba(self, texts, batch_size=32):
+        """
+        1-D array of probabilities, one per text.
+
+        Models exported with dynamic padding are scored in length order, so
+        each batch is padded only to its longest text; results come back in
+        input order. Fixed-shape models are scored fixed_batch_size rows at a
+        time, the last batch padded with empty rows.
+        """
+        texts = list(texts)
+        batch_size = self.fixed_batch_size or batch_size
+        order = inverse = None
+        if self.tokenizer.dynamic_padding:
+            order, inverse = length_order([len(text) for text in texts])
+            texts = [texts[i] for i in order]
+        probabilities = np.zeros(len(texts), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            with metrics.span('vectorize', backend='tflite'):
+                ids = self.tokenizer.encode(texts[start:start + batch_size])
+            rows = len(ids)
+            if self.fixed_batch_size and rows < self.fixed_batch_size:
+                ids = np.concatenate([ids, np.zeros((self.fixed_batch_size - rows, ids.shape[1]), ids.dtype)])
+            with metrics.span('forward', backend='tflite'):
+                self._resize(ids.shape)
+                self.interpreter.set_tensor(self._input['index'], ids.astype(self._input['dtype']))
+                self.interpreter.invoke()
+                probabilities[start:start + rows] = self.interpreter.get_tensor(self._output['index']).reshape(-1)[:rows]
+        return probabilities if order is None else probabilities[inverse]
+
+def check_parity(keras_model_path, tflite_model_path, vocab_path, texts, tolerance=1e-3):
+    """
+    Compare TFLite probabilities against the Keras model on the same texts.
+
+    Returns:
+        (max_abs_diff, ok)
+    """
+    import tensorflow as tf
+    import bilstm  # noqa: F401  registers custom standardizers used by saved models
+
+    keras_model = tf.keras.models.load_model(keras_model_path)
+    expected = keras_model.predict(tf.constant(texts), verbose=0).reshape(-1)
+    actual = TFLitePredictor(tflite_model_path, vocab_path).predict_proba(texts)
+    max_diff = float(np.max(np.abs(expected - actual))) if len(texts) else 0.0
+    return max_diff, max_diff <= tolerance
+
+PARITY_TEXTS = [
+    "I don't want to live anymore.",
+    "Today was a wonderful day!",
+    "I feel so alone, nobody would even notice if I was gone",
+    "Can anyone recommend a good book for the weekend?",
+    "",
+    "I'M SO TIRED OF EVERYTHING... what's the point?!",
+    # Non-ASCII spaces stay inside a token; ASCII tabs and newlines split
+    "I feel\u00a0empty\u2028and\u2003tired\tof\nit",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the TFLite backend matches the Keras model")
+    parser.add_argument("--keras-model", default="./suicide_detection_model.keras")
+    parser.add_argument("--tflite-model", default="./suicide_detection_model.tflite")
+    parser.add_argument("--vocab", default="./suicide_detection_vocab.json")
+    parser.add_argument("--csv", default=None, help="Optional CSV with a 'text' column to add to the parity set")
+    parser.add_argument("--limit", type=int, default=500, help="Rows to take from --csv")
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    texts = list(PARITY_TEXTS)
+    if args.csv:
+        import pandas as pd
+        texts += pd.read_csv(args.csv, nrows=args.limit)['text'].astype(str).tolist()
+
+    max_diff, ok = check_parity(args.keras_model, args.tflite_model, args.vocab, texts, args.tolerance)
+    print(f"Parity over {len(texts)} texts: max |keras - tflite| = {max_diff:.6f} "
+          f"({'OK' if ok else 'FAILED'}, tolerance {args.tolerance})")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
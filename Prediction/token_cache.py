@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from bucketing import bucket_batches, trim_batch
+from data_loader import CSV_PATH, TEST_FRACTION, CHUNK_SIZE, class_counts, iter_chunks, source_fingerprint
+
+# --- Pre-tokenized BERT Dataset Cache ---
+# Tokenizing the corpus with BertTokenizer on every Transformer.py run is the
+# slowest part of training, and padding it into one in-memory tensor does not
+# scale. This tokenizes each split once, in chunks, with the fast (Rust)
+# tokenizer and writes input_ids / attention_mask / labels / lengths as .npy
+# files that training opens with mmap_mode='r'. A cache directory is keyed by
+# tokenizer, max_length, split and the source CSV, so changing any of them
+# builds a new cache instead of silently reusing a stale one.
+
+CACHE_ROOT = './token_cache'
+ARRAYS = ('input_ids', 'attention_mask', 'labels', 'lengths')
+
+def cache_key(tokenizer_name, max_length, split, csv_path=CSV_PATH, test_fraction=TEST_FRACTION):
+    """Directory name identifying a cache: tokenizer, max_length, split and source file."""
+    safe_name = tokenizer_name.replace('/', '_')
+    return f"{safe_name}_len{max_length}_{split}_{source_fingerprint(csv_path, split, test_fraction)}"
+
+def build_cache(tokenizer, out_dir, max_length=128, csv_path=CSV_PATH, split='train',
+                test_fraction=TEST_FRACTION, chunksize=CHUNK_SIZE):
+    """
+    Tokenize one split into memory-mapped .npy arrays.
+
+    Args:
+        tokenizer: Hugging Face tokenizer (a fast tokenizer is strongly preferred)
+        out_dir: Cache directory to create
+        max_length: Tokens per row; rows are padded/truncated to it
+        csv_path: Dataset CSV
+        split: 'train', 'test' or None
+        test_fraction: Share of rows hashed into the test split
+        chunksize: Rows tokenized per chunk
+
+    Returns:
+        Number of rows written
+    """
+    counts = class_counts(csv_path, split, test_fraction, chunksize)
+    n_rows = counts[0] + counts[1]
+    os.makedirs(out_dir, exist_ok=True)
+
+    open_memmap = np.lib.format.open_memmap
+    input_ids = open_memmap(os.path.join(out_dir, 'input_ids.npy'), mode='w+', dtype=np.int32, shape=(n_rows, max_length))
+    attention_mask = open_memmap(os.path.join(out_dir, 'attention_mask.npy'), mode='w+', dtype=np.int8, shape=(n_rows, max_length))
+    labels = open_memmap(os.path.join(out_dir, 'labels.npy'), mode='w+', dtype=np.int8, shape=(n_rows,))
+    lengths = open_memmap(os.path.join(out_dir, 'lengths.npy'), mode='w+', dtype=np.int16, shape=(n_rows,))
+
+    row = 0
+    for chunk in iter_chunks(csv_path, split, test_fraction, chunksize):
+        enc = tokenizer(
+            chunk['text'].tolist(),
+            padding='max_length',
+            truncation=True,
+            max_length=max_length,
+            return_tensors='np'
+        )
+        end = row + len(chunk)
+        input_ids[row:end] = enc['input_ids']
+        attention_mask[row:end] = enc['attention_mask']
+        labels[row:end] = chunk['class'].values
+        lengths[row:end] = enc['attention_mask'].sum(axis=1)
+        row = end
+        print(f"Tokenized {row}/{n_rows} rows")
+
+    for array in (input_ids, attention_mask, labels, lengths):
+        array.flush()
+    # meta.json is written last: its presence marks the cache as complete
+    meta = {
+        'tokenizer': tokenizer.name_or_path,
+        'max_length': max_length,
+        'split': split,
+        'csv_path': csv_path,
+        'rows': n_rows,
+        'class_counts': counts,
+    }
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return n_rows
+
+def load_cache(cache_dir):
+    """Open a cache zero-copy: a dict of read-only memory-mapped arrays."""
+    return {name: np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode='r') for name in ARRAYS}
+
+def get_or_build(tokenizer, max_length=128, csv_path=CSV_PATH, split='train',
+                 test_fraction=TEST_FRACTION, cache_root=CACHE_ROOT):
+    """Load the cache for (tokenizer, max_length, split, csv), tokenizing it first if missing."""
+    cache_dir = os.path.join(cache_root, cache_key(tokenizer.name_or_path, max_length, split, csv_path, test_fraction))
+    if os.path.exists(os.path.join(cache_dir, 'meta.json')):
+        print(f"Using token cache {cache_dir}")
+    else:
+        print(f"Building token cache {cache_dir}")
+        build_cache(tokenizer, cache_dir, max_length, csv_path, split, test_fraction)
+    return load_cache(cache_dir)
+
+def oversampled_indices(labels, factor, seed=42):
+    """
+    Row indices with every positive repeated `factor` times, shuffled.
+
+    Oversampling by index keeps one tokenized copy of each row on disk.
+    """
+    labels = np.asarray(labels)
+    negatives = np.flatnonzero(labels == 0)
+    positives = np.flatnonzero(labels == 1)
+    indices = np.concatenate([negatives, np.tile(positives, factor)])
+    np.random.default_rng(seed).shuffle(indices)
+    return indices
+
+def make_dataset(cache, indices=None, batch_size=16, shuffle=False, seed=42, boundaries=None):
+    """
+    tf.data pipeline of ({'input_ids', 'attention_mask'}, label) batches read from a cache.
+
+    Only the rows of the current batch are read from the memory map.
+
+    Args:
+        cache: Dict from load_cache
+        indices: Row indices to iterate (default: all rows in order)
+        batch_size: Rows per batch
+        shuffle: Reshuffle every epoch
+        seed: Shuffle seed
+        boundaries: Length bucket bounds; when given, rows of similar length
+            are batched together and each batch is trimmed to its longest row
+    """
+    import tensorflow as tf
+
+    if indices is None:
+        indices = np.arange(len(cache['labels']))
+    indices = np.asarray(indices, dtype=np.int64)
+    max_length = cache['input_ids'].shape[1]
+
+    def gather(batch):
+        input_ids = cache['input_ids'][batch].astype(np.int32)
+        attention_mask = cache['attention_mask'][batch].astype(np.int32)
+        if boundaries is not None:
+            input_ids, attention_mask = trim_batch(input_ids, attention_mask, lengths=cache['lengths'][batch])
+        return input_ids, attention_mask, cache['labels'][batch].astype(np.int32)
+
+    if boundaries is not None:
+        epoch = [0]
+
+        def batches():
+            # A new bucket shuffle every time tf.data re-iterates the generator (once per epoch)
+            epoch[0] += 1
+            lengths = np.asarray(cache['lengths'])[indices]
+            for batch in bucket_batches(lengths, batch_size, boundaries, shuffle, seed + epoch[0]):
+                yield indices[batch]
+
+        dataset = tf.data.Dataset.from_generator(
+            batches, output_signature=tf.TensorSpec(shape=(None,), dtype=tf.int64))
+        sequence_shape = [None, None]
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices(indices)
+        if shuffle:
+            dataset = dataset.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+        dataset = dataset.batch(batch_size)
+        sequence_shape = [None, max_length]
+
+    def load(batch):
+        input_ids, attention_mask, labels = tf.numpy_function(
+            gather, [batch], (tf.int32, tf.int32, tf.int32))
+        input_ids.set_shape(sequence_shape)
+        attention_mask.set_shape(sequence_shape)
+        labels.set_shape([None])
+        return {'input_ids': input_ids, 'attention_mask': attention_mask}, labels
+
+    return dataset.map(load, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-tokenize the dataset for BERT fine-tuning")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--tokenizer", default="bert-base-uncased")
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--splits", nargs="+", default=["train", "test"])
+    parser.add_argument("--cache-root", default=CACHE_ROOT)
+    args = parser.parse_args()
+
+    from transformers import BertTokenizerFast
+
+    tokenizer = BertTokenizerFast.from_pretrained(args.tokenizer)
+    for split in args.splits:
+        cache = get_or_build(tokenizer, args.max_length, args.csv, split, cache_root=args.cache_root)
+        lengths = np.asarray(cache['lengths'])
+        truncated = float(np.mean(lengths >= args.max_length)) if len(lengths) else 0.0
+        print(f"[{split}] rows: {len(lengths)}  mean length: {lengths.mean() if len(lengths) else 0:.1f}  "
+              f"truncated: {truncated:.1%}")
+
+if __name__ == "__main__":
+    main()
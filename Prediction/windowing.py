@@ -0,0 +1,114 @@
+import numpy as np
+
+import metrics
+from predict import predict_proba
+
+# --- Sliding-Window Scoring ---
+# The BiLSTM's vectorizer keeps the first 250 tokens and BERT the first 128
+# word pieces, so the end of a long chat history (often where the risk
+# signal is) was silently dropped. WindowedPredictor splits long texts into
+# overlapping word windows the model can see whole, scores the windows of
+# every input in one batched call and combines them per text:
+#   max        riskiest window (default; one alarming passage is enough)
+#   mean       average over windows
+#   attention  softmax-weighted by each window's own logit, so risky
+#              windows dominate without one outlier deciding alone
+# Texts that fit in one window are scored unchanged. The number of windows
+# grows linearly with text length.
+
+COMBINE_MODES = ('max', 'mean', 'attention')
+DEFAULT_WINDOW = 250
+# BERT word pieces per whitespace word, roughly, for sizing its windows
+WORDPIECES_PER_WORD = 1.3
+
+def window_size(model):
+    """Words per window for a model: its input length, read from the model where possible."""
+    tokenizer = getattr(model, 'tokenizer', None)
+    if hasattr(tokenizer, 'sequence_length'):
+        return tokenizer.sequence_length  # tflite_backend.TFLitePredictor
+    if hasattr(model, 'sequence_length'):
+        return model.sequence_length  # fast_mode.CompiledPredictor
+    if hasattr(model, 'max_length'):
+        return int(model.max_length / WORDPIECES_PER_WORD)  # distill.TeacherPredictor (BERT)
+    for layer in getattr(model, 'layers', []):
+        config = layer.get_config()
+        if config.get('output_sequence_length'):
+            return config['output_sequence_length']  # Keras model with its TextVectorization layer
+    return DEFAULT_WINDOW
+
+def windows(text, size, stride):
+    """Overlapping windows of size words, stride words apart; the last one ends at the text's end."""
+    words = text.split()
+    if len(words) <= size:
+        return [text]
+    starts = list(range(0, len(words) - size, stride)) + [len(words) - size]
+    return [' '.join(words[start:start + size]) for start in starts]
+
+def combine(probabilities, counts, mode='max', temperature=1.0):
+    """
+    Combine consecutive runs of window probabilities into one per text.
+
+    Args:
+        probabilities: 1-D array of window probabilities, grouped by text
+        counts: Windows per text (every count >= 1)
+        mode: 'max', 'mean' or 'attention'
+        temperature: Softmax temperature for 'attention' (lower leans towards max)
+
+    Returns:
+        1-D float32 array, one probability per text
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    counts = np.asarray(counts)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    if mode == 'max':
+        combined = np.maximum.reduceat(probabilities, starts)
+    elif mode == 'mean':
+        combined = np.add.reduceat(probabilities, starts) / counts
+    elif mode == 'attention':
+        clipped = np.clip(probabilities, 1e-7, 1 - 1e-7)
+        logits = np.log(clipped / (1 - clipped)) / temperature
+        # Subtract each text's max logit before exponentiating, for stability
+        weights = np.exp(logits - np.repeat(np.maximum.reduceat(logits, starts), counts))
+        combined = np.add.reduceat(weights * probabilities, starts) / np.add.reduceat(weights, starts)
+    else:
+        raise ValueError(f"combine must be one of {COMBINE_MODES}, got {mode!r}")
+    return combined.astype(np.float32)
+
+class WindowedPredictor:
+    """
+    Scores long texts as overlapping windows combined into one risk score.
+
+    Usable anywhere predict.py expects a model.
+
+    Args:
+        model: Any model predict.predict_proba accepts
+        size: Words per window (default: the model's input length)
+        stride: Words between window starts (default: three quarters of size)
+        mode: How window scores combine: 'max', 'mean' or 'attention'
+        temperature: Softmax temperature for 'attention'
+    """
+
+    def __init__(self, model, size=None, stride=None, mode='max', temperature=1.0):
+        if mode not in COMBINE_MODES:
+            raise ValueError(f"combine must be one of {COMBINE_MODES}, got {mode!r}")
+        self.model = model
+        self.size = size or window_size(model)
+        self.stride = stride or max(1, self.size * 3 // 4)
+        if not 0 < self.stride <= self.size:
+            raise ValueError(f"stride must be in (0, {self.size}], got {self.stride}")
+        self.mode = mode
+        self.temperature = temperature
+
+    def predict_proba(self, texts, batch_size=32):
+        """1-D array of probabilities, one per text."""
+        if len(texts) == 0:
+            return np.zeros(0, dtype=np.float32)
+        with metrics.span('windowing'):
+            per_text = [windows(text, self.size, self.stride) for text in texts]
+            counts = [len(w) for w in per_text]
+            flat = [window for w in per_text for window in w]
+        metrics.inc('windows_total', len(flat))
+        probabilities = predict_proba(self.model, flat, batch_size)
+        if len(flat) == len(texts):
+            return np.asarray(probabilities, dtype=np.float32)
+        return combine(probabilities, counts, self.mode, self.temperature)
@@ -40,6 +40,8 @@ const saveChatLog = async ({ uuid, userQuery, location, ipAddress }) => {
       existingLog.chatHistory = updatedChatHistory;
       existingLog.suicideRiskPercent = suicideRiskPercent;
       existingLog.riskLevel = riskLevel;
+      // The detector's sweep picks up chats by timestamp; mark this one as changed
+      existingLog.timestamp = Date.now();
       if (location) existingLog.location = location;
       
       // Only update ipAddress if it's provided and not null/undefined/empty string